@@ -0,0 +1,159 @@
+"""
+Benchmark script - Compare implementations of pipeline hot spots
+
+Usage:
+    python benchmark.py preprocess [--megapixels 12] [--repeat 3] [images...]
+    python benchmark.py report [--records 10000]
+"""
+import argparse
+import json
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, List
+
+from PIL import Image
+
+from config import INPUT_FOLDER, SUPPORTED_FORMATS
+from ocr import OCRProcessor
+import preprocess as vectorized
+import export_html
+from results_store import iter_results
+
+
+def time_call(func: Callable[[], object], repeat: int) -> float:
+    """Best wall-clock time of `repeat` runs (seconds)"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def load_images(paths: List[str], megapixels: float) -> List[tuple]:
+    """Load benchmark images, upscaled to `megapixels` if requested (e.g. 12MP phone photos)"""
+    if not paths:
+        paths = [
+            str(f) for f in sorted(INPUT_FOLDER.iterdir())
+            if f.is_file() and f.suffix.lower() in SUPPORTED_FORMATS
+        ]
+
+    images = []
+    for path in paths:
+        image = Image.open(path)
+        image.load()
+        if megapixels:
+            scale = (megapixels * 1_000_000 / (image.width * image.height)) ** 0.5
+            image = image.resize((round(image.width * scale), round(image.height * scale)))
+        images.append((Path(path).name, image))
+    return images
+
+
+def bench_preprocess(args) -> int:
+    images = load_images(args.images, args.megapixels)
+    if not images:
+        print("❌ No images to benchmark")
+        return 1
+
+    processor = OCRProcessor(use_cache=False)
+    variants = [("pil", processor.preprocess_image_pil)]
+    for mode in vectorized.BINARIZATION_MODES:
+        variants.append((f"numpy/{mode}", lambda img, mode=mode: vectorized.preprocess(img, mode)))
+
+    print(f"{'image':<40} {'size':>11} " + " ".join(f"{name:>14}" for name, _ in variants))
+    totals = [0.0] * len(variants)
+    for name, image in images:
+        row = []
+        for i, (_, func) in enumerate(variants):
+            elapsed = time_call(lambda: func(image.copy()), args.repeat)
+            totals[i] += elapsed
+            row.append(f"{elapsed * 1000:>12.1f}ms")
+        size = f"{image.width}x{image.height}"
+        print(f"{name[:40]:<40} {size:>11} " + " ".join(row))
+
+    baseline = totals[0]
+    print("-" * (53 + 15 * len(variants)))
+    print(f"{'speedup vs pil':<52} " + " ".join(
+        f"{baseline / total if total else 0:>13.2f}x" for total in totals
+    ))
+    return 0
+
+
+def make_results(folder: Path, count: int):
+    """Synthetic results store: `count` records with ~1.5KB of Vietnamese text each"""
+    words = "cách mạng tháng tám năm 1945 việt nam lịch sử <b> & giáo khoa trang".split()
+    rng = random.Random(0)
+    with open(folder / "results.jsonl", 'w', encoding='utf-8') as f:
+        for i in range(count):
+            text = '\n'.join(' '.join(rng.choices(words, k=12)) for _ in range(25))
+            f.write(json.dumps({
+                'image': f"img_{i:06d}.jpg",
+                'ocr': {'method': 'Raw', 'confidence': 90.0, 'passes': 1, 'cached': False},
+                'text': text,
+                'keyword': ' '.join(rng.choices(words, k=8)),
+                'urls': [f"https://example.com/{i}/{n}" for n in range(5)],
+                'timings': {'ocr': 1.2, 'keyword': 0.8, 'search': 0.5},
+                'ts': float(i),
+            }, ensure_ascii=False) + '\n')
+
+
+def concatenated_report(folder: Path, html_file: Path):
+    """Previous approach: build the whole document in one string, then write it"""
+    html = export_html._HEAD
+    for record in iter_results(folder):
+        html += export_html.render_card(record)
+    html += export_html._FOOTER
+    with open(html_file, 'w', encoding='utf-8') as f:
+        f.write(html)
+
+
+def streamed_report(folder: Path, html_file: Path):
+    with open(html_file, 'w', encoding='utf-8') as f:
+        export_html.write_report(folder, f)
+
+
+def bench_report(args) -> int:
+    variants = [("concatenate", concatenated_report), ("stream", streamed_report)]
+    print(f"{'records':>8} " + " ".join(f"{name + ' time':>18} {name + ' peak':>18}" for name, _ in variants))
+    for count in args.records:
+        with tempfile.TemporaryDirectory() as tmp:
+            folder = Path(tmp)
+            make_results(folder, count)
+            row = []
+            for name, func in variants:
+                html_file = folder / f"{name}.html"
+                tracemalloc.start()
+                start = time.perf_counter()
+                func(folder, html_file)
+                elapsed = time.perf_counter() - start
+                peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+                row.append(f"{elapsed:>17.2f}s {peak / 1024 / 1024:>16.1f}MB")
+            print(f"{count:>8} " + " ".join(row))
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Pipeline benchmarks")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("preprocess", help="PIL chain vs vectorized NumPy preprocessing")
+    p.add_argument("images", nargs="*", help="Images (default: INPUT_FOLDER)")
+    p.add_argument("--megapixels", type=float, default=0, help="Resize inputs to this many megapixels")
+    p.add_argument("--repeat", type=int, default=3)
+    p.set_defaults(func=bench_preprocess)
+
+    p = sub.add_parser("report", help="HTML report: one big string vs streamed to the file")
+    p.add_argument("--records", type=int, nargs="+", default=[2500, 5000, 10000])
+    p.set_defaults(func=bench_report)
+
+    args = parser.parse_args()
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""
+Cache Module - Persistent on-disk key/value cache (SQLite) with LRU eviction
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from logger import setup_logger
+
+logger = setup_logger('Cache')
+
+
+def hash_key(*parts) -> str:
+    """Build a stable SHA-256 cache key from strings/bytes"""
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode('utf-8')
+        digest.update(part)
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    JSON-value cache stored in a single SQLite file.
+
+    Safe to share between threads and between processes (each process opens
+    its own connection). When the stored size exceeds `max_bytes`, the least
+    recently used entries are evicted. Entries older than `ttl` seconds (if
+    set) are treated as misses and purged. Hit/miss counters are persisted so
+    worker processes contribute to the same statistics.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        max_bytes: int,
+        name: str = "cache",
+        ttl: Optional[float] = None
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.name = name
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL,"
+                " created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_accessed ON entries(accessed)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_created ON entries(created)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None on a miss"""
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is not None and self._expired(row[1], now):
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                row = None
+
+            if row is None:
+                self._bump("misses")
+                return None
+
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self._bump("hits")
+
+        return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        """Store a JSON-serializable value, evicting old entries if needed"""
+        payload = json.dumps(value, ensure_ascii=False)
+        size = len(payload.encode('utf-8'))
+        now = time.time()
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, payload, size, now, now)
+            )
+            self._evict()
+
+    def stats(self) -> Dict[str, int]:
+        """Entries, total bytes and cumulative hit/miss counters"""
+        with self._lock:
+            entries, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+
+        return {
+            'entries': entries,
+            'bytes': total,
+            'hits': counters.get('hits', 0),
+            'misses': counters.get('misses', 0),
+        }
+
+    def clear(self):
+        """Remove all entries and reset counters"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM counters")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _bump(self, counter: str):
+        self._conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (counter,)
+        )
+
+    def _expired(self, created: float, now: float) -> bool:
+        return self.ttl is not None and now - created > self.ttl
+
+    def _evict(self):
+        """Drop expired entries, then least recently used ones until total size fits max_bytes"""
+        if self.ttl is not None:
+            self._conn.execute("DELETE FROM entries WHERE created < ?", (time.time() - self.ttl,))
+
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        excess = total - self.max_bytes
+        freed = 0
+        victims = []
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            victims.append((key,))
+            freed += size
+            if freed >= excess:
+                break
+
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+        logger.debug(f"[{self.name}] Evicted {len(victims)} entries ({freed} bytes)")
@@ -15,10 +15,34 @@ BASE_DIR = Path(__file__).parent
 INPUT_FOLDER = BASE_DIR / "image_input"
 OUTPUT_FOLDER = BASE_DIR / "output"
 LOG_FOLDER = BASE_DIR / "logs"
+CACHE_FOLDER = BASE_DIR / "cache"
 
 # Tesseract configuration
 TESSERACT_PATH = os.getenv('TESSERACT_PATH', r'C:\Program Files\Tesseract-OCR\tesseract.exe')
 OCR_LANGUAGES = 'vie+eng'
+# OCR backend: 'tesserocr' (persistent engine), 'cli' (pytesseract subprocess) or 'auto'
+OCR_BACKEND = os.getenv('OCR_BACKEND', 'auto')
+# Pass selection: 'confidence' (stop after the first pass whose mean word
+# confidence >= OCR_CONFIDENCE_THRESHOLD) or 'longest' (run both, keep longest text)
+OCR_SELECTION = os.getenv('OCR_SELECTION', 'confidence')
+OCR_CONFIDENCE_THRESHOLD = float(os.getenv('OCR_CONFIDENCE_THRESHOLD', 70))
+# Preprocessing: 'numpy' (vectorized, single buffer) or 'pil' (original PIL chain)
+OCR_PREPROCESS_ENGINE = os.getenv('OCR_PREPROCESS_ENGINE', 'numpy')
+# Binarization for the numpy engine: 'fixed' (128), 'otsu' or 'sauvola' (uneven lighting)
+OCR_BINARIZATION = os.getenv('OCR_BINARIZATION', 'otsu')
+OCR_SAUVOLA_WINDOW = int(os.getenv('OCR_SAUVOLA_WINDOW', 25))
+# Resolution normalization: rescale so text lines are ~OCR_TARGET_TEXT_HEIGHT px
+# tall (~300 DPI for body text), capped at OCR_MAX_PIXELS; large JPEGs are
+# decoded at reduced size
+OCR_NORMALIZE = os.getenv('OCR_NORMALIZE', '1') == '1'
+OCR_TARGET_TEXT_HEIGHT = int(os.getenv('OCR_TARGET_TEXT_HEIGHT', 40))
+OCR_MAX_PIXELS = int(os.getenv('OCR_MAX_PIXELS', 8_000_000))
+# tessdata folder for tesserocr (None = library default)
+TESSDATA_PATH = os.getenv('TESSDATA_PREFIX')
+
+# OCR result cache (keyed on image bytes + OCR settings)
+OCR_CACHE_ENABLED = os.getenv('OCR_CACHE_ENABLED', '1') == '1'
+OCR_CACHE_MAX_MB = int(os.getenv('OCR_CACHE_MAX_MB', 256))
 
 # API Configuration - Now reads from . env file! 
 GEMINI_API_KEY = os.getenv('GEMINI_API_KEY')
@@ -28,6 +52,21 @@ if not GEMINI_API_KEY:
     print("Please set it in . env file or as environment variable")
 
 GEMINI_MODEL = 'gemini-2.0-flash-exp'
+
+# Gemini keyword cache (keyed on normalized OCR text + prompt hash + model)
+KEYWORD_CACHE_ENABLED = os.getenv('KEYWORD_CACHE_ENABLED', '1') == '1'
+KEYWORD_CACHE_TTL_HOURS = float(os.getenv('KEYWORD_CACHE_TTL_HOURS', 24 * 7))
+KEYWORD_CACHE_MAX_MB = int(os.getenv('KEYWORD_CACHE_MAX_MB', 32))
+# Keyword extraction: 'gemini' (AI, offline engine as fallback) or 'offline' (local RAKE/TF-IDF only)
+KEYWORD_MODE = os.getenv('KEYWORD_MODE', 'gemini')
+# Max OCR characters per text sent to Gemini, after compaction (dedupe, noise removal, line ranking)
+GEMINI_INPUT_BUDGET = int(os.getenv('GEMINI_INPUT_BUDGET', 2500))
+# Batched keyword extraction: max texts per Gemini call and max OCR characters per call
+GEMINI_BATCH_SIZE = int(os.getenv('GEMINI_BATCH_SIZE', 8))
+GEMINI_BATCH_CHARS = int(os.getenv('GEMINI_BATCH_CHARS', 12000))
+# Single-text calls: stream the response and stop at the first keyword line
+GEMINI_STREAM = os.getenv('GEMINI_STREAM', '1') == '1'
+GEMINI_STREAM_MAX_TOKENS = int(os.getenv('GEMINI_STREAM_MAX_TOKENS', 96))
 GEMINI_API_URL = f'https://generativelanguage.googleapis.com/v1beta/models/{GEMINI_MODEL}:generateContent'
 
 # Search configuration
@@ -37,6 +76,66 @@ SEARCH_RETURN_COUNT = 5
 SEARCH_MAX_RETRIES = 3
 SEARCH_RETRY_DELAY = 2
 
+# Search result cache (query -> URLs)
+SEARCH_CACHE_ENABLED = os.getenv('SEARCH_CACHE_ENABLED', '1') == '1'
+SEARCH_CACHE_TTL_HOURS = float(os.getenv('SEARCH_CACHE_TTL_HOURS', 24))
+SEARCH_CACHE_MAX_MB = int(os.getenv('SEARCH_CACHE_MAX_MB', 16))
+
+# Batch / parallel configuration
+OCR_WORKERS = int(os.getenv('OCR_WORKERS', os.cpu_count() or 1))
+NETWORK_WORKERS = int(os.getenv('NETWORK_WORKERS', 4))
+# Keep-alive connections (Gemini) / DuckDuckGo clients kept per backend;
+# defaults to NETWORK_WORKERS so every network worker reuses its own
+HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', NETWORK_WORKERS))
+# Requests per minute allowed per network backend (shared by all workers)
+GEMINI_RPM = float(os.getenv('GEMINI_RPM', 10))
+SEARCH_RPM = float(os.getenv('SEARCH_RPM', 30))
+# Circuit breaker: after this many consecutive rate-limit errors, skip the
+# backend (Gemini -> offline fallback) for BREAKER_COOLDOWN seconds
+BREAKER_THRESHOLD = int(os.getenv('BREAKER_THRESHOLD', 3))
+BREAKER_COOLDOWN = float(os.getenv('BREAKER_COOLDOWN', 60))
+# Max items waiting between two stages in pipeline mode (backpressure)
+PIPELINE_QUEUE_SIZE = int(os.getenv('PIPELINE_QUEUE_SIZE', 8))
+
+# Distributed mode: shared SQLite work queue (must be on the shared filesystem)
+WORK_QUEUE_PATH = Path(os.getenv('WORK_QUEUE_PATH', INPUT_FOLDER / ".workqueue.sqlite3"))
+# Seconds before an image leased by an unresponsive node is handed to another node
+WORK_LEASE_SECONDS = float(os.getenv('WORK_LEASE_SECONDS', 300))
+# Give up on an image after this many leases (e.g. a node crashing on it)
+WORK_MAX_ATTEMPTS = int(os.getenv('WORK_MAX_ATTEMPTS', 3))
+# Seconds between queue checks while other nodes still hold leases
+WORK_POLL_INTERVAL = float(os.getenv('WORK_POLL_INTERVAL', 10))
+
+# Watch mode: seconds between scans of INPUT_FOLDER, and how long a file's
+# size and mtime must stay unchanged before it is read (still being copied)
+WATCH_POLL_INTERVAL = float(os.getenv('WATCH_POLL_INTERVAL', 2))
+WATCH_SETTLE_SECONDS = float(os.getenv('WATCH_SETTLE_SECONDS', 3))
+# Seconds before an image that failed or got a partial result (Gemini/search
+# unavailable) is tried again; doubles after each failure, up to an hour
+WATCH_RETRY_SECONDS = float(os.getenv('WATCH_RETRY_SECONDS', 60))
+
+# Near-duplicate photos: reuse results of a processed image whose perceptual
+# hash (256-bit dHash) differs by at most DEDUP_MAX_DISTANCE bits
+DEDUP_ENABLED = os.getenv('DEDUP_ENABLED', '1') == '1'
+DEDUP_MAX_DISTANCE = int(os.getenv('DEDUP_MAX_DISTANCE', 12))
+
+# Near-identical OCR texts: images whose texts' 64-bit SimHash differ by at
+# most TEXT_GROUP_MAX_DISTANCE bits share one keyword extraction and search
+# (texts shorter than TEXT_GROUP_MIN_CHARS are never grouped)
+TEXT_GROUP_ENABLED = os.getenv('TEXT_GROUP_ENABLED', '1') == '1'
+TEXT_GROUP_MAX_DISTANCE = int(os.getenv('TEXT_GROUP_MAX_DISTANCE', 10))
+TEXT_GROUP_MIN_CHARS = int(os.getenv('TEXT_GROUP_MIN_CHARS', 80))
+
+# Results are always appended to OUTPUT_FOLDER/results.jsonl; the per-image
+# .txt files are an optional human-readable view of it
+RESULTS_TXT_ENABLED = os.getenv('RESULTS_TXT_ENABLED', '1') == '1'
+
+# Offline full-text search index of the results (python fulltext.py "query")
+FULLTEXT_ENABLED = os.getenv('FULLTEXT_ENABLED', '1') == '1'
+
+# HTML report (export_html.py): images per page of output/report/
+REPORT_PAGE_SIZE = int(os.getenv('REPORT_PAGE_SIZE', 200))
+
 # Supported image formats
 SUPPORTED_FORMATS = ('.png', '.jpg', '.jpeg', '. bmp', '.tiff', '.webp')
 
@@ -56,4 +155,19 @@ YÊU CẦU:
 {text}
 
 Từ khóa:
-""".strip()
\ No newline at end of file
+""".strip()
+# Batch prompt: several OCR texts in one Gemini call, answered as a JSON array
+AI_BATCH_PROMPT_TEMPLATE = """
+Bạn là chuyên gia lọc từ khóa tìm kiếm từ văn bản đã OCR.
+Nhiệm vụ: Với TỪNG văn bản trong mảng JSON dưới đây (mỗi phần tử có "id" và "text"), trích xuất những từ khoá/từ/cụm từ có ý nghĩa thực sự (tên đề, sự kiện, đối tượng, năm, v.v...).
+
+YÊU CẦU:
+- Chỉ giữ các cụm từ hoàn chỉnh, thông tin trọng tâm, tên, thuật ngữ, số, nơi chốn thực tế.
+- **LOẠI BỎ toàn bộ dòng/ký tự lạ, ký hiệu đặc biệt, từ vô nghĩa, tiếng ồn máy OCR.**
+- Mỗi văn bản xử lý độc lập, không trộn thông tin giữa các văn bản.
+- Kết quả cho mỗi văn bản: ngắn gọn dưới 18 từ, **không giải thích**, ngăn cách bằng dấu phẩy (,).
+- Trả về DUY NHẤT một mảng JSON gồm {count} phần tử dạng {{"id": <id>, "keyword": "<từ khóa>"}}.
+
+Đầu vào:
+{items}
+""".strip()
@@ -0,0 +1,388 @@
+"""
+Dedup Module - Near-duplicate detection for images and OCR texts
+
+Images: the same page is often photographed several times or re-saved at another
+JPEG quality, which byte hashes cannot detect. Each processed image gets a
+difference hash (dHash) of its downscaled grayscale thumbnail; a new image
+whose hash is within a small Hamming distance of a processed one reuses
+that image's OCR text, keyword and search results.
+
+Hashes and the reusable results are stored in SQLite, with the pipeline
+settings that produced each result; only results made with the current
+settings are reused. Lookups go through an in-memory BK-tree per settings,
+so finding near matches stays fast as the index grows.
+
+Texts: different images can still OCR to almost the same text (a few
+garbled characters apart). A 64-bit SimHash of each text's character
+4-grams groups such texts, so a group needs one keyword extraction and one
+search, shared by all its members.
+"""
+import hashlib
+import io
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from PIL import Image
+
+from logger import setup_logger
+from preprocess import _jpeg_draft
+
+logger = setup_logger('Main')
+
+
+def dhash(data: bytes, hash_size: int = 16) -> int:
+    """
+    Difference hash: compare horizontally adjacent pixels of a
+    (hash_size + 1) x hash_size grayscale thumbnail; hash_size**2 bits.
+    Robust to re-encoding, rescaling and small brightness changes.
+    """
+    image = Image.open(io.BytesIO(data))
+    if image.format == 'JPEG':
+        # Decoding at 1/8 scale is plenty for a 17x16 thumbnail
+        _jpeg_draft(image, (hash_size * 8, hash_size * 8))
+    thumb = image.convert('L').resize((hash_size + 1, hash_size), Image.BOX)
+    pixels = thumb.tobytes()
+
+    value = 0
+    width = hash_size + 1
+    for row in range(hash_size):
+        offset = row * width
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def simhash(text: str, bits: int = 64, ngram: int = 4) -> int:
+    """
+    SimHash of the character n-grams of a text (lowercased, punctuation and
+    whitespace runs collapsed). A garbled character only changes the n-grams
+    around it, so similar texts get hashes a few bits apart.
+    """
+    normalized = ' '.join(re.findall(r"\w+", unicodedata.normalize('NFC', text).lower()))
+    grams = Counter(normalized[i:i + ngram] for i in range(max(1, len(normalized) - ngram + 1)))
+
+    weights = [0] * bits
+    for gram, count in grams.items():
+        value = int.from_bytes(
+            hashlib.blake2b(gram.encode('utf-8'), digest_size=bits // 8).digest(), 'big'
+        )
+        for bit in range(bits):
+            weights[bit] += count if value >> bit & 1 else -count
+    return sum(1 << bit for bit in range(bits) if weights[bit] > 0)
+
+
+def hamming(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+class BKTree:
+    """Burkhard-Keller tree over integer hashes with Hamming distance"""
+
+    def __init__(self):
+        # Node: [hash, name, {distance: child node}]
+        self._root = None
+        # name -> its current node (one hash per name)
+        self._nodes: Dict[str, list] = {}
+
+    def add(self, value: int, name: str):
+        """Index `name` under `value`, replacing the hash it had before"""
+        self.remove(name)
+        node = [value, name, {}]
+        self._nodes[name] = node
+        if self._root is None:
+            self._root = node
+            return
+        current = self._root
+        while True:
+            distance = hamming(value, current[0])
+            child = current[2].get(distance)
+            if child is None:
+                current[2][distance] = node
+                return
+            current = child
+
+    def remove(self, name: str):
+        """
+        Stop matching `name`. Its node stays in the tree as a tombstone,
+        since the nodes below it are placed by their distance to it.
+        """
+        node = self._nodes.pop(name, None)
+        if node is not None:
+            node[1] = None
+
+    def nearest(
+        self,
+        value: int,
+        max_distance: int,
+        accept: Optional[Callable[[str], bool]] = None
+    ) -> Optional[Tuple[str, int]]:
+        """
+        Closest (name, distance) within max_distance, or None. Names
+        rejected by `accept` are skipped and the search goes on to the next
+        nearest ones.
+        """
+        if self._root is None:
+            return None
+        best = None
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            distance = hamming(value, node[0])
+            if (
+                node[1] is not None and distance <= max_distance
+                and (best is None or distance < best[1])
+                and (accept is None or accept(node[1]))
+            ):
+                best = (node[1], distance)
+            # Triangle inequality: only children in [d - r, d + r] can match
+            radius = best[1] if best is not None else max_distance
+            for child_distance, child in node[2].items():
+                if distance - radius <= child_distance <= distance + radius:
+                    stack.append(child)
+        return best
+
+
+class PerceptualIndex:
+    """Persistent dHash -> processed result index with near-duplicate lookup"""
+
+    def __init__(self, path: Path, max_distance: int = 12, hash_size: int = 16):
+        self.path = Path(path)
+        self.max_distance = max_distance
+        self.hash_size = hash_size
+        self._lock = threading.Lock()
+        # settings signature -> tree of the images processed with those settings
+        self._trees: Dict[str, BKTree] = {}
+        # Images deduplicated in this run: (image, duplicate_of, distance)
+        self.matches: List[Tuple[str, str, int]] = []
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS images ("
+                " name TEXT PRIMARY KEY,"
+                " hash TEXT NOT NULL,"
+                " result TEXT NOT NULL,"
+                " settings TEXT NOT NULL DEFAULT '',"
+                " added REAL NOT NULL DEFAULT 0)"
+            )
+            # Indexes from before settings were recorded: their entries never match
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(images)")}
+            if 'settings' not in columns:
+                self._conn.execute("ALTER TABLE images ADD COLUMN settings TEXT NOT NULL DEFAULT ''")
+                self._conn.execute("ALTER TABLE images ADD COLUMN added REAL NOT NULL DEFAULT 0")
+            for name, hex_hash, settings in self._conn.execute("SELECT name, hash, settings FROM images"):
+                self._tree(settings).add(int(hex_hash, 16), name)
+
+    def _tree(self, settings: str) -> BKTree:
+        tree = self._trees.get(settings)
+        if tree is None:
+            tree = self._trees[settings] = BKTree()
+        return tree
+
+    def hash_file(self, image_path: Path) -> Optional[int]:
+        """dHash of an image file, or None if it cannot be decoded"""
+        try:
+            return dhash(image_path.read_bytes(), self.hash_size)
+        except Exception as e:
+            logger.warning(f"⚠️ Cannot hash {image_path.name}: {e}")
+            return None
+
+    def find(
+        self,
+        value: int,
+        exclude: str,
+        settings: str,
+        since: float = 0.0
+    ) -> Optional[Tuple[str, int, dict]]:
+        """
+        Nearest image (other than `exclude`) within max_distance whose result
+        was produced with `settings`, and indexed at or after `since` (the
+        start of a --force run, whose earlier results must not be reused)
+
+        Returns:
+            (name, distance, stored result) or None
+        """
+        results = {}
+
+        def accept(name: str) -> bool:
+            if name == exclude:
+                return False
+            row = self._conn.execute(
+                "SELECT result FROM images WHERE name = ? AND settings = ? AND added >= ?",
+                (name, settings, since)
+            ).fetchone()
+            if row is None:
+                return False
+            results[name] = row[0]
+            return True
+
+        with self._lock:
+            match = self._tree(settings).nearest(value, self.max_distance, accept)
+        if match is None:
+            return None
+        return match[0], match[1], json.loads(results[match[0]])
+
+    def add(self, name: str, value: int, result: dict, settings: str):
+        """Index a processed image and the result it produced with `settings`"""
+        with self._lock, self._conn:
+            known = self._conn.execute(
+                "SELECT hash, settings FROM images WHERE name = ?", (name,)
+            ).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO images (name, hash, result, settings, added) VALUES (?, ?, ?, ?, ?)",
+                (name, format(value, 'x'), json.dumps(result, ensure_ascii=False), settings, time.time())
+            )
+            # A changed image must no longer match under its old hash
+            if known is None or int(known[0], 16) != value or known[1] != settings:
+                if known is not None:
+                    self._tree(known[1]).remove(name)
+                self._tree(settings).add(value, name)
+
+    def record_match(self, name: str, original: str, distance: int):
+        with self._lock:
+            self.matches.append((name, original, distance))
+
+    def write_report(self, path: Path):
+        """CSV of the images deduplicated in this run"""
+        with self._lock:
+            matches = sorted(self.matches)
+        if not matches:
+            return
+        with open(path, 'w', encoding='utf-8-sig') as f:
+            f.write("image,duplicate_of,hamming_distance\n")
+            for name, original, distance in matches:
+                f.write(f"\"{name}\",\"{original}\",{distance}\n")
+        logger.info(f"🪞 Dedup report: {len(matches)} image(s) reused earlier results -> {path.name}")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# A text group: (representative's name, SimHash of the representative's text)
+GroupKey = Tuple[str, int]
+
+
+class TextGroups:
+    """
+    Groups of near-identical OCR texts (SimHash within max_distance bits)
+    that share stage results. The first text of a group is its
+    representative; the others record (representative, distance).
+
+    Groups are keyed by the representative's name and text hash, so an
+    image whose text changed under the same name (watch mode) gets a new
+    group instead of the results of its old text.
+    """
+
+    def __init__(self, max_distance: int = 10, min_chars: int = 80):
+        self.max_distance = max_distance
+        # Short texts have too few n-grams for a reliable SimHash
+        self.min_chars = min_chars
+        self._lock = threading.Lock()
+        self._tree = BKTree()
+        # name -> (representative, distance, SimHash of its text, group key)
+        self._groups: Dict[str, Tuple[str, int, int, GroupKey]] = {}
+        self._results: Dict[Tuple[Any, str], Any] = {}
+        self._stage_locks: Dict[Tuple[Any, str], threading.Lock] = {}
+        # Members of the groups dropped by reset(), for the report
+        self._reported: Dict[str, Tuple[str, int]] = {}
+
+    def assign(self, name: str, text: str) -> GroupKey:
+        """Group of a text (its own group if it matches none or is too short to compare)"""
+        value = simhash(text)
+        with self._lock:
+            known = self._groups.get(name)
+            if known is not None:
+                if known[2] == value:
+                    return known[3]
+                # Changed text: it no longer represents (or belongs to) its old group
+                self._tree.remove(name)
+                del self._groups[name]
+            if len(text.strip()) < self.min_chars:
+                return name, value
+
+            match = self._tree.nearest(value, self.max_distance)
+            if match is None:
+                self._tree.add(value, name)
+                self._groups[name] = (name, 0, value, (name, value))
+            else:
+                representative, _, _, key = self._groups[match[0]]
+                self._groups[name] = (representative, match[1], value, key)
+                logger.info(
+                    f"🔗 OCR text of {name} matches {representative} "
+                    f"(distance {match[1]}), sharing keyword/search"
+                )
+            return self._groups[name][3]
+
+    def group_of(self, name: str) -> Optional[Tuple[str, int]]:
+        """(representative, distance) if `name` joined another text's group"""
+        with self._lock:
+            group = self._groups.get(name)
+        if group is None or group[0] == name:
+            return None
+        return group[0], group[1]
+
+    def get(self, group: Any, stage: str) -> Optional[Any]:
+        with self._lock:
+            return self._results.get((group, stage))
+
+    def put(self, group: Any, stage: str, value: Any):
+        with self._lock:
+            self._results[(group, stage)] = value
+
+    def shared(self, group: Any, stage: str, compute: Callable[[], Any]) -> Any:
+        """
+        Result of `stage` for a group, computed once: members arriving while
+        it is being computed wait for it instead of calling compute again
+        """
+        with self._lock:
+            lock = self._stage_locks.setdefault((group, stage), threading.Lock())
+        with lock:
+            value = self.get(group, stage)
+            if value is None:
+                value = compute()
+                self.put(group, stage, value)
+            return value
+
+    def reset(self):
+        """
+        Forget every group and shared result (the watch daemon calls this
+        while idle, so memory does not grow with every image it sees)
+        """
+        with self._lock:
+            for name, (representative, distance, _, _) in self._groups.items():
+                if representative != name:
+                    self._reported[name] = (representative, distance)
+            self._tree = BKTree()
+            self._groups.clear()
+            self._results.clear()
+            self._stage_locks.clear()
+
+    def members(self) -> List[Tuple[str, str, int]]:
+        """(text, representative, distance) for every text that joined another's group"""
+        with self._lock:
+            members = dict(self._reported)
+            members.update(
+                (name, (rep, distance))
+                for name, (rep, distance, _, _) in self._groups.items() if rep != name
+            )
+        return sorted((name, rep, distance) for name, (rep, distance) in members.items())
+
+    def write_report(self, path: Path):
+        """CSV of the texts that shared another text's keyword/search in this run"""
+        members = self.members()
+        if not members:
+            return
+        with open(path, 'w', encoding='utf-8-sig') as f:
+            f.write("image,shares_results_of,simhash_distance\n")
+            for name, representative, distance in members:
+                f.write(f"\"{name}\",\"{representative}\",{distance}\n")
+        logger.info(f"🔗 Text groups: {len(members)} image(s) shared keyword/search -> {path.name}")
@@ -1,119 +1,116 @@
 """
-Export results as HTML for better viewing (curly braces FIXED!)
+Export results as HTML for better viewing
+
+Reads the structured results store (results*.jsonl), not the .txt views,
+and streams cards straight to the files: memory stays constant and the time
+linear in the number of results.
+
+The report is split into pages of REPORT_PAGE_SIZE images (output/report/
+page-NNNN.html) plus a small index.html. A page is rewritten only when the
+results on it changed since the last export (tracked in report/.pages.json).
+Card contents sit in <template> elements and are rendered as they scroll
+into view, so even a full page opens quickly.
+
+`--single` writes everything to one summary_report.html instead; its totals
+header is written after the cards and moved to the top by CSS (flex order).
 """
 from pathlib import Path
 from datetime import datetime
+from html import escape
+from typing import Dict, List, TextIO
+import argparse
+import json
 import sys
 import os
 
-def create_html_report(output_folder:  str = "output"):
-    """Create a single HTML file with all results"""
-    
-    # Get absolute path
-    if not os.path.isabs(output_folder):
-        output_path = Path(os.getcwd()) / output_folder
-    else:
-        output_path = Path(output_folder)
-    
-    if not output_path.exists():
-        print(f"❌ Output folder not found: {output_path}")
-        return None
-
-    print(f"📁 Checking folder: {output_path}")
+from cache import hash_key
+from config import REPORT_PAGE_SIZE
+from results_store import index_results, iter_results
 
-    txt_files = list(output_path.glob("*.txt"))
-    if not txt_files:  
-        print(f"❌ No .txt files found in {output_path}")
-        print(f"\n📋 All files in folder:")
-        for file in output_path.iterdir():
-            print(f"   - {file.name}")
-        return None
+REPORT_DIR = "report"
 
-    print(f"📊 Found {len(txt_files)} result file(s):")
-    for f in txt_files:
-        print(f"   ✅ {f.name}")
+# Bump when the page markup changes, so every page is rewritten once
+_PAGE_VERSION = "1"
 
-    # HTML CSS braces are escaped below!
-    html_content = """<!DOCTYPE html>
-<html lang="vi">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>OCR Results Summary</title>
-    <style>
-        * {{ margin: 0; padding: 0; box-sizing:  border-box; }}
-        body {{
+_STYLE = """        * { margin: 0; padding: 0; box-sizing:  border-box; }
+        body {
             font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
             background:  linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             padding: 20px;
             min-height: 100vh;
-        }}
-        .container {{
+        }
+        .container {
             max-width: 1200px;
             margin: 0 auto;
-        }}
-        .header {{
+            display: flex;
+            flex-direction: column;
+        }
+        /* Rendered last (totals are known only at the end), shown first */
+        .header {
+            order: -1;
+        }
+        .header {
             background: white;
             padding: 30px;
             border-radius: 15px;
             margin-bottom: 20px;
             box-shadow: 0 10px 30px rgba(0,0,0,0.3);
-        }}
-        h1 {{
+        }
+        h1 {
             color: #667eea; 
             margin-bottom: 10px;
             font-size: 32px;
-        }}
-        .timestamp {{
+        }
+        .timestamp {
             color: #666; 
             font-size: 14px;
-        }}
-        .stats {{
+        }
+        .stats {
             display: grid;
             grid-template-columns: repeat(auto-fit, minmax(150px, 1fr));
             gap: 15px;
             margin-top: 20px;
-        }}
-        .stat-box {{
+        }
+        .stat-box {
             background:  linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             padding: 20px;
             border-radius: 10px;
             text-align: center;
-        }}
-        .stat-number {{
+        }
+        .stat-number {
             font-size: 36px;
             font-weight:  bold;
             margin-bottom: 5px;
-        }}
-        .stat-label {{ 
+        }
+        .stat-label { 
             font-size: 14px;
             opacity: 0.9;
-        }}
-        .result-card {{
+        }
+        .result-card {
             background: white;
             padding: 30px;
             margin-bottom: 20px;
             border-radius: 15px;
             box-shadow: 0 5px 20px rgba(0,0,0,0.2);
             transition: transform 0.3s;
-        }}
-        .result-card:hover {{
+        }
+        .result-card:hover {
             transform: translateY(-5px);
             box-shadow: 0 10px 30px rgba(0,0,0,0.3);
-        }}
-        .result-title {{
+        }
+        .result-title {
             color: #667eea;
             font-size: 24px;
             font-weight: bold;
             margin-bottom: 20px;
             padding-bottom: 15px;
             border-bottom: 3px solid #667eea;
-        }}
-        .section {{
+        }
+        .section {
             margin: 25px 0;
-        }}
-        .section-title {{
+        }
+        .section-title {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             padding: 12px 20px;
@@ -121,8 +118,8 @@ def create_html_report(output_folder:  str = "output"):
             font-weight: bold;
             margin-bottom: 15px;
             font-size: 16px;
-        }}
-        .content {{
+        }
+        .content {
             padding: 20px;
             background: #f9f9f9;
             border-radius: 8px;
@@ -133,185 +130,441 @@ def create_html_report(output_folder:  str = "output"):
             max-height: 400px;
             overflow-y: auto;
             border-left: 4px solid #667eea;
-        }}
-        .url-list {{
+        }
+        .url-list {
             list-style: none;
             padding: 0;
-        }}
-        .url-list li {{
+        }
+        .url-list li {
             padding: 15px;
             margin: 10px 0;
             background: #f0f0f0;
             border-radius: 8px;
             border-left: 4px solid #667eea;
             transition: all 0.3s;
-        }}
-        .url-list li:hover {{
+        }
+        .url-list li:hover {
             background: #e0e0e0;
             transform: translateX(5px);
-        }}
-        .url-list a {{
+        }
+        .url-list a {
             color: #667eea;
             text-decoration: none;
             word-break: break-all;
             font-size: 14px;
-        }}
-        .url-list a:hover {{ 
+        }
+        .url-list a:hover { 
             text-decoration: underline;
-        }}
-        .footer {{
+        }
+        .footer {
             background: white;
             padding: 20px;
             border-radius: 15px;
             text-align: center;
             margin-top: 20px;
             color: #666;
-        }}
-        .no-results {{
+        }
+        .meta {
+            color: #666;
+            font-size: 13px;
+            margin-top: -10px;
+        }
+        .no-results {
             color: #999;
             font-style: italic;
             padding: 20px;
             text-align: center;
-        }}
-    </style>
+        }
+        .nav {
+            display: flex;
+            gap: 10px;
+            flex-wrap: wrap;
+            margin-bottom: 20px;
+        }
+        .nav a, .nav button {
+            background: white;
+            color: #667eea;
+            padding: 10px 18px;
+            border: none;
+            border-radius: 8px;
+            font-size: 14px;
+            font-weight: bold;
+            text-decoration: none;
+            cursor: pointer;
+        }
+        .page-list {
+            list-style: none;
+            margin-top: 20px;
+        }
+        .page-list li {
+            padding: 12px 15px;
+            margin: 8px 0;
+            background: #f0f0f0;
+            border-radius: 8px;
+            border-left: 4px solid #667eea;
+        }
+        .page-list a {
+            color: #667eea;
+            font-weight: bold;
+        }
+        /* Placeholder size of a card whose content is not rendered yet */
+        .result-card.lazy {
+            min-height: 160px;
+        }
+"""
+
+
+def _head(title: str) -> str:
+    return f"""<!DOCTYPE html>
+<html lang="vi">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{escape(title)}</title>
+    <style>
+{_STYLE}    </style>
 </head>
 <body>
     <div class="container">
-        <div class="header">
-            <h1>📊 Báo Cáo Kết Quả OCR</h1>
-            <div class="timestamp">⏰ Tạo lúc: {timestamp}</div>
-            <div class="stats">
-                <div class="stat-box">
-                    <div class="stat-number">{total}</div>
-                    <div class="stat-label">Ảnh đã xử lý</div>
-                </div>
-                <div class="stat-box">
-                    <div class="stat-number">{total_chars}</div>
-                    <div class="stat-label">Ký tự trích xuất</div>
-                </div>
-                <div class="stat-box">
-                    <div class="stat-number">{total_urls}</div>
-                    <div class="stat-label">Liên kết tìm được</div>
-                </div>
-            </div>
+"""
+
+
+_HEAD = _head("OCR Results Summary")
+
+_FOOTER = """        <div class="footer">
+            <p>🤖 Generated by DA2_OCR Pipeline</p>
+            <p>N08-Viet Long-Tan Long-Tuan Kiet-Hoang Long-Huu Loc</p>
+            <p>Powered by Tesseract OCR + Gemini AI + DuckDuckGo Search</p>
         </div>
 """
 
-    total_chars = 0
-    total_urls = 0
+_STAT_LABELS = (
+    ('total', 'Ảnh đã xử lý'),
+    ('total_chars', 'Ký tự trích xuất'),
+    ('total_urls', 'Liên kết tìm được'),
+)
 
-    # Process each result file
-    for txt_file in sorted(txt_files):
-        print(f"\n   Processing: {txt_file.name}")
-        try:
-            with open(txt_file, 'r', encoding='utf-8-sig', errors='ignore') as f:
-                content = f.read()
-
-            filename = txt_file.stem
-            lines = content.split('\n')
-            ocr_text = ""
-            keyword = ""
-            urls = []
-
-            current_section = None
-
-            for line in lines:
-                if '[1]' in line and 'VĂN BẢN' in line: 
-                    current_section = 'ocr'
-                    continue
-                elif '[2]' in line and 'TỪ KHÓA' in line:
-                    current_section = 'keyword'
-                    continue
-                elif '[3]' in line and 'KẾT QUẢ' in line:
-                    current_section = 'urls'
-                    continue
-                elif line.startswith('---') or line.startswith('===') or 'Xử lý hoàn tất' in line or 'Thời gian' in line or 'KẾT QUẢ XỬ LÝ' in line:
-                    continue
-
-                # Collect content based on section
-                if current_section == 'ocr' and line.strip():
-                    ocr_text += line + '\n'
-                elif current_section == 'keyword' and line.strip():
-                    keyword += line + ' '
-                elif current_section == 'urls' and line.strip():
-                    if '.' in line and ('http' in line or line[0].isdigit()):
-                        urls.append(line.strip())
-
-            total_chars += len(ocr_text)
-            total_urls += len(urls)
-
-            print(f"      OCR text: {len(ocr_text)} chars")
-            print(f"      Keyword: {len(keyword.strip())} chars")
-            print(f"      URLs: {len(urls)} found")
-
-            # Add to HTML
-            html_content += f"""
-        <div class="result-card">
-            <div class="result-title">📄 {filename}</div>
+_TIMING_LABELS = {'ocr': 'OCR', 'keyword': 'Từ khóa', 'search': 'Tìm kiếm'}
+
+
+def _render_url(num: int, url: str) -> str:
+    text = escape(url)
+    if not url.lower().startswith(('http://', 'https://')):
+        # Only web links are clickable (no javascript: or file: URLs)
+        return f'                    <li><strong>{num}.</strong> {text}</li>\n'
+    return (
+        f'                    <li><strong>{num}.</strong> '
+        f'<a href="{escape(url, quote=True)}" target="_blank" rel="noopener">{text}</a></li>\n'
+    )
 
+
+def render_card(record: dict, lazy: bool = False) -> str:
+    """
+    HTML card of one result record, with every value escaped. A lazy card
+    keeps its sections in an inert <template> until it is scrolled to.
+    """
+    meta = []
+    ocr = record.get('ocr')
+    if ocr:
+        meta.append(f"OCR: {ocr['method']}")
+    timings = record.get('timings') or {}
+    meta += [f"{_TIMING_LABELS.get(stage, stage)} {seconds:.2f}s" for stage, seconds in timings.items()]
+    if record.get('duplicate_of'):
+        meta.append(f"Trùng với ảnh {record['duplicate_of']['image']}")
+    if record.get('text_group'):
+        meta.append(f"Dùng chung kết quả với {record['text_group']['image']}")
+    meta_line = escape(f"⏱️ {' · '.join(meta)}") if meta else ""
+
+    ocr_text = record['text'].strip()
+    keyword = record['keyword'].strip()
+    parts = [f"""        <div class="result-card{' lazy' if lazy else ''}">
+            <div class="result-title">📄 {escape(record['image'])}</div>
+            <div class="meta">{meta_line}</div>
+"""]
+    if lazy:
+        parts.append("            <template>\n")
+    parts.append(f"""
             <div class="section">
                 <div class="section-title">🔍 [1] VĂN BẢN GỐC (OCR)</div>
-                <div class="content">{ocr_text.strip() if ocr_text.strip() else '<div class="no-results">Không có dữ liệu</div>'}</div>
+                <div class="content">{escape(ocr_text) if ocr_text else '<div class="no-results">Không có dữ liệu</div>'}</div>
             </div>
 
             <div class="section">
                 <div class="section-title">🎯 [2] TỪ KHÓA TÌM KIẾM</div>
-                <div class="content">{keyword.strip() if keyword.strip() else '<div class="no-results">Không có từ khóa</div>'}</div>
+                <div class="content">{escape(keyword) if keyword else '<div class="no-results">Không có từ khóa</div>'}</div>
             </div>
 
             <div class="section">
                 <div class="section-title">🔗 [3] KẾT QUẢ TÌM KIẾM</div>
+""")
+    if record['urls']:
+        parts.append('                <ul class="url-list">\n')
+        parts += [_render_url(num, url) for num, url in enumerate(record['urls'], 1)]
+        parts.append('                </ul>\n')
+    else:
+        parts.append('                <div class="content"><div class="no-results">Không tìm thấy kết quả</div></div>\n')
+    parts.append("            </div>\n")
+    if lazy:
+        parts.append("            </template>\n")
+    parts.append("        </div>\n")
+    return ''.join(parts)
+
+
+def render_header(stats: Dict[str, int]) -> str:
+    """Title, timestamp and totals"""
+    boxes = ''.join(
+        f"""                <div class="stat-box">
+                    <div class="stat-number">{stats[key]:,}</div>
+                    <div class="stat-label">{label}</div>
+                </div>
+""" for key, label in _STAT_LABELS
+    )
+    return f"""        <div class="header">
+            <h1>📊 Báo Cáo Kết Quả OCR</h1>
+            <div class="timestamp">⏰ Tạo lúc: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}</div>
+            <div class="stats">
+{boxes}            </div>
+        </div>
+"""
+
+
+_LAZY_SCRIPT = """    <script>
+    (function () {
+        function render(card) {
+            var template = card.querySelector('template');
+            if (!template) return;
+            card.appendChild(template.content.cloneNode(true));
+            template.remove();
+            card.classList.remove('lazy');
+        }
+        var cards = Array.prototype.slice.call(document.querySelectorAll('.result-card.lazy'));
+        document.getElementById('render-all').onclick = function () { cards.forEach(render); };
+        if (!('IntersectionObserver' in window)) { cards.forEach(render); return; }
+        var observer = new IntersectionObserver(function (entries) {
+            entries.forEach(function (entry) {
+                if (entry.isIntersecting) {
+                    observer.unobserve(entry.target);
+                    render(entry.target);
+                }
+            });
+        }, { rootMargin: '800px 0px' });
+        cards.forEach(function (card) { observer.observe(card); });
+    })();
+    </script>
 """
 
-            if urls:
-                html_content += '                <ul class="url-list">\n'
-                for url_line in urls:
-                    if '. ' in url_line:
-                        parts = url_line.split('. ', 1)
-                        if len(parts) == 2 and parts[0].isdigit():
-                            num, url = parts
-                            html_content += f'                    <li><strong>{num}.</strong> <a href="{url}" target="_blank">{url}</a></li>\n'
-                        else:
-                            html_content += f'                    <li>{url_line}</li>\n'
-                    else:
-                        html_content += f'                    <li>{url_line}</li>\n'
-                html_content += '                </ul>\n'
-            else:
-                html_content += '                <div class="content"><div class="no-results">Không tìm thấy kết quả</div></div>\n'
-
-            html_content += """            </div>
+
+def _page_name(number: int) -> str:
+    return f"page-{number:04d}.html"
+
+
+def _write_atomic(path: Path, write) -> Dict[str, int]:
+    """Call write(f) on a temp file, then move it over `path`"""
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        result = write(f)
+    os.replace(tmp_path, path)
+    return result
+
+
+def write_page(
+    output_path: Path,
+    index: Dict[str, tuple],
+    images: List[str],
+    number: int,
+    is_last: bool,
+    f: TextIO
+) -> Dict[str, int]:
+    """Stream one report page (lazy cards for `images`) to `f`; returns its totals"""
+    stats = {'total': 0, 'total_chars': 0, 'total_urls': 0}
+    f.write(_head(f"OCR Results - Trang {number}"))
+    nav = ['            <a href="index.html">📚 Mục lục</a>\n']
+    if number > 1:
+        nav.append(f'            <a href="{_page_name(number - 1)}">⬅ Trang trước</a>\n')
+    if not is_last:
+        nav.append(f'            <a href="{_page_name(number + 1)}">Trang sau ➡</a>\n')
+    nav.append('            <button id="render-all">Hiện tất cả (để tìm kiếm Ctrl-F)</button>\n')
+    f.write(f"""        <div class="header">
+            <h1>📄 Trang {number}</h1>
+            <div class="timestamp">{escape(images[0])} … {escape(images[-1])} ({len(images)} ảnh)</div>
+        </div>
+        <div class="nav">
+{''.join(nav)}        </div>
+""")
+    for record in iter_results(output_path, index, images):
+        f.write(render_card(record, lazy=True))
+        stats['total'] += 1
+        stats['total_chars'] += len(record['text'])
+        stats['total_urls'] += len(record['urls'])
+    f.write(_FOOTER)
+    f.write("    </div>\n")
+    f.write(_LAZY_SCRIPT)
+    f.write("</body>\n</html>\n")
+    return stats
+
+
+def render_index(pages: List[dict]) -> str:
+    """Index page: overall totals and one link per page"""
+    stats = {
+        key: sum(page[key] for page in pages)
+        for key in ('total', 'total_chars', 'total_urls')
+    }
+    links = ''.join(
+        f"""                <li><a href="{_page_name(number)}">Trang {number}</a> — """
+        f"""{escape(page['first'])} … {escape(page['last'])} ({page['total']} ảnh)</li>
+"""
+        for number, page in enumerate(pages, 1)
+    )
+    return (
+        _head("OCR Results Summary")
+        + render_header(stats)
+        + f"""        <div class="result-card">
+            <div class="result-title">📚 Danh sách trang</div>
+            <ul class="page-list">
+{links}            </ul>
         </div>
 """
-        except Exception as e:
-            print(f"      ⚠️ Error:  {e}")
+        + _FOOTER
+        + "    </div>\n</body>\n</html>\n"
+    )
+
+
+def update_paged_report(output_path: Path, page_size: int = REPORT_PAGE_SIZE) -> Dict[str, int]:
+    """
+    Write report/index.html and the pages whose results changed
+
+    Returns:
+        Counts: images, pages, written (pages rewritten this time)
+    """
+    page_size = max(1, page_size)
+    report_dir = output_path / REPORT_DIR
+    report_dir.mkdir(exist_ok=True)
+    state_file = report_dir / ".pages.json"
+
+    previous = []
+    if state_file.exists():
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') == _PAGE_VERSION and state.get('page_size') == page_size:
+                previous = state['pages']
+        except (OSError, ValueError, KeyError):
+            previous = []
+
+    index = index_results(output_path)
+    images = sorted(index)
+    chunks = [images[i:i + page_size] for i in range(0, len(images), page_size)]
+
+    pages = []
+    written = 0
+    for number, chunk in enumerate(chunks, 1):
+        is_last = number == len(chunks)
+        # A page depends on its images' latest records and on its "next" link
+        digest = hash_key(str(is_last), *(f"{image}@{index[image][2]!r}" for image in chunk))
+        page_file = report_dir / _page_name(number)
+        old = previous[number - 1] if number <= len(previous) else None
+        if old is not None and old['digest'] == digest and page_file.exists():
+            pages.append(old)
+            continue
+
+        stats = _write_atomic(
+            page_file, lambda f: write_page(output_path, index, chunk, number, is_last, f)
+        )
+        pages.append({'digest': digest, 'first': chunk[0], 'last': chunk[-1], **stats})
+        written += 1
+
+    # Pages beyond the new last one
+    for stale in report_dir.glob("page-*.html"):
+        if stale.name not in {_page_name(n) for n in range(1, len(chunks) + 1)}:
+            stale.unlink()
+
+    _write_atomic(report_dir / "index.html", lambda f: f.write(render_index(pages)))
+    _write_atomic(
+        state_file,
+        lambda f: json.dump(
+            {'version': _PAGE_VERSION, 'page_size': page_size, 'pages': pages},
+            f, ensure_ascii=False
+        )
+    )
+    return {'images': len(images), 'pages': len(chunks), 'written': written}
+
+
+def write_report(output_path: Path, f: TextIO) -> Dict[str, int]:
+    """Stream the report for every result in `output_path` to `f`; returns the totals"""
+    stats = {'total': 0, 'total_chars': 0, 'total_urls': 0}
+    f.write(_HEAD)
+    for record in iter_results(output_path):
+        f.write(render_card(record))
+        stats['total'] += 1
+        stats['total_chars'] += len(record['text'])
+        stats['total_urls'] += len(record['urls'])
+    f.write(render_header(stats))
+    f.write(_FOOTER)
+    f.write("    </div>\n</body>\n</html>\n")
+    return stats
+
+
+def create_html_report(
+    output_folder:  str = "output",
+    single: bool = False,
+    page_size: int = REPORT_PAGE_SIZE
+):
+    """Create the paged HTML report (or, if `single`, one HTML file with all results)"""
+    
+    # Get absolute path
+    if not os.path.isabs(output_folder):
+        output_path = Path(os.getcwd()) / output_folder
+    else:
+        output_path = Path(output_folder)
+    
+    if not output_path.exists():
+        print(f"❌ Output folder not found: {output_path}")
+        return None
+
+    print(f"📁 Checking folder: {output_path}")
+
+    if not single:
+        try:
+            counts = update_paged_report(output_path, page_size)
+        except Exception as e: 
+            print(f"\n❌ Error creating HTML report: {e}")
             import traceback
             traceback.print_exc()
+            return None
 
-    html_content += """        <div class="footer">
-            <p>🤖 Generated by DA2_OCR Pipeline</p>
-            <p>N08-Viet Long-Tan Long-Tuan Kiet-Hoang Long-Huu Loc</p>
-            <p>Powered by Tesseract OCR + Gemini AI + DuckDuckGo Search</p>
-        </div>
-    </div>
-</body>
-</html>"""
+        if not counts['images']:
+            print(f"❌ No results found in {output_path} (results.jsonl)")
+            print("   Run main.py first; results saved by older versions need to be processed again")
+            return None
+
+        html_file = output_path / REPORT_DIR / "index.html"
+        print("\n✅ HTML report updated successfully!")
+        print(f"📁 Location: {html_file.absolute()}")
+        print("📊 Stats:")
+        print(f"   - Images:  {counts['images']}")
+        print(f"   - Pages: {counts['pages']} ({counts['written']} rewritten, "
+              f"{counts['pages'] - counts['written']} unchanged)")
+        return html_file
 
     html_file = output_path / "summary_report.html"
+    tmp_file = html_file.with_suffix('.tmp')
     try:
-        with open(html_file, 'w', encoding='utf-8') as f:
-            f.write(html_content.format(
-                timestamp=datetime.now().strftime('%d/%m/%Y %H:%M:%S'),
-                total=len(txt_files),
-                total_chars=total_chars,
-                total_urls=total_urls
-            ))
-
-        print(f"\n✅ HTML report created successfully!")
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            stats = write_report(output_path, f)
+
+        if not stats['total']:
+            tmp_file.unlink()
+            print(f"❌ No results found in {output_path} (results.jsonl)")
+            print("   Run main.py first; results saved by older versions need to be processed again")
+            return None
+        os.replace(tmp_file, html_file)
+
+        print("\n✅ HTML report created successfully!")
         print(f"📁 Location: {html_file.absolute()}")
-        print(f"📊 Stats:")
-        print(f"   - Files:  {len(txt_files)}")
-        print(f"   - Characters: {total_chars:,}")
-        print(f"   - URLs: {total_urls}")
+        print("📊 Stats:")
+        print(f"   - Images:  {stats['total']}")
+        print(f"   - Characters: {stats['total_chars']:,}")
+        print(f"   - URLs: {stats['total_urls']}")
 
         return html_file
 
@@ -327,16 +580,24 @@ if __name__ == "__main__":
     print("="*60)
     print(f"📂 Current working directory: {os.getcwd()}")
 
-    result = create_html_report()
+    parser = argparse.ArgumentParser(description="Export OCR results as HTML")
+    parser.add_argument("output_folder", nargs="?", default="output")
+    parser.add_argument("--single", action="store_true",
+                        help="Write one summary_report.html instead of paged report/")
+    parser.add_argument("--page-size", type=int, default=REPORT_PAGE_SIZE,
+                        help=f"Images per report page (default: {REPORT_PAGE_SIZE})")
+    args = parser.parse_args()
+
+    result = create_html_report(args.output_folder, single=args.single, page_size=args.page_size)
 
     if result:
         print(f"\n{'='*60}")
         print("🎉 Success!")
         print(f"{'='*60}")
         print(f"📂 File location: {result}")
-        print(f"\n💡 To open in browser:")
+        print("\n💡 To open in browser:")
         print(f"   Invoke-Item \"{result}\"")
-        print(f"   or double-click the file in File Explorer")
+        print("   or double-click the file in File Explorer")
     else:
         print(f"\n{'='*60}")
         print("❌ Failed to create report")
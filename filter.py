@@ -1,47 +1,190 @@
 """
 AI Filter Module - Phiên bản MỞ KHÓA (Tắt Safety Filter & Tăng Max Tokens)
 """
-import requests
 import re
 import time
 import json
+import unicodedata
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
 from logger import setup_logger
-from config import GEMINI_API_KEY, AI_PROMPT_TEMPLATE
+from ratelimit import get_backend, parse_retry_after, backoff_delay
+from cache import DiskCache, hash_key
+from httpclient import create_session
+from metrics import metrics
+from keywords import OfflineKeywordExtractor
+from config import (
+    GEMINI_API_KEY,
+    AI_PROMPT_TEMPLATE,
+    AI_BATCH_PROMPT_TEMPLATE,
+    GEMINI_BATCH_SIZE,
+    GEMINI_BATCH_CHARS,
+    GEMINI_STREAM,
+    GEMINI_STREAM_MAX_TOKENS,
+    KEYWORD_MODE,
+    GEMINI_INPUT_BUDGET,
+    CACHE_FOLDER,
+    HTTP_POOL_SIZE,
+    KEYWORD_CACHE_ENABLED,
+    KEYWORD_CACHE_TTL_HOURS,
+    KEYWORD_CACHE_MAX_MB
+)
 
 logger = setup_logger('Filter')
 
+
+_NOISE_RE = re.compile(r'[^\w\s]|_')
+# \w đã bao gồm chữ tiếng Việt có dấu
+_FALLBACK_RE = re.compile(r'[^\w\s\-]')
+
+KEYWORD_MODES = ('gemini', 'offline')
+
+# Cấu trúc JSON bắt buộc cho câu trả lời của lời gọi gộp
+_BATCH_SCHEMA = {
+    "type": "ARRAY",
+    "items": {
+        "type": "OBJECT",
+        "properties": {"id": {"type": "INTEGER"}, "keyword": {"type": "STRING"}},
+        "required": ["id", "keyword"]
+    }
+}
+
+T = TypeVar('T')
+
+
+def normalize_text(text: str) -> str:
+    """Chuẩn hóa văn bản OCR làm khóa cache: NFC, chữ thường, bỏ ký hiệu rác, gộp khoảng trắng"""
+    text = unicodedata.normalize('NFC', text).lower()
+    text = _NOISE_RE.sub(' ', text)
+    return ' '.join(text.split())
+
+
 class AIKeywordExtractor:
-    def __init__(self, api_key: str = GEMINI_API_KEY):
+    def __init__(
+        self,
+        api_key: str = GEMINI_API_KEY,
+        use_cache: bool = KEYWORD_CACHE_ENABLED,
+        pool_size: int = HTTP_POOL_SIZE,
+        batch_size: int = GEMINI_BATCH_SIZE,
+        batch_chars: int = GEMINI_BATCH_CHARS,
+        stream: bool = GEMINI_STREAM,
+        mode: str = KEYWORD_MODE,
+        input_budget: int = GEMINI_INPUT_BUDGET
+    ):
+        if mode not in KEYWORD_MODES:
+            raise ValueError(f"Unknown keyword mode: {mode}")
+        self.mode = mode
         self.api_key = api_key
-        self.model_name = "gemini-2.5-flash" 
+        self.batch_size = max(1, batch_size)
+        self.batch_chars = batch_chars
+        # Số ký tự OCR tối đa gửi lên Gemini cho mỗi văn bản (sau khi nén)
+        self.input_budget = input_budget
+        self.model_name = "gemini-2.5-flash"
+        # Từ khóa của lời gọi đơn lẻ và lời gọi gộp dùng chung cache: đổi prompt nào cũng ra khóa mới
+        self.prompt_hash = hash_key(AI_PROMPT_TEMPLATE, AI_BATCH_PROMPT_TEMPLATE)[:16]
         self.api_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model_name}:generateContent?key={api_key}"
+        # Streaming (SSE): đọc tới dòng từ khóa đầu tiên rồi ngắt, không chờ phần còn lại
+        self.stream = stream
+        self.stream_url = f"https://generativelanguage.googleapis.com/v1beta/models/{self.model_name}:streamGenerateContent?alt=sse&key={api_key}"
+        # Giới hạn tốc độ + circuit breaker (dùng chung giữa các luồng và các instance)
+        self.backend = get_backend('gemini')
+        # Kết nối keep-alive: chỉ lần đầu mới tốn TLS handshake
+        self.session = create_session('gemini', pool_size)
+        
+        # Cache từ khóa: đổi prompt hoặc model -> khóa mới, mục cũ tự hết hạn theo TTL
+        self.cache = None
+        if use_cache:
+            self.cache = DiskCache(
+                CACHE_FOLDER / "keywords.sqlite3",
+                max_bytes=KEYWORD_CACHE_MAX_MB * 1024 * 1024,
+                name="keywords",
+                ttl=KEYWORD_CACHE_TTL_HOURS * 3600
+            )
+        
+        # Trích từ khóa offline (RAKE + TF-IDF): chế độ chính khi mode='offline',
+        # phương án dự phòng khi Gemini lỗi; thống kê tần suất tích lũy qua mọi văn bản
+        self.offline = OfflineKeywordExtractor(CACHE_FOLDER / "keyword_df.json")
         
-        if not api_key:
+        if mode == 'offline':
+            logger.info("📴 Chế độ từ khóa offline (không gọi Gemini)")
+        elif not api_key:
             logger.warning("⚠️ Chưa cấu hình GEMINI_API_KEY!")
 
+    def close(self):
+        """Đóng các kết nối keep-alive, lưu thống kê từ khóa offline"""
+        self.session.close()
+        self.offline.save()
+
     def fallback_extract(self, text: str) -> str:
-        """Phương án dự phòng"""
+        """Phương án dự phòng: từ khóa offline, hoặc cắt 100 ký tự đầu nếu không có"""
         logger.info("Using fallback (No AI)")
-        text = re.sub(r'[^\w\sàáạảãâầấậẩẫăằắặẳẵèéẹẻẽêềếệểễìíịỉĩòóọỏõôồốộổỗơờớợởỡùúụủũưừứựửữỳýỵỷỹđÀÁẠẢÃÂẦẤẬẨẪĂẰẮẶẲẴÈÉẸẺẼÊỀẾỆỂỄÌÍỊỈĨÒÓỌỎÕÔỒỐỘỔỖƠỜỚỢỞỠÙÚỤỦŨƯỪỨỰỬỮỲÝỴỶỸĐ\-]', ' ', text)
+        keyword = self.offline.extract(text)
+        if keyword:
+            logger.info(f"📴 Offline keywords: '{keyword}'")
+            return keyword
+        text = _FALLBACK_RE.sub(' ', text)
         text = ' '.join(text.split())
         return text[:100].strip()
 
-    def extract_keyword(self, raw_text: str, timeout: int = 60) -> str:
-        if not raw_text.strip(): return ""
-        if not self.api_key: return self.fallback_extract(raw_text)
+    def settings_signature(self) -> str:
+        """Các thiết lập ảnh hưởng tới từ khóa (model + hash của prompt, hoặc chế độ offline)"""
+        if self.mode == 'offline':
+            return "model=offline-rake"
+        return f"model={self.model_name}|prompt={self.prompt_hash}|input={self.input_budget}"
 
-        max_retries = 3
-        prompt = AI_PROMPT_TEMPLATE.format(text=raw_text[:2500]) # Gửi nhiều text hơn chút
-        
-        headers = {'Content-Type': 'application/json'}
-        
+    def cache_key(self, raw_text: str) -> str:
+        return hash_key(normalize_text(raw_text), self.settings_signature())
+
+    def compact(self, raw_text: str) -> str:
+        """Nén văn bản OCR (bỏ dòng trùng, ký tự rác, giữ dòng nhiều thông tin) cho vừa input_budget"""
+        text = self.offline.compact(raw_text, self.input_budget)
+        if not text:
+            # Bộ lọc bỏ hết mọi dòng (chỉ toàn "rác" OCR): gửi văn bản gốc cắt theo
+            # ngân sách thay vì một prompt rỗng
+            text = ' '.join(raw_text.split())[:self.input_budget]
+        logger.info(f"✂️ Nén văn bản: {len(raw_text)} → {len(text)} ký tự")
+        return text
+
+    @staticmethod
+    def retry_delay(response) -> Optional[float]:
+        """Thời gian chờ server yêu cầu: header Retry-After, hoặc RetryInfo.retryDelay trong body lỗi"""
+        delay = parse_retry_after(response.headers.get('Retry-After'))
+        if delay is not None:
+            return delay
+        try:
+            for detail in response.json()['error'].get('details', []):
+                if 'retryDelay' in detail:
+                    return float(str(detail['retryDelay']).rstrip('s'))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            pass
+        return None
+
+    def _request_body(
+        self,
+        prompt: str,
+        max_output_tokens: int = 500,
+        json_schema: Optional[dict] = None,
+        thinking: bool = True
+    ) -> dict:
+        """
+        Body của generateContent (tắt safety filter)
+
+        json_schema: bắt buộc trả về JSON theo cấu trúc này
+        thinking=False: tắt "thinking" của gemini-2.5 (token suy nghĩ tính vào
+        maxOutputTokens và làm chậm token đầu tiên)
+        """
         # === CẤU HÌNH QUAN TRỌNG ĐỂ KHÔNG BỊ CẮT NGANG ===
-        data = {
+        generation_config = {
+            "temperature": 0.3,
+            "maxOutputTokens": max_output_tokens,  # 500 (trước là 100-200) để nó nói thoải mái
+        }
+        if not thinking:
+            generation_config["thinkingConfig"] = {"thinkingBudget": 0}
+        if json_schema is not None:
+            generation_config["responseMimeType"] = "application/json"
+            generation_config["responseSchema"] = json_schema
+        return {
             "contents": [{"parts": [{"text": prompt}]}],
-            "generationConfig": {
-                "temperature": 0.3,
-                "maxOutputTokens": 500,  # Tăng lên 500 (trước là 100-200) để nó nói thoải mái
-            },
+            "generationConfig": generation_config,
             # TẮT BỘ LỌC AN TOÀN (Quan trọng nhất)
             # Giúp AI không bị hoang tưởng khi thấy ký tự lạ từ OCR
             "safetySettings": [
@@ -52,59 +195,282 @@ class AIKeywordExtractor:
             ]
         }
 
+    @staticmethod
+    def _read_first_line(response) -> Tuple[str, Optional[str]]:
+        """
+        Đọc luồng SSE của streamGenerateContent, dừng ngay khi có dòng đầu
+        tiên hoàn chỉnh (từ khóa) và đóng kết nối
+
+        Returns:
+            (text, finish_reason); finish_reason là None nếu dừng sớm
+        """
+        # SSE không khai báo charset, requests sẽ đoán ISO-8859-1
+        response.encoding = 'utf-8'
+        text, finish_reason = '', None
+        try:
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                candidate = json.loads(line[5:])['candidates'][0]
+                finish_reason = candidate.get('finishReason', finish_reason)
+                for part in candidate.get('content', {}).get('parts', []):
+                    if not part.get('thought'):
+                        text += part.get('text', '')
+
+                first, newline, _ = text.lstrip().partition('\n')
+                if newline and first.strip():
+                    return first, None
+            return text, finish_reason
+        finally:
+            response.close()
+
+    def _generate(
+        self,
+        data: dict,
+        parse: Callable[[str], Optional[T]],
+        timeout: int = 60,
+        max_retries: int = 3,
+        stream: bool = False
+    ) -> Optional[T]:
+        """
+        Gọi Gemini (có giới hạn tốc độ, circuit breaker, thử lại)
+
+        Args:
+            data: Body của request
+            parse: Chuyển text trả về thành kết quả; trả về None để thử lại
+            stream: Dùng streamGenerateContent và chỉ đọc tới dòng đầu tiên
+
+        Returns:
+            Kết quả của parse, hoặc None nếu thất bại (người gọi dùng phương án dự phòng)
+        """
+        headers = {'Content-Type': 'application/json'}
+        url = self.stream_url if stream else self.api_url
+
         for attempt in range(max_retries):
+            # Hết quota: bỏ qua Gemini trong thời gian nghỉ thay vì thử lại từng ảnh
+            if not self.backend.acquire():
+                logger.warning("⚡ Gemini đang bị giới hạn (circuit breaker mở), dùng phương án dự phòng")
+                return None
             try:
-                response = requests.post(self.api_url, headers=headers, json=data, timeout=timeout)
+                start = time.perf_counter()
+                response = self.session.post(url, headers=headers, json=data, timeout=timeout, stream=stream)
 
                 if response.status_code == 200:
-                    result = response.json()
+                    self.backend.succeeded()
                     
                     # === DEBUG: Kiểm tra xem tại sao nó dừng ===
                     try:
-                        candidate = result['candidates'][0]
-                        finish_reason = candidate.get('finishReason', 'UNKNOWN')
+                        if stream:
+                            text, finish_reason = self._read_first_line(response)
+                        else:
+                            candidate = response.json()['candidates'][0]
+                            finish_reason = candidate.get('finishReason', 'UNKNOWN')
+                            content_parts = candidate.get('content', {}).get('parts', [])
+                            text = content_parts[0]['text'] if content_parts else ''
                         
                         # Nếu lý do dừng là SAFETY (An toàn) hoặc OTHER -> Cảnh báo
-                        if finish_reason != 'STOP':
+                        if finish_reason not in ('STOP', None):
                             logger.warning(f"⚠️ AI dừng bất thường. Lý do: {finish_reason}")
                         
-                        content_parts = candidate.get('content', {}).get('parts', [])
-                        if content_parts:
-                            keyword = content_parts[0]['text'].strip()
-                            # Làm sạch keyword
-                            keyword = keyword.replace('"', '').replace("'", "").replace("Search Query:", "").strip().split('\n')[0]
-                            
-                            if len(keyword) < 3: # Nếu AI trả về quá ngắn (kiểu 1-2 chữ)
-                                logger.warning("⚠️ AI trả về quá ngắn, thử lại...")
+                        if text.strip():
+                            value = parse(text)
+                            if value is None:
                                 continue
-
-                            logger.info(f"✅ Gemini suggested: '{keyword}'")
-                            return keyword
+                            # Thời gian tới khi có từ khóa, để so sánh streaming với gọi chờ trọn vẹn
+                            metrics.record(
+                                'gemini:ttk:stream' if stream else 'gemini:ttk:blocking',
+                                time.perf_counter() - start
+                            )
+                            return value
                         else:
                             # Trường hợp bị lọc sạch bách
                             logger.warning(f"⚠️ AI trả về rỗng (Bị lọc). Lý do: {finish_reason}")
                             continue
 
-                    except (KeyError, IndexError) as e:
+                    except (KeyError, IndexError, ValueError) as e:
                         logger.error(f"❌ Lỗi đọc JSON (Lần {attempt+1}): {e}")
                         # In thử JSON ra xem nó trả về cái quái gì
                            # print(json.dumps(result, indent=2)) 
-                        time.sleep(2)
+                        time.sleep(backoff_delay(attempt))
                         continue
 
                 elif response.status_code == 429:
-                    logger.warning(f"⚠️ Hết lượt (429). Nghỉ 5s...")
-                    time.sleep(5)
+                    delay = self.retry_delay(response)
+                    # Trả kết nối (stream=True) về pool trước khi thử lại
+                    response.close()
+                    logger.warning(
+                        f"⚠️ Hết lượt (429). Server yêu cầu chờ {delay:g}s"
+                        if delay is not None else "⚠️ Hết lượt (429)"
+                    )
+                    # Tạm dừng mọi luồng gọi Gemini; lần thử sau sẽ chờ trong acquire()
+                    if self.backend.throttled(delay):
+                        logger.warning("🔌 Gemini liên tục bị giới hạn, tạm ngừng gọi (circuit breaker mở)")
                     continue
                 else:
                     logger.error(f"❌ API Error {response.status_code}")
-                    return self.fallback_extract(raw_text)
+                    response.close()
+                    return None
 
             except Exception as e:
                 logger.error(f"❌ Lỗi mạng: {e}")
-                time.sleep(2)
+                time.sleep(backoff_delay(attempt))
+
+        return None
+
+    @staticmethod
+    def clean_keyword(text: str) -> Optional[str]:
+        """Làm sạch keyword; None nếu quá ngắn (kiểu 1-2 chữ)"""
+        keyword = text.strip()
+        keyword = keyword.replace('"', '').replace("'", "").replace("Search Query:", "").strip().split('\n')[0]
+        if len(keyword) < 3:
+            logger.warning("⚠️ AI trả về quá ngắn, thử lại...")
+            return None
+        return keyword
+
+    def _cached_keyword(self, raw_text: str) -> Optional[str]:
+        if self.cache is None:
+            return None
+        cached = self.cache.get(self.cache_key(raw_text))
+        if cached is None:
+            return None
+        logger.info(f"⚡ Cache từ khóa: '{cached['keyword']}'")
+        return cached['keyword']
+
+    def _store_keyword(self, raw_text: str, keyword: str):
+        if self.cache is not None:
+            self.cache.set(self.cache_key(raw_text), {'keyword': keyword})
+
+    def extract_keyword(self, raw_text: str, timeout: int = 60) -> str:
+        return self.extract_keyword_with_status(raw_text, timeout)[0]
+
+    def extract_keyword_with_status(self, raw_text: str, timeout: int = 60) -> Tuple[str, bool]:
+        """
+        Returns:
+            (từ khóa, degraded): degraded là True nếu Gemini lỗi/bị giới hạn và từ
+            khóa là phương án dự phòng (ảnh không được đánh dấu hoàn tất, lần chạy
+            sau sẽ gọi lại Gemini)
+        """
+        if not raw_text.strip(): return "", False
+        if self.mode == 'offline':
+            keyword = self.offline.extract(raw_text)
+            logger.info(f"📴 Offline keywords: '{keyword}'")
+            return keyword, False
+        if not self.api_key: return self.fallback_extract(raw_text), False
+        # Thống kê tần suất luôn được cập nhật để phương án dự phòng có sẵn dữ liệu
+        self.offline.add_document(raw_text)
+
+        cached = self._cached_keyword(raw_text)
+        if cached is not None:
+            return cached, False
+
+        prompt = AI_PROMPT_TEMPLATE.format(text=self.compact(raw_text))
+        if self.stream:
+            # Chỉ cần một dòng từ khóa (< 18 từ): ngân sách token nhỏ, không "thinking"
+            data = self._request_body(prompt, max_output_tokens=GEMINI_STREAM_MAX_TOKENS, thinking=False)
+        else:
+            data = self._request_body(prompt)
+        keyword = self._generate(data, self.clean_keyword, timeout, stream=self.stream)
+        if keyword is None:
+            return self.fallback_extract(raw_text), True
+
+        logger.info(f"✅ Gemini suggested: '{keyword}'")
+        self._store_keyword(raw_text, keyword)
+        return keyword, False
+
+    def split_batches(self, texts: List[str]) -> List[List[int]]:
+        """Chia chỉ số các văn bản thành các lô theo GEMINI_BATCH_SIZE và ngân sách ký tự GEMINI_BATCH_CHARS"""
+        batches, current, size = [], [], 0
+        for i, text in enumerate(texts):
+            length = len(text)
+            if current and (len(current) >= self.batch_size or size + length > self.batch_chars):
+                batches.append(current)
+                current, size = [], 0
+            current.append(i)
+            size += length
+        if current:
+            batches.append(current)
+        return batches
+
+    @staticmethod
+    def parse_batch_response(text: str, ids: List[int]) -> Optional[Dict[int, str]]:
+        """Đọc mảng JSON [{"id", "keyword"}]; None nếu không đọc được (thử lại)"""
+        try:
+            items = json.loads(text)
+        except ValueError:
+            logger.warning("⚠️ AI trả về JSON không hợp lệ, thử lại...")
+            return None
+        if not isinstance(items, list):
+            return None
+
+        keywords = {}
+        for item in items:
+            if isinstance(item, dict) and item.get('id') in ids and isinstance(item.get('keyword'), str):
+                keywords[item['id']] = item['keyword']
+        return keywords
+
+    def extract_keywords(self, texts: List[str], timeout: int = 60) -> List[str]:
+        return [keyword for keyword, _ in self.extract_keywords_with_status(texts, timeout)]
+
+    def extract_keywords_with_status(self, texts: List[str], timeout: int = 60) -> List[Tuple[str, bool]]:
+        """
+        Trích từ khóa cho nhiều văn bản OCR, gộp nhiều văn bản vào một lần gọi Gemini
+
+        Văn bản đã có trong cache không được gửi đi. Văn bản bị model bỏ sót
+        (hoặc trả về quá ngắn) được gọi lại riêng lẻ bằng extract_keyword. Nếu
+        cả lời gọi gộp thất bại, cả lô dùng phương án dự phòng (không gọi lại
+        từng văn bản, tránh dồn thêm request lên API đang lỗi).
+
+        Returns:
+            Danh sách (từ khóa, degraded) theo đúng thứ tự của texts
+        """
+        keywords: List[Optional[Tuple[str, bool]]] = [None] * len(texts)
+        pending = []
+        for i, raw_text in enumerate(texts):
+            if not raw_text.strip():
+                keywords[i] = "", False
+            elif self.mode == 'offline' or not self.api_key:
+                keywords[i] = self.extract_keyword_with_status(raw_text)
+            else:
+                self.offline.add_document(raw_text)
+                cached = self._cached_keyword(raw_text)
+                if cached is None:
+                    pending.append(i)
+                else:
+                    keywords[i] = cached, False
+
+        compacted = {i: self.compact(texts[i]) for i in pending}
+        for batch in self.split_batches([compacted[i] for i in pending]):
+            indexes = [pending[j] for j in batch]
+            if len(indexes) == 1:
+                keywords[indexes[0]] = self.extract_keyword_with_status(texts[indexes[0]], timeout)
+                continue
+
+            ids = list(range(1, len(indexes) + 1))
+            items = [{'id': n, 'text': compacted[i]} for n, i in zip(ids, indexes)]
+            prompt = AI_BATCH_PROMPT_TEMPLATE.format(
+                count=len(items), items=json.dumps(items, ensure_ascii=False, indent=1)
+            )
+            data = self._request_body(prompt, max_output_tokens=500 * len(items), json_schema=_BATCH_SCHEMA)
+            answers = self._generate(data, lambda text: self.parse_batch_response(text, ids), timeout)
+            if answers is None:
+                logger.warning(f"⚠️ Lời gọi gộp thất bại, dùng phương án dự phòng cho {len(items)} văn bản")
+                for i in indexes:
+                    keywords[i] = self.fallback_extract(texts[i]), True
+                continue
+            logger.info(f"📦 Gemini batch: {len(answers)}/{len(items)} từ khóa trong 1 lần gọi")
+
+            for n, i in zip(ids, indexes):
+                keyword = answers.get(n)
+                keyword = self.clean_keyword(keyword) if keyword else None
+                if keyword is None:
+                    # Model bỏ sót mục này: gọi riêng (hoặc dự phòng nếu circuit breaker đang mở)
+                    keywords[i] = self.extract_keyword_with_status(texts[i], timeout)
+                    continue
+                logger.info(f"✅ Gemini suggested: '{keyword}'")
+                self._store_keyword(texts[i], keyword)
+                keywords[i] = keyword, False
 
-        return self.fallback_extract(raw_text)
+        return keywords
 
 def get_smart_keyword(raw_text: str) -> str:
     extractor = AIKeywordExtractor()
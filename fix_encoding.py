@@ -1,9 +1,14 @@
 """
 Fix Vietnamese encoding in existing output files
+
+.txt views of images in the results store are re-rendered from it; other
+(older) .txt files are re-saved as UTF-8 with BOM.
 """
 from pathlib import Path
 import sys
 
+from results_store import load_results, write_text
+
 def fix_file_encoding(file_path: Path):
     """Re-save file with correct UTF-8-BOM encoding"""
     try: 
@@ -28,21 +33,35 @@ def main():
         print("❌ Output folder not found")
         return
     
-    # Find all .txt files
-    txt_files = list(output_folder. glob("*.txt"))
+    results = load_results(output_folder)
+    
+    # .txt files without a structured record
+    txt_files = [
+        f for f in output_folder.glob("*.txt")
+        if f.name[:-len(".txt")] not in results
+    ]
     
-    if not txt_files: 
-        print("⚠️ No .txt files found in output folder")
+    if not results and not txt_files: 
+        print("⚠️ No results found in output folder")
         return
     
-    print(f"Found {len(txt_files)} files to fix\n")
+    total = len(results) + len(txt_files)
+    print(f"Found {total} files to fix\n")
     
     fixed = 0
+    for record in results.values():
+        try:
+            output_file = write_text(record, output_folder)
+            print(f"✅ Rendered: {output_file.name}")
+            fixed += 1
+        except Exception as e:
+            print(f"❌ Error rendering {record['image']}: {e}")
+    
     for file_path in txt_files: 
         if fix_file_encoding(file_path):
             fixed += 1
     
-    print(f"\n✅ Fixed {fixed}/{len(txt_files)} files")
+    print(f"\n✅ Fixed {fixed}/{total} files")
     print("\nNow open the files with Notepad or VS Code")
 
 if __name__ == "__main__":
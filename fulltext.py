@@ -0,0 +1,221 @@
+"""
+Full-text Module - Offline search over processed OCR results
+
+Every saved result is added to an SQLite FTS5 index (OUTPUT_FOLDER/
+.fulltext.sqlite3), so finding the pages that mention a term does not mean
+grepping every .txt file. Text and query are both folded to lowercase
+without diacritics ("Giải tích" and "giai tich" match each other, "đ"
+matches "d"). Results are ranked by BM25, with keyword matches weighted
+above OCR text matches.
+
+Usage:
+    python fulltext.py "giai tich" [--limit 10]
+    python fulltext.py --rebuild        # index existing results (results.jsonl)
+"""
+import argparse
+import re
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from config import OUTPUT_FOLDER
+from logger import setup_logger
+from results_store import iter_results
+
+logger = setup_logger('Main')
+
+# Every node of a distributed run keeps its own .fulltext.<node>.sqlite3
+INDEX_GLOB = ".fulltext*.sqlite3"
+
+# BM25 column weights: folded OCR text, folded keyword
+_WEIGHTS = (1.0, 3.0)
+
+_SNIPPET_CHARS = 160
+
+
+def _fold_char(char: str) -> str:
+    base = unicodedata.normalize('NFD', char)[0]
+    if base in 'đĐ':
+        return 'd'
+    lower = base.lower()
+    return lower if len(lower) == 1 else base
+
+
+def fold(text: str) -> str:
+    """
+    Lowercase and strip diacritics one character at a time, so offsets in
+    the folded text are offsets in the NFC-normalized original
+    """
+    return ''.join(_fold_char(c) for c in unicodedata.normalize('NFC', text))
+
+
+@dataclass
+class Hit:
+    """One search result"""
+    image: str
+    score: float      # BM25, higher is better
+    keyword: str
+    snippet: str
+
+
+def _snippet(text: str, folded_terms: List[str]) -> str:
+    """Original text around the first occurrence of any query term"""
+    text = unicodedata.normalize('NFC', text)
+    folded = fold(text)
+    positions = [p for p in (folded.find(term) for term in folded_terms) if p >= 0]
+    start = max(0, min(positions) - _SNIPPET_CHARS // 3) if positions else 0
+    snippet = ' '.join(text[start:start + _SNIPPET_CHARS].split())
+    return ('…' if start else '') + snippet + ('…' if start + _SNIPPET_CHARS < len(text) else '')
+
+
+class FullTextIndex:
+    """FTS5 index of OCR text and keywords per image, with diacritic folding"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS documents ("
+                " id INTEGER PRIMARY KEY,"
+                " image TEXT UNIQUE NOT NULL,"
+                " text TEXT NOT NULL,"
+                " keyword TEXT NOT NULL,"
+                " updated REAL NOT NULL)"
+            )
+            try:
+                # Folded copies only; rowid = documents.id
+                self._conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS terms USING fts5("
+                    "body, keyword, tokenize = 'unicode61 remove_diacritics 2')"
+                )
+            except sqlite3.OperationalError as e:
+                raise RuntimeError(f"SQLite without FTS5 support: {e}") from e
+
+    def add(self, image: str, text: str, keyword: str):
+        """Index (or re-index) the result of one image"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id FROM documents WHERE image = ?", (image,)
+            ).fetchone()
+            if row is None:
+                doc_id = self._conn.execute(
+                    "INSERT INTO documents (image, text, keyword, updated) VALUES (?, ?, ?, ?)",
+                    (image, text, keyword, time.time())
+                ).lastrowid
+            else:
+                doc_id = row[0]
+                self._conn.execute(
+                    "UPDATE documents SET text = ?, keyword = ?, updated = ? WHERE id = ?",
+                    (text, keyword, time.time(), doc_id)
+                )
+                self._conn.execute("DELETE FROM terms WHERE rowid = ?", (doc_id,))
+            self._conn.execute(
+                "INSERT INTO terms (rowid, body, keyword) VALUES (?, ?, ?)",
+                (doc_id, fold(text), fold(keyword))
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+    def search(self, query: str, limit: int = 10) -> List[Hit]:
+        """
+        Images whose OCR text or keyword contains every word of `query`
+        (accent-insensitive), best BM25 match first. A trailing * on a
+        word matches it as a prefix.
+        """
+        words = re.findall(r"\w+\*?", fold(query))
+        if not words:
+            return []
+        # Each word quoted (no FTS5 operators from user input), prefix kept
+        match = ' '.join(
+            f'"{w[:-1]}"*' if w.endswith('*') else f'"{w}"' for w in words
+        )
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT d.image, d.text, d.keyword, bm25(terms, ?, ?) AS rank"
+                " FROM terms JOIN documents d ON d.id = terms.rowid"
+                " WHERE terms MATCH ? ORDER BY rank LIMIT ?",
+                (*_WEIGHTS, match, limit)
+            ).fetchall()
+        terms = [w.rstrip('*') for w in words]
+        # FTS5's bm25() is negated so that smaller sorts first
+        return [Hit(image, -rank, keyword, _snippet(text, terms)) for image, text, keyword, rank in rows]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def search_all(output_folder: Path, query: str, limit: int = 10) -> List[Hit]:
+    """Search every index in `output_folder` (one per node) and merge the hits"""
+    best = {}
+    for path in sorted(Path(output_folder).glob(INDEX_GLOB)):
+        index = FullTextIndex(path)
+        try:
+            for hit in index.search(query, limit):
+                # An image can be in several indexes (e.g. after --rebuild)
+                if hit.image not in best or hit.score > best[hit.image].score:
+                    best[hit.image] = hit
+        finally:
+            index.close()
+    return sorted(best.values(), key=lambda hit: hit.score, reverse=True)[:limit]
+
+
+def rebuild(output_folder: Path, index_path: Optional[Path] = None) -> int:
+    """Index every result in the results store; returns the number of images"""
+    index = FullTextIndex(index_path or Path(output_folder) / ".fulltext.sqlite3")
+    count = 0
+    try:
+        for record in iter_results(output_folder):
+            index.add(record['image'], record['text'], record['keyword'])
+            count += 1
+    finally:
+        index.close()
+    return count
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Search processed OCR results offline")
+    parser.add_argument("query", nargs="?", help='Words to find, e.g. "giai tich" (accents optional)')
+    parser.add_argument("--limit", type=int, default=10, help="Number of results (default: 10)")
+    parser.add_argument("--rebuild", action="store_true", help="Index all results in results.jsonl")
+    args = parser.parse_args()
+
+    if args.rebuild:
+        start = time.perf_counter()
+        count = rebuild(OUTPUT_FOLDER)
+        print(f"✅ Indexed {count} result(s) in {time.perf_counter() - start:.1f}s")
+    if not args.query:
+        if not args.rebuild:
+            parser.error("a query or --rebuild is required")
+        return 0
+    if not any(OUTPUT_FOLDER.glob(INDEX_GLOB)):
+        print(f"❌ No search index in {OUTPUT_FOLDER}; run main.py or python fulltext.py --rebuild")
+        return 1
+
+    start = time.perf_counter()
+    hits = search_all(OUTPUT_FOLDER, args.query, args.limit)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    print(f"🔎 {len(hits)} result(s) for \"{args.query}\" ({elapsed:.1f} ms)\n")
+    for i, hit in enumerate(hits, 1):
+        print(f"{i}. {hit.image}  (score {hit.score:.2f})")
+        if hit.keyword:
+            print(f"   🎯 {hit.keyword}")
+        print(f"   {hit.snippet}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+HTTP Client Module - Pooled keep-alive sessions with connection timing
+
+A requests.Session keeps TCP/TLS connections open between calls, so only
+the first request to a host (per pooled connection) pays the handshake.
+The adapter below also records the time spent opening each new connection
+under the metrics stage `connect:<name>`, which makes pool misses visible.
+"""
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from metrics import metrics
+
+
+def _timed_pool(pool_cls, conn_cls, stage: str):
+    """Connection pool class whose connections time connect() (TCP + TLS) under `stage`"""
+
+    def connect(self):
+        with metrics.timer(stage):
+            conn_cls.connect(self)
+
+    timed_conn = type(f"Timed{conn_cls.__name__}", (conn_cls,), {'connect': connect})
+    return type(f"Timed{pool_cls.__name__}", (pool_cls,), {'ConnectionCls': timed_conn})
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter keeping up to `pool_size` connections per host and timing new ones"""
+
+    def __init__(self, stage: str, pool_size: int):
+        self.stage = stage
+        super().__init__(pool_connections=1, pool_maxsize=max(1, pool_size))
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': _timed_pool(HTTPConnectionPool, HTTPConnection, self.stage),
+            'https': _timed_pool(HTTPSConnectionPool, HTTPSConnection, self.stage),
+        }
+
+
+def create_session(name: str, pool_size: int) -> requests.Session:
+    """
+    Keep-alive session for one backend
+
+    Args:
+        name: Backend name, used for the `connect:<name>` metric
+        pool_size: Connections kept open per host (match the number of
+            threads calling the backend concurrently)
+    """
+    session = requests.Session()
+    adapter = TimedHTTPAdapter(f"connect:{name}", pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
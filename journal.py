@@ -0,0 +1,147 @@
+"""
+Journal Module - Append-only, crash-safe record of per-image stage completion
+
+Each completed stage (ocr, keyword, search, saved) is appended as one JSON
+line and fsync'ed, together with its output (OCR text, keyword, URLs). After
+a crash, Ctrl-C or power loss, the next run replays the journal and resumes
+every image from its last completed stage instead of redoing OCR and Gemini.
+"""
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+from logger import setup_logger
+
+logger = setup_logger('Main')
+
+STAGES = ('ocr', 'keyword', 'search', 'saved')
+
+
+class JobJournal:
+    """JSONL journal of stage outputs, keyed by image filename"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        # filename -> {'sha256', 'settings', 'ocr', 'keyword', 'urls'} for unfinished images
+        self.state: Dict[str, dict] = {}
+        self._file = None
+        self._replay()
+
+    def _replay(self):
+        if not self.path.exists():
+            return
+
+        size = 0
+        tail_valid = True
+        with open(self.path, 'rb') as f:
+            for line_no, line in enumerate(f, 1):
+                size += len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # Torn write from a crash: ignore the partial line
+                    logger.warning(f"⚠️ Journal line {line_no} is corrupt, ignoring it")
+                    tail_valid = False
+                    continue
+                self._apply(record)
+                tail_valid = True
+
+        if size and not line.endswith(b'\n'):
+            # The next record appended would continue an unterminated last
+            # line and be unreadable too: end the line, or cut it off if torn
+            with open(self.path, 'rb+') as f:
+                if tail_valid:
+                    f.seek(0, os.SEEK_END)
+                    f.write(b'\n')
+                else:
+                    f.truncate(size - len(line))
+                f.flush()
+                os.fsync(f.fileno())
+
+        if self.state:
+            logger.info(f"📒 Journal: {len(self.state)} unfinished image(s) can be resumed")
+
+    def _apply(self, record: dict):
+        name = record['image']
+        stage = record['stage']
+
+        if stage == 'saved':
+            self.state.pop(name, None)
+            return
+
+        entry = self.state.get(name)
+        if (
+            entry is None
+            or entry['sha256'] != record['sha256']
+            or entry['settings'] != record['settings']
+        ):
+            # New image, or content/settings changed: earlier stages are stale
+            entry = {'sha256': record['sha256'], 'settings': record['settings']}
+            self.state[name] = entry
+        entry[stage] = record['data']
+
+    def record(self, filename: str, sha256: str, settings: dict, stage: str, data=None):
+        """Durably append the completion of `stage` for one image"""
+        record = {
+            'image': filename,
+            'sha256': sha256,
+            'settings': settings,
+            'stage': stage,
+            'data': data,
+            'ts': time.time(),
+        }
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._apply(record)
+
+    def resume(self, filename: str, sha256: str, settings: dict) -> Optional[dict]:
+        """Completed stage outputs for an unfinished image, if content and settings still match"""
+        with self._lock:
+            entry = self.state.get(filename)
+            if entry is None or entry['sha256'] != sha256 or entry['settings'] != settings:
+                return None
+            return dict(entry)
+
+    def compact(self):
+        """Rewrite the journal keeping only unfinished images (removes it when empty)"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+            if not self.state:
+                self.path.unlink(missing_ok=True)
+            else:
+                tmp_path = self.path.with_suffix('.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    for name, entry in self.state.items():
+                        for stage in STAGES:
+                            if stage in entry:
+                                f.write(json.dumps({
+                                    'image': name,
+                                    'sha256': entry['sha256'],
+                                    'settings': entry['settings'],
+                                    'stage': stage,
+                                    'data': entry[stage],
+                                    'ts': time.time(),
+                                }, ensure_ascii=False) + '\n')
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+
+    def clear(self):
+        """Forget all unfinished work"""
+        with self._lock:
+            self.state.clear()
+        self.compact()
@@ -0,0 +1,233 @@
+"""
+Keywords Module - Offline keyword extraction (RAKE + TF-IDF) for Vietnamese OCR text
+
+Candidate phrases are the runs of content words between stopwords and
+punctuation (RAKE). Each word scores degree/frequency within the text times
+its inverse document frequency over every text processed so far, so words
+that appear on most pages (headers, page furniture) sink while rare,
+specific terms rise. Document frequencies are persisted and grow with the
+corpus.
+
+Tokenization works on NFC-normalized text so Vietnamese syllables with
+diacritics stay whole; stopwords also match when OCR dropped the diacritics.
+"""
+import hashlib
+import json
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from logger import setup_logger
+from statefile import StateFile
+
+logger = setup_logger('Filter')
+
+# Longer runs of content words are split into phrases of at most this many words
+MAX_PHRASE_WORDS = 8
+
+# Function words only: syllables that also start common compounds
+# ("cách mạng", "thế giới", "điều chỉnh", "số học") are deliberately absent
+VIETNAMESE_STOPWORDS = frozenset("""
+à á ạ ả ai anh ấy bà bạn bao bằng bị bởi các cái cả càng chỉ chiếc cho chứ
+chưa chúng có còn cùng của cũng đã đang đây để đến đều do đó được gì giữa
+hay hãy họ hơn hoặc khi không là lại lên lúc mà mình mỗi một mọi nào này nên
+nếu ngay nhiều như nhưng những nơi nữa ở ông qua ra rằng rất rồi sẽ tại thì
+theo tôi trên trong từ và vào vẫn về vì với vừa nó kia đấy nhé nhỉ ạ chị em
+ta cô chú thôi đâu bây giờ tuy nhiên luôn nhau ai nấy mấy bấy nhiêu
+""".split())
+
+# Only words that cannot be mistaken for Vietnamese syllables ("an", "to",
+# "in", "do" are Vietnamese too)
+ENGLISH_STOPWORDS = frozenset("""
+the and of for with from that this these those was were will are have has
+had not but than then its into been being which what who whom there their
+""".split())
+
+# Stopwords matched even without diacritics (lost by OCR); limited to
+# frequent function words whose folded form is rarely a content word
+_FOLDED_STOPWORDS = frozenset("""
+cua va cac nhung duoc trong khong nay mot voi cho la co de da khi theo ve
+den tai cung nhu thi hoac neu vao tren
+""".split())
+
+# Words, punctuation and line breaks (OCR lines rarely continue a phrase)
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]|\n")
+
+
+def is_stopword(token: str) -> bool:
+    if token in VIETNAMESE_STOPWORDS or token in ENGLISH_STOPWORDS:
+        return True
+    # OCR often loses diacritics: "cua" is still "của"
+    return token.isascii() and token in _FOLDED_STOPWORDS
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase NFC word tokens; punctuation and newline tokens are kept as phrase breaks"""
+    return _TOKEN_RE.findall(unicodedata.normalize('NFC', text).lower())
+
+
+def _is_content_word(token: str) -> bool:
+    """Words that may start/continue a phrase: no stopwords, punctuation or OCR crumbs"""
+    if not token[0].isalnum() or '_' in token:
+        return False
+    if len(token) == 1 and not token.isdigit():
+        return False
+    return not is_stopword(token)
+
+
+def candidate_phrases(tokens: List[str]) -> List[Tuple[str, ...]]:
+    """RAKE candidates: maximal runs of content words, split at MAX_PHRASE_WORDS"""
+    phrases, current = [], []
+    for token in tokens:
+        if _is_content_word(token):
+            current.append(token)
+            if len(current) == MAX_PHRASE_WORDS:
+                phrases.append(tuple(current))
+                current = []
+        elif current:
+            phrases.append(tuple(current))
+            current = []
+    if current:
+        phrases.append(tuple(current))
+    return phrases
+
+
+class OfflineKeywordExtractor:
+    """RAKE phrases weighted by corpus IDF, with incrementally persisted document frequencies"""
+
+    def __init__(self, path: Optional[Path] = None, max_words: int = 18):
+        self.path = Path(path) if path else None
+        self.max_words = max_words
+        self._lock = threading.Lock()
+        self._file = StateFile(self.path) if self.path else None
+        self.documents = 0
+        self.df: Dict[str, int] = {}
+        # Short hashes of documents already counted (reruns don't inflate df)
+        self._seen = set()
+
+        if self.path and self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    state = json.load(f)
+                self.documents = state['documents']
+                self.df = state['df']
+                self._seen = set(state['seen'])
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"⚠️ Cannot read keyword statistics ({e}), starting fresh")
+
+    def add_document(self, text: str, tokens: Optional[List[str]] = None):
+        """Count the words of one processed text in the document frequencies"""
+        digest = hashlib.sha256(text.encode('utf-8')).hexdigest()[:16]
+        if tokens is None:
+            tokens = tokenize(text)
+        terms = {t for t in tokens if _is_content_word(t)}
+
+        with self._lock:
+            if digest in self._seen:
+                return
+            self._seen.add(digest)
+            self.documents += 1
+            for term in terms:
+                self.df[term] = self.df.get(term, 0) + 1
+
+        if self._file is not None and self._file.changed():
+            self.save()
+
+    def idf(self, term: str) -> float:
+        """Smoothed inverse document frequency (1.0 for an empty corpus)"""
+        return math.log((self.documents + 1) / (self.df.get(term, 0) + 1)) + 1.0
+
+    def score_phrases(self, text: str) -> List[Tuple[float, Tuple[str, ...]]]:
+        """Candidate phrases with their scores, best first"""
+        tokens = tokenize(text)
+        self.add_document(text, tokens)
+        phrases = candidate_phrases(tokens)
+        if not phrases:
+            return []
+
+        freq = Counter()
+        degree = defaultdict(int)
+        for phrase in phrases:
+            for word in phrase:
+                freq[word] += 1
+                degree[word] += len(phrase)
+
+        with self._lock:
+            word_score = {w: degree[w] / freq[w] * self.idf(w) for w in freq}
+
+        # Each distinct phrase once, scored by its words
+        scored = {phrase: sum(word_score[w] for w in phrase) for phrase in phrases}
+        return sorted(((score, phrase) for phrase, score in scored.items()), reverse=True)
+
+    def extract(self, text: str) -> str:
+        """
+        Search query for an OCR text: the best phrases, comma separated,
+        up to max_words words in total
+        """
+        keywords, words, used = [], 0, set()
+        for _, phrase in self.score_phrases(text):
+            # Skip phrases whose words are already covered
+            if set(phrase) <= used:
+                continue
+            if words + len(phrase) > self.max_words:
+                if words:
+                    # Try shorter phrases that still fit
+                    continue
+                phrase = phrase[:self.max_words]
+            keywords.append(' '.join(phrase))
+            used.update(phrase)
+            words += len(phrase)
+        return ', '.join(keywords)
+
+    def compact(self, text: str, budget: int) -> str:
+        """
+        Shrink an OCR text to at most `budget` characters for a prompt:
+        drop noise tokens (symbol runs, stray single letters), drop duplicate
+        and content-free lines, then, if still too long, keep the lines with
+        the most information (summed IDF of their distinct content words),
+        in their original order.
+        """
+        lines, seen = [], set()
+        for raw_line in unicodedata.normalize('NFC', text).splitlines():
+            words = [
+                w for w in raw_line.split()
+                if any(c.isalnum() for c in w) and (len(w) > 1 or w.isdigit())
+            ]
+            tokens = [t for t in tokenize(' '.join(words)) if _is_content_word(t)]
+            key = ' '.join(tokens)
+            # Lines with less than 3 letters of content are OCR crumbs ("àb", "Q")
+            if len(key.replace(' ', '')) < 3 or key in seen:
+                continue
+            seen.add(key)
+            lines.append((' '.join(words), set(tokens)))
+
+        if sum(len(line) + 1 for line, _ in lines) <= budget + 1:
+            return '\n'.join(line for line, _ in lines)
+
+        with self._lock:
+            scores = [sum(self.idf(t) for t in tokens) for _, tokens in lines]
+
+        keep, used = set(), 0
+        for i in sorted(range(len(lines)), key=lambda i: scores[i], reverse=True):
+            length = len(lines[i][0]) + 1
+            if used + length <= budget + 1:
+                keep.add(i)
+                used += length
+        if not keep:
+            # A single line longer than the budget
+            best = max(range(len(lines)), key=lambda i: scores[i])
+            return lines[best][0][:budget]
+        return '\n'.join(lines[i][0] for i in sorted(keep))
+
+    def _snapshot(self) -> dict:
+        with self._lock:
+            return {'documents': self.documents, 'df': dict(self.df), 'seen': sorted(self._seen)}
+
+    def save(self):
+        """Write the document frequencies atomically"""
+        if self._file is not None:
+            self._file.save(self._snapshot)
@@ -2,22 +2,53 @@
 Main Module - Orchestrate OCR -> Filter -> Search pipeline
 """
 import sys
+import argparse
 from pathlib import Path
-from typing import List, Tuple
-from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from dataclasses import asdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait
+import queue
+import threading
 import time
+from contextlib import contextmanager
 
 from logger import setup_logger
 from config import (
     INPUT_FOLDER,
     OUTPUT_FOLDER,
-    SUPPORTED_FORMATS
+    SUPPORTED_FORMATS,
+    OCR_WORKERS,
+    NETWORK_WORKERS,
+    HTTP_POOL_SIZE,
+    GEMINI_BATCH_SIZE,
+    KEYWORD_MODE,
+    DEDUP_ENABLED,
+    DEDUP_MAX_DISTANCE,
+    TEXT_GROUP_ENABLED,
+    TEXT_GROUP_MAX_DISTANCE,
+    TEXT_GROUP_MIN_CHARS,
+    RESULTS_TXT_ENABLED,
+    FULLTEXT_ENABLED,
+    WORK_QUEUE_PATH,
+    WORK_LEASE_SECONDS,
+    WORK_MAX_ATTEMPTS,
+    WORK_POLL_INTERVAL
 )
 
 # Import processors
-from ocr import OCRProcessor
+from ocr import OCRProcessor, OCRResult, init_worker, worker_extract
 from filter import AIKeywordExtractor
 from search import WebSearcher
+from pipeline import AsyncPipeline
+from watcher import WatchDaemon
+from manifest import Manifest
+from journal import JobJournal
+from metrics import metrics
+from workqueue import WorkQueue, default_node_id
+from cache import hash_key
+from dedup import BKTree, PerceptualIndex, TextGroups
+from results_store import ResultsStore, write_text
+from fulltext import FullTextIndex
 
 logger = setup_logger('Main')
 
@@ -25,10 +56,74 @@ logger = setup_logger('Main')
 class ImageProcessor:
     """Main processor orchestrating the pipeline"""
     
-    def __init__(self):
+    def __init__(
+        self,
+        ocr_workers: int = OCR_WORKERS,
+        network_workers: int = NETWORK_WORKERS,
+        force: bool = False,
+        resume: bool = True,
+        node_id: Optional[str] = None,
+        keyword_mode: str = KEYWORD_MODE
+    ):
         self.ocr = OCRProcessor()
-        self.ai_filter = AIKeywordExtractor()
-        self.searcher = WebSearcher()
+        self.ocr_workers = max(1, ocr_workers)
+        self.network_workers = max(1, network_workers)
+        # Network clients keep one keep-alive connection per concurrent caller
+        # (network workers, or the worker threads in distributed/watch mode)
+        pool_size = max(HTTP_POOL_SIZE, self.network_workers, self.ocr_workers)
+        self.ai_filter = AIKeywordExtractor(pool_size=pool_size, mode=keyword_mode)
+        self.searcher = WebSearcher(pool_size=pool_size)
+        
+        # Incremental re-runs: skip images whose results are up to date
+        self.force = force
+        self.started = time.time()
+        self.skipped = 0
+        # Distributed mode: nodes share OUTPUT_FOLDER, so each keeps its own
+        # manifest and journal instead of overwriting one another's
+        self.node_id = node_id
+        suffix = f".{node_id}" if node_id else ""
+        self.manifest = Manifest(
+            OUTPUT_FOLDER / f".manifest{suffix}.json", OUTPUT_FOLDER, require_text=RESULTS_TXT_ENABLED
+        )
+        
+        # Structured results (the .txt files are an optional rendered view)
+        self.results = ResultsStore(OUTPUT_FOLDER / f"results{suffix}.jsonl")
+        # filename -> {stage: seconds} for the network stages, until saved
+        self._timings: Dict[str, Dict[str, float]] = {}
+        
+        # Offline full-text index of the saved results (python fulltext.py "query")
+        self.fulltext = None
+        if FULLTEXT_ENABLED:
+            try:
+                self.fulltext = FullTextIndex(OUTPUT_FOLDER / f".fulltext{suffix}.sqlite3")
+            except RuntimeError as e:
+                logger.warning(f"⚠️ Full-text index disabled: {e}")
+        
+        # Crash-safe journal of completed stages, used to resume interrupted batches
+        self.journal = JobJournal(OUTPUT_FOLDER / f".journal{suffix}.jsonl")
+        if not resume:
+            self.journal.clear()
+        
+        # Near-duplicate photos (perceptual hash) reuse an earlier image's results
+        self.dedup = None
+        if DEDUP_ENABLED:
+            self.dedup = PerceptualIndex(OUTPUT_FOLDER / f".phash{suffix}.sqlite3", DEDUP_MAX_DISTANCE)
+        # filename -> perceptual hash, and filename -> (original, distance) for duplicates
+        self._phashes: Dict[str, int] = {}
+        self._duplicates: Dict[str, Tuple[str, int]] = {}
+        
+        # Images saved with a fallback keyword or without search results
+        # because Gemini/search was unavailable: not marked up to date
+        self.degraded: Set[str] = set()
+        
+        # Near-identical OCR texts (SimHash) share one keyword and one search
+        self.text_groups = None
+        if TEXT_GROUP_ENABLED:
+            self.text_groups = TextGroups(TEXT_GROUP_MAX_DISTANCE, TEXT_GROUP_MIN_CHARS)
+        
+        # OCR pass statistics (to measure confidence-based early exit)
+        self.ocr_stats = {'images': 0, 'passes': 0, 'cached': 0}
+        self._stats_lock = threading.Lock()
         
         # Ensure folders exist
         INPUT_FOLDER.mkdir(exist_ok=True)
@@ -45,57 +140,229 @@ class ImageProcessor:
         filename: str,
         raw_text: str,
         keyword: str,
-        urls: List[str]
+        urls: List[str],
+        ocr_result: Optional[OCRResult] = None,
+        degraded: bool = False
     ) -> bool:
         """
-        Save processing results to file with proper UTF-8 encoding
+        Append the results to the results store and, if enabled, write the
+        .txt view (UTF-8 with BOM)
         
         Args:  
             filename: Original image filename
             raw_text: OCR extracted text
             keyword: AI filtered keyword
             urls: Search results URLs
+            ocr_result: OCR details (method, confidence, passes)
+            degraded: Offline fallback keyword because Gemini failed, or
+                      search skipped by the circuit breaker: the result is
+                      kept but the image is redone next run
             
         Returns:  
             True if successful, False otherwise
         """
-        output_file = OUTPUT_FOLDER / f"{filename}.txt"
+        ocr_details = None
+        timings = {}
+        if ocr_result is not None:
+            ocr_details = {k: v for k, v in asdict(ocr_result).items() if k != 'text'}
+            timings['ocr'] = round(ocr_result.seconds, 3)
+        with self._stats_lock:
+            timings.update(self._timings.pop(filename, {}))
+            duplicate = self._duplicates.get(filename)
+        group = self.text_groups.group_of(filename) if self.text_groups is not None else None
+        
+        record = {
+            'image': filename,
+            'sha256': self.manifest.content_hash(filename),
+            'settings': self.settings(),
+            'ocr': ocr_details,
+            'text': raw_text,
+            'keyword': keyword,
+            'urls': urls,
+            'timings': timings,
+            'duplicate_of': {'image': duplicate[0], 'distance': duplicate[1]} if duplicate else None,
+            'text_group': {'image': group[0], 'distance': group[1]} if group else None,
+            'degraded': degraded,
+        }
         
         try:
-            # Use UTF-8 with BOM for proper Vietnamese display in Windows
-            with open(output_file, "w", encoding="utf-8-sig") as f:
-                f.write("="*70 + "\n")
-                f.write(f" KẾT QUẢ XỬ LÝ: {filename}\n")
-                f.write(f" Thời gian: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
-                f.write("="*70 + "\n\n")
-                
-                f.write("[1] VĂN BẢN GỐC (OCR)\n")
-                f.write("-"*70 + "\n")
-                f.write(f"{raw_text}\n\n")
-                
-                f.write("[2] TỪ KHÓA TÌM KIẾM (AI)\n")
-                f.write("-"*70 + "\n")
-                f.write(f"{keyword}\n\n")
-                
-                f. write("[3] KẾT QUẢ TÌM KIẾM\n")
-                f.write("-"*70 + "\n")
-                
-                if urls: 
-                    for i, url in enumerate(urls, 1):
-                        f.write(f"{i}. {url}\n")
+            record = self.results.append(record)
+            if self.fulltext is not None:
+                self.fulltext.add(filename, raw_text, keyword)
+            if RESULTS_TXT_ENABLED:
+                output_file = write_text(record, OUTPUT_FOLDER)
+                logger.info(f"💾 Saved: {output_file.name}")
+            else:
+                logger.info(f"💾 Saved: {filename}")
+            self._journal(filename, 'saved')
+            with self._stats_lock:
+                if degraded:
+                    self.degraded.add(filename)
                 else:
-                    f.write("Không tìm thấy kết quả nào.\n")
-                
-                f.write("\n" + "="*70 + "\n")
-                f.write("Xử lý hoàn tất!\n")
-            
-            logger.info(f"💾 Saved: {output_file. name}")
+                    self.degraded.discard(filename)
+            if degraded:
+                logger.warning(f"⚠️ {filename}: Gemini/search unavailable, result will be redone next run")
+                self.manifest.forget(filename)
+            else:
+                self.manifest.mark_done(filename, self.settings())
+                self._index_result(filename, raw_text, keyword, urls, ocr_result)
             return True
             
         except Exception as e:  
             logger.error(f"❌ Failed to save results: {e}", exc_info=True)
             return False
     
+    def _index_result(
+        self,
+        filename: str,
+        raw_text: str,
+        keyword: str,
+        urls: List[str],
+        ocr_result: Optional[OCRResult]
+    ):
+        """Make a saved result reusable by later near-duplicate images"""
+        if self.dedup is None or ocr_result is None:
+            return
+        with self._stats_lock:
+            value = self._phashes.get(filename)
+        if value is None:
+            return
+        self.dedup.add(filename, value, {
+            'raw_text': raw_text,
+            'keyword': keyword,
+            'urls': urls,
+            'ocr': asdict(ocr_result),
+        }, self.settings_key())
+    
+    def reuse_duplicate(self, image_path: Path) -> bool:
+        """
+        If the image is a near-duplicate of an already processed one (by
+        perceptual hash), save that image's results for it and return True
+        """
+        if self.dedup is None:
+            return False
+        filename = image_path.name
+        value = self.dedup.hash_file(image_path)
+        if value is None:
+            return False
+        with self._stats_lock:
+            self._phashes[filename] = value
+        
+        # Only results made with the current settings (and, with --force,
+        # in this run) may be copied
+        match = self.dedup.find(
+            value,
+            exclude=filename,
+            settings=self.settings_key(),
+            since=self.started if self.force else 0.0
+        )
+        if match is None:
+            return False
+        
+        original, distance, result = match
+        logger.info(f"🪞 {filename} is a near-duplicate of {original} (distance {distance}), reusing its results")
+        if self.manifest.content_hash(filename) is None:
+            self.manifest.fingerprint(image_path)
+        with self._stats_lock:
+            self._duplicates[filename] = (original, distance)
+        self.dedup.record_match(filename, original, distance)
+        
+        ocr_result = OCRResult(**{**result['ocr'], 'passes': 0, 'cached': True, 'seconds': 0.0})
+        return self.save_results(filename, result['raw_text'], result['keyword'], result['urls'], ocr_result)
+    
+    @contextmanager
+    def _timed(self, filenames: List[str], stage: str):
+        """Record the wall time of the block as `stage` of each image"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = round(time.perf_counter() - start, 3)
+            with self._stats_lock:
+                for filename in filenames:
+                    self._timings.setdefault(filename, {})[stage] = seconds
+    
+    def record_ocr(self, ocr_result: OCRResult):
+        """Accumulate OCR pass statistics for the summary"""
+        with self._stats_lock:
+            self.ocr_stats['images'] += 1
+            self.ocr_stats['passes'] += ocr_result.passes
+            self.ocr_stats['cached'] += ocr_result.cached
+    
+    def process_text(
+        self,
+        filename: str,
+        raw_text: str,
+        ocr_result: Optional[OCRResult] = None
+    ) -> Tuple[bool, str]:
+        """
+        Run the network stages (AI filter, search) and save results
+        
+        Args:
+            filename: Original image filename
+            raw_text: OCR extracted text
+            ocr_result: OCR details recorded with the results
+            
+        Returns:
+            Tuple of (success, message)
+        """
+        try:
+            # Step 2: AI Filter
+            keyword, keyword_degraded = self.keyword_stage(filename, raw_text)
+            
+            # Step 3: Search
+            urls, search_degraded = self.search_stage(filename, keyword)
+            
+            # Step 4: Save results
+            success = self.save_results(
+                filename, raw_text, keyword, urls, ocr_result, keyword_degraded or search_degraded
+            )
+            
+            if success:  
+                return True, "✅ Success"
+            else:
+                return False, "❌ Failed to save"
+                
+        except Exception as e:
+            msg = f"❌ Error:  {e}"
+            logger.error(msg, exc_info=True)
+            return False, msg
+    
+    def process_texts(self, items: List[Tuple[str, str, Optional[OCRResult]]]) -> List[Tuple[bool, str]]:
+        """
+        Like process_text for several images at once: the keywords of all
+        items are extracted with batched Gemini calls, then each item is
+        searched and saved
+        
+        Args:
+            items: (filename, raw_text, ocr_result) tuples
+            
+        Returns:
+            (success, message) per item
+        """
+        try:
+            keywords = self.keyword_batch_stage([(filename, raw_text) for filename, raw_text, _ in items])
+        except Exception as e:
+            msg = f"❌ Error:  {e}"
+            logger.error(msg, exc_info=True)
+            return [(False, msg)] * len(items)
+        
+        results = []
+        for (filename, raw_text, ocr_result), (keyword, keyword_degraded) in zip(items, keywords):
+            try:
+                urls, search_degraded = self.search_stage(filename, keyword)
+                if self.save_results(
+                    filename, raw_text, keyword, urls, ocr_result, keyword_degraded or search_degraded
+                ):
+                    results.append((True, "✅ Success"))
+                else:
+                    results.append((False, "❌ Failed to save"))
+            except Exception as e:
+                msg = f"❌ Error:  {e}"
+                logger.error(msg, exc_info=True)
+                results.append((False, msg))
+        return results
+    
     def process_image(self, image_path: Path) -> Tuple[bool, str]:
         """
         Process single image through complete pipeline
@@ -112,58 +379,279 @@ class ImageProcessor:
         logger.info(f"{'='*60}")
         
         try:
+            if self.reuse_duplicate(image_path):
+                return True, "✅ Success (near-duplicate)"
+            
             # Step 1: OCR
-            raw_text = self.ocr. extract_text(image_path)
-            if not raw_text:  
+            ocr_result = self.ocr_stage(image_path)
+            if not ocr_result or not ocr_result.text:  
                 msg = "⚠️ No text extracted, skipping"
                 logger.warning(msg)
                 return False, msg
-            
-            # Step 2: AI Filter
-            keyword = self.ai_filter.extract_keyword(raw_text)
-            if not keyword: 
-                keyword = raw_text  # Fallback
-            
-            # Step 3: Search
-            urls = self.searcher.search(keyword)
-            
-            # Step 4: Save results
-            success = self.save_results(filename, raw_text, keyword, urls)
-            
-            if success:  
-                return True, "✅ Success"
-            else:
-                return False, "❌ Failed to save"
                 
         except Exception as e:
             msg = f"❌ Error:  {e}"
             logger.error(msg, exc_info=True)
             return False, msg
+        
+        return self.process_text(filename, ocr_result.text, ocr_result)
+    
+    def _journal(self, filename: str, stage: str, data=None):
+        """Append a completed stage to the job journal"""
+        content_hash = self.manifest.content_hash(filename)
+        if content_hash is not None:
+            self.journal.record(filename, content_hash, self.settings(), stage, data)
+    
+    def _resumed(self, filename: str) -> dict:
+        """Stage outputs already journaled for an unfinished image"""
+        content_hash = self.manifest.content_hash(filename)
+        if content_hash is None:
+            return {}
+        return self.journal.resume(filename, content_hash, self.settings()) or {}
     
-    def process_all(self, delay: float = 1.5) -> Tuple[int, int]:
+    def resumed_ocr(self, filename: str) -> Optional[OCRResult]:
+        """OCR result from the journal of an interrupted run, if any"""
+        state = self._resumed(filename)
+        if 'ocr' not in state:
+            return None
+        logger.info(f"📒 Resuming {filename}: OCR taken from journal")
+        return OCRResult(**{**state['ocr'], 'passes': 0, 'cached': True})
+    
+    def finish_ocr(self, filename: str, ocr_result: Optional[OCRResult]):
+        """Record statistics and journal a completed OCR stage"""
+        if ocr_result is None:
+            return
+        self.record_ocr(ocr_result)
+        if 'ocr' not in self._resumed(filename):
+            self._journal(filename, 'ocr', asdict(ocr_result))
+    
+    def ocr_stage(self, image_path: Path) -> Optional[OCRResult]:
+        """Step 1: OCR (resumed from the journal when possible)"""
+        if self.manifest.content_hash(image_path.name) is None:
+            self.manifest.fingerprint(image_path)
+        
+        ocr_result = self.resumed_ocr(image_path.name)
+        if ocr_result is None:
+            ocr_result = self.ocr.extract(image_path)
+        self.finish_ocr(image_path.name, ocr_result)
+        return ocr_result
+    
+    def keyword_stage(self, filename: str, raw_text: str) -> Tuple[str, bool]:
+        """
+        Step 2: AI keyword (resumed from the journal when possible)
+        
+        Returns:
+            Tuple of (keyword, degraded): degraded if Gemini was unavailable
+            and the keyword is the offline fallback
+        """
+        state = self._resumed(filename)
+        if 'keyword' in state:
+            logger.info(f"📒 Resuming {filename}: keyword taken from journal")
+            return state['keyword'], False
+        
+        def extract():
+            keyword, degraded = self.ai_filter.extract_keyword_with_status(raw_text)
+            return keyword or raw_text, degraded  # Fallback
+        
+        with self._timed([filename], 'keyword'):
+            if self.text_groups is not None:
+                group = self.text_groups.assign(filename, raw_text)
+                keyword, degraded = self.text_groups.shared(group, 'keyword', extract)
+            else:
+                keyword, degraded = extract()
+        # A fallback keyword is not resumed: the next run asks Gemini again
+        if not degraded:
+            self._journal(filename, 'keyword', keyword)
+        return keyword, degraded
+    
+    def keyword_batch_stage(self, items: List[Tuple[str, str]]) -> List[Tuple[str, bool]]:
+        """Step 2 for several (filename, raw_text) items, batching the Gemini calls"""
+        keywords: List[Optional[Tuple[str, bool]]] = []
+        pending = []
+        for i, (filename, raw_text) in enumerate(items):
+            state = self._resumed(filename)
+            if 'keyword' in state:
+                logger.info(f"📒 Resuming {filename}: keyword taken from journal")
+                keywords.append((state['keyword'], False))
+            else:
+                keywords.append(None)
+                pending.append(i)
+        
+        # Texts of one group (here or in an earlier batch) share one extraction
+        groups = {}
+        if self.text_groups is not None:
+            for i in pending:
+                filename, raw_text = items[i]
+                groups[i] = self.text_groups.assign(filename, raw_text)
+                keywords[i] = self.text_groups.get(groups[i], 'keyword')
+        
+        # group -> index of the item whose text is sent for it
+        senders = {}
+        for i in pending:
+            if keywords[i] is None:
+                senders.setdefault(groups.get(i, i), i)
+        
+        extracted = {}
+        if senders:
+            with self._timed([items[i][0] for i in pending], 'keyword'):
+                results = self.ai_filter.extract_keywords_with_status([items[i][1] for i in senders.values()])
+            for (group, i), (keyword, degraded) in zip(senders.items(), results):
+                extracted[group] = keyword or items[i][1], degraded  # Fallback
+                if self.text_groups is not None:
+                    self.text_groups.put(group, 'keyword', extracted[group])
+        
+        for i in pending:
+            if keywords[i] is None:
+                keywords[i] = extracted[groups.get(i, i)]
+            if not keywords[i][1]:
+                self._journal(items[i][0], 'keyword', keywords[i][0])
+        return keywords
+    
+    def search_stage(self, filename: str, keyword: str) -> Tuple[List[str], bool]:
+        """
+        Step 3: search (resumed from the journal when possible)
+        
+        Returns:
+            Tuple of (URLs, degraded): degraded if the search was skipped or failed
+        """
+        state = self._resumed(filename)
+        if 'search' in state:
+            logger.info(f"📒 Resuming {filename}: search results taken from journal")
+            return state['search'], False
+        
+        with self._timed([filename], 'search'):
+            if self.text_groups is not None:
+                group = self.text_groups.group_of(filename)
+                representative = group[0] if group is not None else filename
+                urls, degraded = self.text_groups.shared(
+                    representative, f"search:{keyword}", lambda: self.searcher.search_with_status(keyword)
+                )
+            else:
+                urls, degraded = self.searcher.search_with_status(keyword)
+        if not degraded:
+            self._journal(filename, 'search', urls)
+        return urls, degraded
+    
+    def close(self):
+        """Release the network clients' pooled connections and the OCR engines"""
+        self.ocr.close()
+        self.ai_filter.close()
+        self.searcher.close()
+        self.results.close()
+        if self.fulltext is not None:
+            self.fulltext.close()
+        if self.dedup is not None:
+            self.dedup.close()
+    
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        """Statistics of every enabled cache, keyed by cache name"""
+        caches = {
+            'OCR': self.ocr.cache,
+            'Keyword': self.ai_filter.cache,
+            'Search': self.searcher.cache
+        }
+        return {name: cache.stats() for name, cache in caches.items() if cache is not None}
+    
+    def settings(self) -> Dict[str, str]:
+        """Pipeline settings recorded in the manifest (a change forces reprocessing)"""
+        return {
+            'ocr': self.ocr.settings_signature(),
+            'prompt': self.ai_filter.settings_signature(),
+            'search': self.searcher.settings_signature()
+        }
+    
+    def settings_key(self) -> str:
+        """Hash of settings()"""
+        return hash_key(*(f"{k}={v}" for k, v in sorted(self.settings().items())))
+    
+    def needs_processing(self, image_path: Path) -> bool:
+        """False if the image's results are already up to date (counted as skipped)"""
+        if (
+            self.manifest.is_up_to_date(image_path, self.settings())
+            and image_path.name in self.results
+            and not self.force
+        ):
+            logger.info(f"⏭️  Up to date, skipping: {image_path.name}")
+            self.skipped += 1
+            return False
+        return True
+    
+    def iter_pending(self) -> Iterator[Path]:
+        """Lazily yield images that are new, changed or processed with other settings"""
+        for image_path in self.iter_images():
+            if self.needs_processing(image_path):
+                yield image_path
+    
+    def iter_images(self) -> Iterator[Path]:
+        """Lazily yield supported image files in the input folder"""
+        for f in INPUT_FOLDER.iterdir():
+            if f.is_file() and f.suffix.lower() in SUPPORTED_FORMATS:
+                yield f
+    
+    def find_images(self) -> List[Path]:
+        """List supported image files in the input folder"""
+        return sorted(self.iter_images())
+    
+    def process_all(self, mode: str = "serial") -> Tuple[int, int]:
         """
         Process all images in input folder
         
         Args:  
-            delay: Delay between processing images (seconds)
+            mode: "serial" (one image at a time), "parallel"
+                  (OCR in a process pool, network stages in a thread pool),
+                  "pipeline" (streaming stages with bounded queues),
+                  "distributed" (claim images from a queue shared by several machines) or
+                  "watch" (keep running and process images as they arrive)
             
         Returns:  
-            Tuple of (successful_count, total_count)
+            Tuple of (successful_count, total_count); images skipped as
+            up to date are not counted and are reported in self.skipped
         """
-        # Find all image files
-        image_files = [
-            f for f in INPUT_FOLDER.iterdir()
-            if f.is_file() and f.suffix.lower() in SUPPORTED_FORMATS
-        ]
-        
-        if not image_files:
-            logger.warning(f"⚠️ No images found in {INPUT_FOLDER}")
-            logger.info(f"Supported formats: {', '.join(SUPPORTED_FORMATS)}")
-            return 0, 0
-        
-        logger.info(f"\n🎯 Found {len(image_files)} image(s) to process")
-        logger.info(f"📁 Results will be saved to: {OUTPUT_FOLDER}")
-        
+        try:
+            if mode == "pipeline":
+                # Streams the folder lazily instead of listing it up front
+                logger.info(f"📁 Results will be saved to: {OUTPUT_FOLDER}")
+                return AsyncPipeline(self).run()
+            
+            if mode == "distributed":
+                logger.info(f"📁 Results will be saved to: {OUTPUT_FOLDER}")
+                return self._process_distributed()
+            
+            if mode == "watch":
+                logger.info(f"📁 Results will be saved to: {OUTPUT_FOLDER}")
+                return WatchDaemon(self).run()
+            
+            # Find all image files that need work
+            image_files = [f for f in self.find_images() if self.needs_processing(f)]
+            
+            if not image_files:
+                if self.skipped:
+                    logger.info(f"✅ All {self.skipped} image(s) up to date (use --force to reprocess)")
+                else:
+                    logger.warning(f"⚠️ No images found in {INPUT_FOLDER}")
+                    logger.info(f"Supported formats: {', '.join(SUPPORTED_FORMATS)}")
+                return 0, 0
+            
+            logger.info(f"\n🎯 Found {len(image_files)} image(s) to process")
+            logger.info(f"📁 Results will be saved to: {OUTPUT_FOLDER}")
+            
+            if mode == "parallel":
+                successful = self._process_parallel(image_files)
+            else:
+                successful = self._process_serial(image_files)
+            
+            return successful, len(image_files)
+        finally:
+            self.manifest.save()
+            self.journal.compact()
+            self.results.compact()
+            if self.dedup is not None:
+                self.dedup.write_report(OUTPUT_FOLDER / "dedup_report.csv")
+            if self.text_groups is not None:
+                self.text_groups.write_report(OUTPUT_FOLDER / "text_groups.csv")
+    
+    def _process_serial(self, image_files: List[Path]) -> int:
+        """Process images one at a time, returns successful count"""
         successful = 0
         
         for i, image_path in enumerate(image_files, 1):
@@ -172,23 +660,270 @@ class ImageProcessor:
             success, message = self.process_image(image_path)
             if success:
                 successful += 1
+        
+        return successful
+    
+    def _process_parallel(self, image_files: List[Path]) -> int:
+        """
+        Run OCR in a process pool and the network stages in a bounded
+        thread pool. OCR results go to a shared queue; each network worker
+        takes every text already waiting (up to GEMINI_BATCH_SIZE) into one
+        batched Gemini call, as the pipeline's keyword stage does. Rate
+        limiting happens inside the network clients.
+        
+        Returns:
+            Number of successfully processed images
+        """
+        logger.info(
+            f"⚡ Parallel mode: {self.ocr_workers} OCR process(es), "
+            f"{self.network_workers} network worker(s)"
+        )
+        successful = 0
+        done = 0
+        
+        with ProcessPoolExecutor(
+            max_workers=self.ocr_workers,
+            initializer=init_worker,
+            initargs=(self.ocr.languages,)
+        ) as ocr_pool, ThreadPoolExecutor(
+            max_workers=self.network_workers
+        ) as network_pool:
+            ocr_futures = {}
+            # (filename, raw_text, ocr_result) waiting for the network stages;
+            # None tells a network worker to stop
+            texts = queue.Queue()
+            
+            def network_worker() -> int:
+                successful = 0
+                finished = False
+                while not finished:
+                    item = texts.get()
+                    if item is None:
+                        break
+                    # Texts that piled up while Gemini was busy share one call
+                    batch = [item]
+                    while len(batch) < GEMINI_BATCH_SIZE:
+                        try:
+                            extra = texts.get_nowait()
+                        except queue.Empty:
+                            break
+                        if extra is None:
+                            # This worker's end marker: finish the batch, then stop
+                            finished = True
+                            break
+                        batch.append(extra)
+                    successful += sum(success for success, _ in self.process_texts(batch))
+                return successful
+            
+            network_futures = [network_pool.submit(network_worker) for _ in range(self.network_workers)]
+            
+            # Near-duplicates of an image submitted in this run wait for its result
+            submitted = BKTree()
+            deferred = []
+            for image_path in image_files:
+                if self.reuse_duplicate(image_path):
+                    done += 1
+                    successful += 1
+                    continue
+                value = self._phashes.get(image_path.name)
+                if value is not None:
+                    if submitted.nearest(value, self.dedup.max_distance):
+                        deferred.append(image_path)
+                        continue
+                    submitted.add(value, image_path.name)
+                ocr_result = self.resumed_ocr(image_path.name)
+                if ocr_result is None:
+                    ocr_futures[ocr_pool.submit(worker_extract, image_path)] = image_path
+                    continue
+                done += 1
+                self.finish_ocr(image_path.name, ocr_result)
+                if ocr_result.text:
+                    texts.put((image_path.name, ocr_result.text, ocr_result))
             
-            # Delay between images (except last one)
-            if i < len(image_files):
-                logger.debug(f"Waiting {delay}s before next image...")
-                time.sleep(delay)
+            pending = set(ocr_futures)
+            while pending:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    image_path = ocr_futures[future]
+                    done += 1
+                    logger.info(f"\n[OCR {done}/{len(image_files)}] {image_path.name}")
+                    
+                    try:
+                        ocr_result = future.result()
+                    except Exception as e:
+                        logger.error(f"❌ OCR worker failed on {image_path.name}: {e}", exc_info=True)
+                        continue
+                    
+                    self.finish_ocr(image_path.name, ocr_result)
+                    if not ocr_result or not ocr_result.text:
+                        logger.warning(f"⚠️ No text extracted from {image_path.name}, skipping")
+                        continue
+                    texts.put((image_path.name, ocr_result.text, ocr_result))
+            
+            for _ in network_futures:
+                texts.put(None)
+            for future in as_completed(network_futures):
+                successful += future.result()
+        
+        # Their originals are saved now, so these mostly reuse the results
+        for image_path in deferred:
+            success, _ = self.process_image(image_path)
+            if success:
+                successful += 1
+        
+        return successful
+    
+    def queue_fingerprint(self, image_path: Path) -> str:
+        """Cheap change marker for the work queue: size, mtime and pipeline settings"""
+        stat = image_path.stat()
+        return f"{stat.st_size}:{stat.st_mtime_ns}:{self.settings_key()}"
+    
+    def _process_distributed(self) -> Tuple[int, int]:
+        """
+        Drain the input folder together with other nodes through a shared,
+        lease-based work queue. Every node enqueues what it sees; each image is
+        then leased by one node at a time, so OCR, Gemini and search calls are
+        not duplicated. Leases are renewed while working and expire if the node
+        dies, handing its images to the remaining nodes.
+        
+        Returns:
+            Tuple of (successful_count, total_count) for this node
+        """
+        queue = WorkQueue(
+            WORK_QUEUE_PATH,
+            self.node_id or default_node_id(),
+            lease_seconds=WORK_LEASE_SECONDS,
+            max_attempts=WORK_MAX_ATTEMPTS
+        )
+        counts = {'successful': 0, 'total': 0}
+        counts_lock = threading.Lock()
         
-        return successful, len(image_files)
+        try:
+            requeued = queue.requeue_owned()
+            if requeued:
+                logger.info(f"♻️  Re-queued {requeued} image(s) left leased by a previous run of this node")
+            
+            added = queue.enqueue(
+                ((f.name, self.queue_fingerprint(f)) for f in self.find_images()),
+                reset=self.force
+            )
+            logger.info(
+                f"🌐 Distributed mode: node '{queue.node_id}', {self.ocr_workers} worker(s), "
+                f"{added} new/changed image(s) queued, queue state: {queue.counts()}"
+            )
+            
+            def worker():
+                while True:
+                    names = queue.claim(1)
+                    if not names:
+                        if queue.is_drained():
+                            return
+                        # Other nodes still hold leases: wait for them to finish or expire
+                        time.sleep(WORK_POLL_INTERVAL)
+                        continue
+                    
+                    image_path = INPUT_FOLDER / names[0]
+                    success = False
+                    try:
+                        if image_path.exists():
+                            success, message = self.process_image(image_path)
+                        else:
+                            logger.warning(f"⚠️ Queued image no longer exists: {image_path.name}")
+                    finally:
+                        # Partial results go back to the queue for the next run
+                        queue.complete(image_path.name, success, retry=image_path.name in self.degraded)
+                    
+                    with counts_lock:
+                        counts['total'] += 1
+                        counts['successful'] += success
+            
+            # Each thread gets its own OCR engine, and Tesseract runs as a
+            # subprocess (CLI) or with the GIL released (tesserocr), so worker
+            # threads are enough to keep every core busy
+            with queue.heartbeat(), ThreadPoolExecutor(max_workers=self.ocr_workers) as pool:
+                for future in [pool.submit(worker) for _ in range(self.ocr_workers)]:
+                    future.result()
+            
+            logger.info(f"🌐 Queue drained, final state: {queue.counts()}")
+        finally:
+            queue.close()
+        
+        return counts['successful'], counts['total']
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description="OCR -> AI Filter -> Search pipeline")
+    parser.add_argument(
+        "--mode",
+        choices=("serial", "parallel", "pipeline", "distributed", "watch"),
+        default="serial",
+        help="serial: one image at a time; parallel: multi-core OCR + pooled network stages; "
+             "pipeline: streaming stages connected by bounded queues; "
+             "distributed: share the input folder with other machines through a work queue; "
+             "watch: keep running and process images as they arrive (Ctrl-C to stop)"
+    )
+    parser.add_argument(
+        "--ocr-workers",
+        type=int,
+        default=OCR_WORKERS,
+        help=f"OCR processes in parallel/pipeline mode, worker threads in distributed/watch mode "
+             f"(default: {OCR_WORKERS})"
+    )
+    parser.add_argument(
+        "--network-workers",
+        type=int,
+        default=NETWORK_WORKERS,
+        help=f"Concurrent Gemini/search workers in parallel/pipeline mode (default: {NETWORK_WORKERS})"
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Reprocess every image even if its results are up to date"
+    )
+    parser.add_argument(
+        "--no-resume",
+        action="store_true",
+        help="Ignore the job journal of an interrupted run and start every image from scratch"
+    )
+    parser.add_argument(
+        "--keyword-mode",
+        choices=("gemini", "offline"),
+        default=KEYWORD_MODE,
+        help=f"gemini: AI keywords with the offline engine as fallback; "
+             f"offline: local RAKE/TF-IDF keywords, no API calls (default: {KEYWORD_MODE})"
+    )
+    parser.add_argument(
+        "--node-id",
+        default=None,
+        help="Name of this machine in distributed mode (default: hostname); "
+             "give each process a distinct id when running several on one machine"
+    )
+    return parser.parse_args(argv)
 
 
-def main():
+def main(argv: Optional[List[str]] = None):
     """Main entry point"""
+    args = parse_args(argv)
+    
     try:
-        processor = ImageProcessor()
+        processor = ImageProcessor(
+            ocr_workers=args.ocr_workers,
+            network_workers=args.network_workers,
+            force=args.force,
+            resume=not args.no_resume,
+            node_id=(args.node_id or default_node_id()) if args.mode == "distributed" else None,
+            keyword_mode=args.keyword_mode
+        )
         
+        cache_before = processor.cache_stats()
         start_time = time.time()
-        successful, total = processor.process_all()
+        try:
+            successful, total = processor.process_all(mode=args.mode)
+        finally:
+            processor.close()
         elapsed = time.time() - start_time
+        cache_after = processor.cache_stats()
         
         # Summary
         logger.info("\n" + "="*60)
@@ -196,12 +931,37 @@ def main():
         logger.info("="*60)
         logger.info(f"✅ Successful: {successful}/{total}")
         logger.info(f"❌ Failed: {total - successful}/{total}")
+        logger.info(f"⏭️  Skipped (up to date): {processor.skipped}")
+        if processor.degraded:
+            logger.info(f"🔌 Partial results (Gemini/search unavailable), redone next run: {len(processor.degraded)}")
+        if processor.dedup is not None and processor.dedup.matches:
+            logger.info(f"🪞 Near-duplicates reusing earlier results: {len(processor.dedup.matches)}")
+        if processor.text_groups is not None and processor.text_groups.members():
+            logger.info(f"🔗 Near-identical texts sharing keyword/search: {len(processor.text_groups.members())}")
         logger.info(f"⏱️  Time elapsed: {elapsed:.2f}s")
+        ocr_stats = processor.ocr_stats
+        if ocr_stats['images']:
+            logger.info(
+                f"🔁 OCR passes: {ocr_stats['passes']} for {ocr_stats['images']} image(s) "
+                f"({ocr_stats['passes'] / ocr_stats['images']:.2f}/image, "
+                f"{ocr_stats['cached']} from cache)"
+            )
+        for name, after in cache_after.items():
+            before = cache_before.get(name, {})
+            hits = after['hits'] - before.get('hits', 0)
+            misses = after['misses'] - before.get('misses', 0)
+            logger.info(
+                f"⚡ {name} cache: {hits} hit(s), {misses} miss(es) "
+                f"({after['entries']} entries, {after['bytes'] / 1024 / 1024:.1f} MB)"
+            )
+        metrics.log_summary(logger)
         logger.info(f"📁 Results saved to: {OUTPUT_FOLDER}")
         logger.info("="*60)
         
         if successful > 0:
             logger.info("\n🎉 Processing complete!")
+        elif total == 0 and processor.skipped:
+            logger.info("\n✅ Nothing to do, all results are up to date")
         else:
             logger.warning("\n⚠️ No images were successfully processed")
         
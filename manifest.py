@@ -0,0 +1,113 @@
+"""
+Manifest Module - Track which images already have up-to-date results
+
+For every processed image the manifest stores its content hash and the
+pipeline settings (OCR, prompt, search) that produced its results.
+A rerun only processes images that are new, changed, or were produced with
+different settings.
+"""
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from logger import setup_logger
+from statefile import StateFile
+
+logger = setup_logger('Main')
+
+
+def file_hash(path: Path) -> str:
+    """SHA-256 of a file's content"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class Manifest:
+    """JSON manifest of image fingerprints and the settings used to process them"""
+
+    def __init__(self, path: Path, output_folder: Path, require_text: bool = True):
+        self.path = Path(path)
+        self.output_folder = Path(output_folder)
+        # Whether a missing OUTPUT_FOLDER/<name>.txt view forces reprocessing
+        self.require_text = require_text
+        self._lock = threading.Lock()
+        self._file = StateFile(self.path, indent=1)
+        # filename -> (sha256, size, mtime) for images checked in this run
+        self._seen: Dict[str, Tuple[str, int, float]] = {}
+        self.entries: Dict[str, dict] = {}
+
+        if self.path.exists():
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"⚠️ Cannot read manifest ({e}), starting fresh")
+
+    def fingerprint(self, image_path: Path) -> str:
+        """Content hash of an image, reusing the stored hash if size and mtime are unchanged"""
+        stat = image_path.stat()
+        entry = self.entries.get(image_path.name)
+
+        if entry and entry.get('size') == stat.st_size and entry.get('mtime') == stat.st_mtime:
+            content_hash = entry['sha256']
+        else:
+            content_hash = file_hash(image_path)
+
+        with self._lock:
+            self._seen[image_path.name] = (content_hash, stat.st_size, stat.st_mtime)
+        return content_hash
+
+    def content_hash(self, filename: str) -> Optional[str]:
+        """Hash computed for `filename` in this run, if it was fingerprinted"""
+        with self._lock:
+            seen = self._seen.get(filename)
+        return seen[0] if seen else None
+
+    def is_up_to_date(self, image_path: Path, settings: Dict[str, str]) -> bool:
+        """True if the image's results exist and were produced from the same content and settings"""
+        content_hash = self.fingerprint(image_path)
+        entry = self.entries.get(image_path.name)
+
+        return (
+            entry is not None
+            and entry.get('sha256') == content_hash
+            and entry.get('settings') == settings
+            and (not self.require_text or (self.output_folder / f"{image_path.name}.txt").exists())
+        )
+
+    def mark_done(self, filename: str, settings: Dict[str, str]):
+        """Record that results for `filename` were written with `settings`"""
+        with self._lock:
+            seen = self._seen.get(filename)
+            if seen is None:
+                return
+            content_hash, size, mtime = seen
+            self.entries[filename] = {
+                'sha256': content_hash,
+                'size': size,
+                'mtime': mtime,
+                'settings': dict(settings),
+            }
+
+        if self._file.changed():
+            self.save()
+
+    def forget(self, filename: str):
+        """Drop the entry of `filename`, so the next run processes it again"""
+        with self._lock:
+            if self.entries.pop(filename, None) is None:
+                return
+        self._file.changed()
+
+    def _snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            return dict(self.entries)
+
+    def save(self):
+        """Write the manifest atomically"""
+        self._file.save(self._snapshot)
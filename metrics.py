@@ -0,0 +1,50 @@
+"""
+Metrics Module - Lightweight per-stage timing statistics
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+
+
+class StageMetrics:
+    """Thread-safe accumulator of call counts and busy time per stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, float]] = {}
+
+    def record(self, stage: str, seconds: float):
+        """Record one call of `stage` that took `seconds`"""
+        with self._lock:
+            entry = self._stats.setdefault(stage, {'count': 0, 'total': 0.0, 'max': 0.0})
+            entry['count'] += 1
+            entry['total'] += seconds
+            entry['max'] = max(entry['max'], seconds)
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Context manager timing the wrapped block as one call of `stage`"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """Copy of the current statistics"""
+        with self._lock:
+            return {stage: dict(entry) for stage, entry in self._stats.items()}
+
+    def log_summary(self, logger):
+        """Write one line per stage to `logger`"""
+        for stage, entry in sorted(self.snapshot().items()):
+            avg = entry['total'] / entry['count'] if entry['count'] else 0.0
+            logger.info(
+                f"⏱️  {stage:<16} calls={entry['count']:<6} "
+                f"total={entry['total']:.2f}s avg={avg:.3f}s max={entry['max']:.3f}s"
+            )
+
+
+# Process-wide metrics shared by the pipeline and the network clients
+metrics = StageMetrics()
@@ -1,25 +1,152 @@
 """
 OCR Module - Extract text from images using Tesseract (PIL only)
 """
-import pytesseract
+import io
+import threading
+import time
+from dataclasses import dataclass, asdict
 from PIL import Image, ImageEnhance, ImageFilter
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 from logger import setup_logger
-from config import TESSERACT_PATH, OCR_LANGUAGES
+from cache import DiskCache, hash_key
+from ocr_engine import TesseractCLIEngine, create_engine
+import preprocess as vectorized
+from config import (
+    OCR_LANGUAGES,
+    OCR_BACKEND,
+    CACHE_FOLDER,
+    OCR_CACHE_ENABLED,
+    OCR_CACHE_MAX_MB,
+    OCR_SELECTION,
+    OCR_CONFIDENCE_THRESHOLD,
+    OCR_PREPROCESS_ENGINE,
+    OCR_BINARIZATION,
+    OCR_SAUVOLA_WINDOW,
+    OCR_NORMALIZE,
+    OCR_TARGET_TEXT_HEIGHT,
+    OCR_MAX_PIXELS
+)
 
 logger = setup_logger('OCR')
-pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
+
+
+@dataclass
+class OCRResult:
+    """OCR output plus how it was obtained"""
+    text: str
+    method: str                         # "Preprocessed" or "Raw"
+    confidence: Optional[float] = None  # Mean word confidence (0-100), None in "longest" mode
+    passes: int = 0                     # Tesseract passes run (0 = served from cache)
+    cached: bool = False
+    seconds: float = 0.0                # Wall time of this extraction
 
 
 class OCRProcessor:
     """OCR Processor with PIL preprocessing"""
     
-    def __init__(self, languages: str = OCR_LANGUAGES):
+    def __init__(
+        self,
+        languages: str = OCR_LANGUAGES,
+        use_cache: bool = OCR_CACHE_ENABLED,
+        backend: str = OCR_BACKEND,
+        selection: str = OCR_SELECTION,
+        confidence_threshold: float = OCR_CONFIDENCE_THRESHOLD,
+        preprocess_engine: str = OCR_PREPROCESS_ENGINE,
+        binarization: str = OCR_BINARIZATION,
+        normalize: bool = OCR_NORMALIZE
+    ):
         self.languages = languages
+        self.backend = backend
+        self.selection = selection
+        self.confidence_threshold = confidence_threshold
+        self.preprocess_engine = preprocess_engine
+        self.binarization = binarization
+        self.normalize = normalize
+        # Created on first use, so processes that never OCR don't load models.
+        # One engine per thread: a persistent engine (tesserocr) is not
+        # thread-safe, so threads sharing one would OCR one image at a time
+        self._local = threading.local()
+        self._engines = []
+        self._engines_lock = threading.Lock()
+        self.cache = None
+        if use_cache:
+            self.cache = DiskCache(
+                CACHE_FOLDER / "ocr.sqlite3",
+                max_bytes=OCR_CACHE_MAX_MB * 1024 * 1024,
+                name="ocr"
+            )
         logger.info(f"OCR Processor initialized with languages: {languages}")
     
-    def preprocess_image(self, image:  Image.Image) -> Image.Image:
+    @property
+    def engine(self):
+        """The calling thread's OCR engine"""
+        engine = getattr(self._local, 'engine', None)
+        if engine is None:
+            engine = self._set_engine(create_engine(self.languages, self.backend))
+        return engine
+    
+    def _set_engine(self, engine, replaces=None):
+        self._local.engine = engine
+        with self._engines_lock:
+            if replaces is not None:
+                self._engines.remove(replaces)
+            self._engines.append(engine)
+        return engine
+    
+    def _call_engine(self, method: str, image: Image.Image):
+        """Run an engine method, switching to the Tesseract CLI if the persistent engine fails"""
+        engine = self.engine
+        try:
+            return getattr(engine, method)(image)
+        except Exception as e:
+            if isinstance(engine, TesseractCLIEngine):
+                raise
+            logger.warning(f"⚠️ {engine.name} engine failed ({e}), switching to Tesseract CLI")
+            engine.close()
+            engine = self._set_engine(TesseractCLIEngine(self.languages), replaces=engine)
+            return getattr(engine, method)(image)
+    
+    def close(self):
+        """Release the engines of every thread (models loaded by tesserocr)"""
+        with self._engines_lock:
+            engines, self._engines = self._engines, []
+        for engine in engines:
+            engine.close()
+    
+    def image_to_string(self, image: Image.Image) -> str:
+        """OCR an in-memory image"""
+        return self._call_engine("image_to_string", image)
+    
+    def recognize(self, image: Image.Image) -> Tuple[str, float]:
+        """OCR an in-memory image, returning (text, mean word confidence)"""
+        return self._call_engine("recognize", image)
+    
+    def settings_signature(self, preprocess: bool = True) -> str:
+        """Settings that change OCR output; part of the cache key"""
+        signature = f"lang={self.languages}|preprocess={preprocess}|select={self.selection}"
+        if self.selection == "confidence":
+            signature += f"|min_conf={self.confidence_threshold}"
+        if self.normalize:
+            signature += f"|norm={OCR_TARGET_TEXT_HEIGHT}:{OCR_MAX_PIXELS}"
+        if preprocess:
+            signature += f"|prep={self.preprocess_engine}"
+            if self.preprocess_engine == "numpy":
+                signature += f":{self.binarization}"
+                if self.binarization == "sauvola":
+                    signature += f":{OCR_SAUVOLA_WINDOW}"
+        return signature
+    
+    def preprocess_image(self, image: Image.Image) -> Image.Image:
+        """Preprocess with the configured engine (NumPy by default, PIL chain as fallback)"""
+        if self.preprocess_engine == "numpy":
+            try:
+                return vectorized.preprocess(image, self.binarization, OCR_SAUVOLA_WINDOW)
+            except Exception as e:
+                logger.warning(f"Vectorized preprocessing failed ({e}), using PIL chain")
+        return self.preprocess_image_pil(image)
+    
+    def preprocess_image_pil(self, image:  Image.Image) -> Image.Image:
         """Enhanced preprocessing with PIL"""
         try:
             # Convert to RGB if needed
@@ -60,6 +187,20 @@ class OCRProcessor:
         Returns:  
             Extracted text or None if failed
         """
+        result = self.extract(image_path, preprocess)
+        return result.text if result and result.text else None
+    
+    def extract(self, image_path: str, preprocess: bool = True) -> Optional[OCRResult]:
+        """
+        Extract text from image, with details on the chosen method
+        
+        Args:
+            image_path: Path to image file
+            preprocess: Whether to preprocess image
+            
+        Returns:
+            OCRResult (text may be empty) or None if OCR failed
+        """
         image_path = Path(image_path)
         
         if not image_path.exists():
@@ -68,40 +209,124 @@ class OCRProcessor:
         
         logger.info(f"Processing:   {image_path. name}")
         
-        results = []
+        try:
+            data = image_path.read_bytes()
+        except OSError as e:
+            logger.error(f"Cannot read image: {e}")
+            return None
+        
+        start = time.perf_counter()
+        cache_key = None
+        if self.cache is not None:
+            cache_key = hash_key(data, self.settings_signature(preprocess))
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"⚡ OCR cache hit: {image_path.name} (method: {cached['method']})")
+                cached.update(passes=0, cached=True, seconds=time.perf_counter() - start)
+                return OCRResult(**cached)
         
+        result = self._run_ocr(data, preprocess)
+        if result is None:
+            return None
+        result.seconds = time.perf_counter() - start
+        
+        if result.text:
+            confidence = f", confidence: {result.confidence:.1f}" if result.confidence is not None else ""
+            logger.info(
+                f"✅ Extracted {len(result.text)} characters "
+                f"(method: {result.method}{confidence}, passes: {result.passes})"
+            )
+            logger.debug(f"Preview: {result.text[:100]}...")
+        else:
+            logger. warning("⚠️ No text extracted")
+        
+        if self.cache is not None:
+            self.cache.set(cache_key, asdict(result))
+        
+        return result
+    
+    def load_image(self, data: bytes) -> Image.Image:
+        """Decode image bytes, normalized to the target text height if enabled"""
+        if not self.normalize:
+            return Image.open(io.BytesIO(data))
+        
+        image, scale = vectorized.load_normalized(data, OCR_TARGET_TEXT_HEIGHT, OCR_MAX_PIXELS)
+        if scale != 1.0:
+            logger.debug(f"Resolution normalized: x{scale:.2f} -> {image.width}x{image.height}")
+        return image
+    
+    def _run_ocr(self, data: bytes, preprocess: bool) -> Optional[OCRResult]:
+        """Run Tesseract on the encoded image bytes, None if OCR failed"""
         try:
-            image = Image.open(image_path)
-            
-            # Try with preprocessing
-            if preprocess: 
-                processed_img = self.preprocess_image(image. copy())
-                text = pytesseract.image_to_string(processed_img, lang=self.languages)
-                results.append(("Preprocessed", text. strip()))
-                logger.debug(f"Preprocessed:  {len(text. strip())} chars")
+            image = self.load_image(data)
             
-            # Try raw image
-            text = pytesseract.image_to_string(image, lang=self.languages)
-            results. append(("Raw", text.strip()))
-            logger.debug(f"Raw: {len(text. strip())} chars")
+            if self.selection == "confidence":
+                return self._select_by_confidence(image, preprocess)
+            return self._select_longest(image, preprocess)
             
         except Exception as e:
             logger.error(f"OCR failed: {e}", exc_info=True)
             return None
+    
+    def _select_longest(self, image: Image.Image, preprocess: bool) -> OCRResult:
+        """Original strategy: run every pass and keep the longest text"""
+        results = []
+        
+        # Try with preprocessing
+        if preprocess: 
+            processed_img = self.preprocess_image(image. copy())
+            text = self.image_to_string(processed_img)
+            results.append(("Preprocessed", text. strip()))
+            logger.debug(f"Preprocessed:  {len(text. strip())} chars")
+        
+        # Try raw image
+        text = self.image_to_string(image)
+        results. append(("Raw", text.strip()))
+        logger.debug(f"Raw: {len(text. strip())} chars")
         
         # Return the longest result
-        if results:
-            best_method, best_text = max(results, key=lambda x: len(x[1]))
+        best_method, best_text = max(results, key=lambda x: len(x[1]))
+        return OCRResult(text=best_text, method=best_method, passes=len(results))
+    
+    def _select_by_confidence(self, image: Image.Image, preprocess: bool) -> OCRResult:
+        """
+        Run the preferred pass first and stop if its mean word confidence
+        clears the threshold; otherwise run the other pass and keep the
+        more confident one
+        """
+        passes = [("Preprocessed", lambda: self.preprocess_image(image.copy()))] if preprocess else []
+        passes.append(("Raw", lambda: image))
+        
+        best = None
+        for count, (method, prepare) in enumerate(passes, 1):
+            text, confidence = self.recognize(prepare())
+            text = text.strip()
+            logger.debug(f"{method}: {len(text)} chars, confidence {confidence:.1f}")
+            
+            candidate = OCRResult(text=text, method=method, confidence=confidence)
+            if best is None or (confidence, len(text)) > (best.confidence, len(best.text)):
+                best = candidate
+            best.passes = count
             
-            if best_text:
-                logger.info(f"✅ Extracted {len(best_text)} characters (method: {best_method})")
-                logger.debug(f"Preview: {best_text[:100]}...")
-                return best_text
-            else:
-                logger. warning("⚠️ No text extracted")
-                return None
-        
-        return None
+            if text and confidence >= self.confidence_threshold:
+                break
+        
+        return best
+
+
+# Per-process OCR engine used by the parallel / pipeline batch modes
+_worker_ocr: Optional[OCRProcessor] = None
+
+
+def init_worker(languages: str = OCR_LANGUAGES):
+    """Create one OCRProcessor per worker process (ProcessPoolExecutor initializer)"""
+    global _worker_ocr
+    _worker_ocr = OCRProcessor(languages)
+
+
+def worker_extract(image_path: Path) -> Optional[OCRResult]:
+    """Run OCR inside a worker process"""
+    return _worker_ocr.extract(image_path)
 
 
 def extract_text_from_image(image_path: str) -> str:
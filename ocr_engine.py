@@ -0,0 +1,140 @@
+"""
+OCR Engine Module - Tesseract backends
+
+- TesserocrEngine: keeps one libtesseract instance (and its vie+eng models)
+  loaded for the life of the process; images are passed in memory.
+- TesseractCLIEngine: original pytesseract path, spawns `tesseract` per call.
+"""
+import threading
+from typing import List, Tuple
+
+import pytesseract
+from PIL import Image
+
+from logger import setup_logger
+from config import TESSERACT_PATH, TESSDATA_PATH, OCR_BACKEND
+
+try:
+    import tesserocr
+except ImportError:
+    tesserocr = None
+
+logger = setup_logger('OCR')
+pytesseract.pytesseract.tesseract_cmd = TESSERACT_PATH
+
+
+def mean_confidence(confidences: List[float]) -> float:
+    """Mean of valid (non-negative) word confidences, 0 if there are none"""
+    valid = [c for c in confidences if c >= 0]
+    return sum(valid) / len(valid) if valid else 0.0
+
+
+class TesseractCLIEngine:
+    """Tesseract through pytesseract (one subprocess per call)"""
+
+    name = "cli"
+
+    def __init__(self, languages: str):
+        self.languages = languages
+
+    def image_to_string(self, image: Image.Image) -> str:
+        return pytesseract.image_to_string(image, lang=self.languages)
+
+    def recognize(self, image: Image.Image) -> Tuple[str, float]:
+        """
+        OCR with per-word confidences (single tesseract run, TSV output)
+
+        Returns:
+            Tuple of (text, mean word confidence 0-100)
+        """
+        data = pytesseract.image_to_data(
+            image, lang=self.languages, output_type=pytesseract.Output.DICT
+        )
+
+        lines = {}
+        confidences = []
+        for i, word in enumerate(data['text']):
+            if not word or not word.strip():
+                continue
+            line_id = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            lines.setdefault(line_id, []).append(word)
+            confidences.append(float(data['conf'][i]))
+
+        # Rebuild text: one line per Tesseract line, blank line between paragraphs
+        text_lines = []
+        previous_par = None
+        for (block, par, _), words in lines.items():
+            if previous_par is not None and (block, par) != previous_par:
+                text_lines.append("")
+            text_lines.append(" ".join(words))
+            previous_par = (block, par)
+
+        return "\n".join(text_lines), mean_confidence(confidences)
+
+    def close(self):
+        pass
+
+
+class TesserocrEngine:
+    """Persistent in-process Tesseract engine (requires the tesserocr package)"""
+
+    name = "tesserocr"
+
+    def __init__(self, languages: str, tessdata_path: str = TESSDATA_PATH):
+        kwargs = {'lang': languages}
+        if tessdata_path:
+            kwargs['path'] = tessdata_path
+
+        self.languages = languages
+        self._api = tesserocr.PyTessBaseAPI(**kwargs)
+        # PyTessBaseAPI is not thread-safe
+        self._lock = threading.Lock()
+
+    def image_to_string(self, image: Image.Image) -> str:
+        with self._lock:
+            self._api.SetImage(image)
+            return self._api.GetUTF8Text()
+
+    def recognize(self, image: Image.Image) -> Tuple[str, float]:
+        """
+        OCR with per-word confidences from the same recognition pass
+
+        Returns:
+            Tuple of (text, mean word confidence 0-100)
+        """
+        with self._lock:
+            self._api.SetImage(image)
+            text = self._api.GetUTF8Text()
+            confidences = self._api.AllWordConfidences()
+        return text, mean_confidence(confidences)
+
+    def close(self):
+        with self._lock:
+            self._api.End()
+
+
+def create_engine(languages: str, backend: str = OCR_BACKEND):
+    """
+    Build an OCR engine
+
+    Args:
+        languages: Tesseract language string (e.g. "vie+eng")
+        backend: "tesserocr", "cli" or "auto" (tesserocr if available, else cli)
+
+    Returns:
+        Engine instance; falls back to the CLI engine if tesserocr cannot start
+    """
+    if backend in ("auto", "tesserocr"):
+        if tesserocr is None:
+            if backend == "tesserocr":
+                logger.warning("⚠️ tesserocr not installed, falling back to Tesseract CLI")
+        else:
+            try:
+                engine = TesserocrEngine(languages)
+                logger.info(f"OCR engine: tesserocr (persistent, languages: {languages})")
+                return engine
+            except Exception as e:
+                logger.warning(f"⚠️ tesserocr failed to start ({e}), falling back to Tesseract CLI")
+
+    logger.info("OCR engine: Tesseract CLI")
+    return TesseractCLIEngine(languages)
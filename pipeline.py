@@ -0,0 +1,208 @@
+"""
+Pipeline Module - Streaming asyncio engine: OCR -> AI Filter -> Search -> Save
+
+Each stage runs its own workers and is connected to the next one by a
+bounded asyncio.Queue, so image N+1 is OCR'd while image N waits on Gemini
+and image N-1 waits on DuckDuckGo. A full queue blocks the stage before it
+(backpressure), which keeps memory flat regardless of the input folder size.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Awaitable, Callable, Optional, Tuple
+
+from logger import setup_logger
+from metrics import metrics
+from ocr import init_worker, worker_extract
+from config import PIPELINE_QUEUE_SIZE, GEMINI_BATCH_SIZE
+
+logger = setup_logger('Pipeline')
+
+# Marks the end of the stream on a queue
+_DONE = object()
+
+
+class AsyncPipeline:
+    """Bounded-queue streaming pipeline driven by an ImageProcessor"""
+
+    def __init__(self, processor, queue_size: int = PIPELINE_QUEUE_SIZE):
+        """
+        Args:
+            processor: ImageProcessor providing the OCR / filter / search / save steps
+            queue_size: Maximum items waiting between two stages
+        """
+        self.processor = processor
+        self.queue_size = max(1, queue_size)
+        self.total = 0
+        self.successful = 0
+
+    def run(self) -> Tuple[int, int]:
+        """
+        Process every image in the input folder
+
+        Returns:
+            Tuple of (successful_count, total_count)
+        """
+        return asyncio.run(self._run())
+
+    async def _run(self) -> Tuple[int, int]:
+        processor = self.processor
+        loop = asyncio.get_running_loop()
+
+        logger.info(
+            f"🚰 Pipeline mode: {processor.ocr_workers} OCR process(es), "
+            f"{processor.network_workers} worker(s) per network stage, "
+            f"queue size {self.queue_size}"
+        )
+
+        ocr_queue = asyncio.Queue(self.queue_size)
+        keyword_queue = asyncio.Queue(self.queue_size)
+        search_queue = asyncio.Queue(self.queue_size)
+        save_queue = asyncio.Queue(self.queue_size)
+
+        # Keyword + search stages each get their own threads, plus one for saving
+        threads = ThreadPoolExecutor(max_workers=2 * processor.network_workers + 1)
+        ocr_pool = ProcessPoolExecutor(
+            max_workers=processor.ocr_workers,
+            initializer=init_worker,
+            initargs=(processor.ocr.languages,)
+        )
+
+        # Each item flowing between stages is a dict describing one image
+        async def run_ocr(image_path: Path):
+            if await loop.run_in_executor(threads, processor.reuse_duplicate, image_path):
+                self.successful += 1
+                return None
+            ocr_result = processor.resumed_ocr(image_path.name)
+            if ocr_result is None:
+                ocr_result = await loop.run_in_executor(ocr_pool, worker_extract, image_path)
+            processor.finish_ocr(image_path.name, ocr_result)
+            if not ocr_result or not ocr_result.text:
+                logger.warning(f"⚠️ No text extracted from {image_path.name}, skipping")
+                return None
+            return {'filename': image_path.name, 'raw_text': ocr_result.text, 'ocr': ocr_result}
+
+        async def run_keyword(items):
+            # Every text waiting in the queue goes into one batched Gemini call
+            keywords = await loop.run_in_executor(
+                threads,
+                processor.keyword_batch_stage,
+                [(item['filename'], item['raw_text']) for item in items]
+            )
+            for item, (keyword, degraded) in zip(items, keywords):
+                item['keyword'] = keyword
+                item['degraded'] = degraded
+            return items
+
+        async def run_search(item):
+            item['urls'], degraded = await loop.run_in_executor(
+                threads, processor.search_stage, item['filename'], item['keyword']
+            )
+            item['degraded'] = item['degraded'] or degraded
+            return item
+
+        async def run_save(item):
+            success = await loop.run_in_executor(
+                threads,
+                processor.save_results,
+                item['filename'],
+                item['raw_text'],
+                item['keyword'],
+                item['urls'],
+                item['ocr'],
+                item['degraded']
+            )
+            if success:
+                self.successful += 1
+            return None
+
+        try:
+            stages = [
+                self._start_stage("ocr", run_ocr, ocr_queue, keyword_queue, processor.ocr_workers),
+                self._start_stage(
+                    "keyword", run_keyword, keyword_queue, search_queue, processor.network_workers,
+                    batch_size=GEMINI_BATCH_SIZE
+                ),
+                self._start_stage("search", run_search, search_queue, save_queue, processor.network_workers),
+                self._start_stage("save", run_save, save_queue, None, 1),
+            ]
+
+            await self._produce(ocr_queue, processor.ocr_workers)
+
+            # Drain stage by stage, forwarding the end marker downstream
+            for i, (workers, out_queue) in enumerate(stages):
+                await asyncio.gather(*workers)
+                if out_queue is not None:
+                    next_workers = len(stages[i + 1][0])
+                    for _ in range(next_workers):
+                        await out_queue.put(_DONE)
+        finally:
+            ocr_pool.shutdown(wait=True)
+            threads.shutdown(wait=True)
+
+        return self.successful, self.total
+
+    async def _produce(self, ocr_queue: asyncio.Queue, consumers: int):
+        """Feed image paths lazily into the OCR queue, blocking when it is full"""
+        for image_path in self.processor.iter_pending():
+            self.total += 1
+            logger.info(f"📥 [{self.total}] Queued: {image_path.name}")
+            await ocr_queue.put(image_path)
+
+        if not self.total:
+            logger.warning("⚠️ No images to process in input folder")
+
+        for _ in range(consumers):
+            await ocr_queue.put(_DONE)
+
+    def _start_stage(
+        self,
+        name: str,
+        handler: Callable[[object], Awaitable[Optional[object]]],
+        in_queue: asyncio.Queue,
+        out_queue: Optional[asyncio.Queue],
+        workers: int,
+        batch_size: int = 0
+    ):
+        """
+        Spawn `workers` tasks that move items from in_queue through handler to out_queue
+
+        With batch_size > 0 the handler receives a list: the next item plus
+        whatever else is already waiting (up to batch_size), and returns the
+        list of items to forward.
+        """
+
+        async def worker():
+            finished = False
+            while not finished:
+                item = await in_queue.get()
+                if item is _DONE:
+                    return
+
+                if batch_size:
+                    item = [item]
+                    while len(item) < batch_size:
+                        try:
+                            extra = in_queue.get_nowait()
+                        except asyncio.QueueEmpty:
+                            break
+                        if extra is _DONE:
+                            # This worker's end marker: finish the batch, then stop
+                            finished = True
+                            break
+                        item.append(extra)
+
+                try:
+                    with metrics.timer(name):
+                        result = await handler(item)
+                except Exception as e:
+                    logger.error(f"❌ Stage '{name}' failed: {e}", exc_info=True)
+                    continue
+                if result is None or out_queue is None:
+                    continue
+                for out in (result if batch_size else [result]):
+                    if out is not None:
+                        await out_queue.put(out)
+
+        tasks = [asyncio.create_task(worker()) for _ in range(max(1, workers))]
+        return tasks, out_queue
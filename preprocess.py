@@ -0,0 +1,254 @@
+"""
+Preprocess Module - Vectorized (NumPy) image preprocessing for OCR
+
+Works on one float32 grayscale buffer that is modified in place where
+possible, instead of allocating a new full-size PIL image per step:
+contrast stretch -> sharpen -> binarize (fixed / Otsu / Sauvola) -> 3x3 denoise.
+
+Also resolution normalization: reduced-size JPEG decoding and rescaling to
+a target text height before OCR.
+"""
+import io
+from typing import Optional, Tuple
+
+import numpy as np
+from PIL import Image
+
+from logger import setup_logger
+
+logger = setup_logger('OCR')
+
+# Binarization modes accepted by preprocess()
+BINARIZATION_MODES = ('fixed', 'otsu', 'sauvola')
+
+
+def box_sum(a: np.ndarray, radius: int) -> np.ndarray:
+    """Sum over a (2*radius+1)^2 window around every pixel (edge-padded), via an integral image"""
+    size = 2 * radius + 1
+    padded = np.pad(a, ((radius + 1, radius), (radius + 1, radius)), mode='edge')
+    ii = padded.cumsum(axis=0, dtype=np.float64).cumsum(axis=1)
+    return ii[size:, size:] - ii[:-size, size:] - ii[size:, :-size] + ii[:-size, :-size]
+
+
+def box3_sum(a: np.ndarray) -> np.ndarray:
+    """3x3 window sum (edge-padded) using separable shifted-view additions in a's dtype"""
+    p = np.pad(a, 1, mode='edge')
+    rows = p[:, :-2] + p[:, 1:-1]
+    rows += p[:, 2:]
+    out = rows[:-2] + rows[1:-1]
+    out += rows[2:]
+    return out
+
+
+def stretch_contrast(buf: np.ndarray, factor: float = 2.0) -> np.ndarray:
+    """In-place equivalent of ImageEnhance.Contrast(factor) on a grayscale buffer"""
+    mean = float(buf.mean())
+    buf -= mean
+    buf *= factor
+    buf += mean
+    np.clip(buf, 0, 255, out=buf)
+    return buf
+
+
+def sharpen(buf: np.ndarray, factor: float = 1.5) -> np.ndarray:
+    """In-place equivalent of ImageEnhance.Sharpness(factor) (PIL SMOOTH kernel)"""
+    # SMOOTH kernel: 3x3 ones with centre weight 5, normalised by 13
+    smooth = box3_sum(buf)
+    smooth += 4 * buf
+    smooth *= (1 - factor) / 13
+    # blend(smooth, buf, factor) = factor * buf + (1 - factor) * smooth
+    buf *= factor
+    buf += smooth
+    np.clip(buf, 0, 255, out=buf)
+    return buf
+
+
+def otsu_threshold(buf: np.ndarray) -> float:
+    """
+    Global threshold maximising between-class variance of the histogram;
+    128 for a single-level image (blank or solid-colour page)
+    """
+    hist = np.bincount(buf.astype(np.uint8).ravel(), minlength=256).astype(np.float64)
+    levels = np.arange(256, dtype=np.float64)
+
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    cum_mean = np.cumsum(hist * levels)
+    total_mean = cum_mean[-1]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_bg = cum_mean / weight_bg
+        mean_fg = (total_mean - cum_mean) / weight_fg
+        variance = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+
+    if np.isnan(variance).all():
+        return 128.0
+    return float(np.nanargmax(variance))
+
+
+def sauvola_threshold(buf: np.ndarray, window: int = 25, k: float = 0.2, r: float = 128.0) -> np.ndarray:
+    """
+    Per-pixel Sauvola threshold T = m * (1 + k * (s / r - 1)), where m and s
+    are the local mean and standard deviation over a window x window block.
+    Handles uneven lighting (shadows, phone photos) that a global threshold misses.
+    """
+    radius = max(1, window // 2)
+    area = float((2 * radius + 1) ** 2)
+
+    mean = box_sum(buf, radius)
+    mean /= area
+    sq_mean = box_sum(np.square(buf, dtype=np.float64), radius)
+    sq_mean /= area
+
+    # Reuse sq_mean as the std buffer
+    sq_mean -= np.square(mean)
+    np.maximum(sq_mean, 0, out=sq_mean)
+    std = np.sqrt(sq_mean, out=sq_mean)
+
+    std /= r
+    std -= 1
+    std *= k
+    std += 1
+    mean *= std
+    return mean
+
+
+def majority_filter(binary: np.ndarray) -> np.ndarray:
+    """3x3 median filter for a boolean image: a pixel is set if >= 5 of its 9 neighbours are"""
+    return box3_sum(binary.view(np.uint8)) >= 5
+
+
+def preprocess(image: Image.Image, binarization: str = 'otsu', window: int = 25) -> Image.Image:
+    """
+    Full preprocessing chain on a single NumPy buffer
+
+    Args:
+        image: Input PIL image (any mode)
+        binarization: 'fixed' (128), 'otsu' or 'sauvola'
+        window: Sauvola window size in pixels
+
+    Returns:
+        Binarized 'L' image (text black on white)
+    """
+    if binarization not in BINARIZATION_MODES:
+        raise ValueError(f"Unknown binarization mode: {binarization}")
+
+    if image.mode != 'L':
+        image = image.convert('L')
+    buf = np.asarray(image, dtype=np.float32).copy()
+
+    stretch_contrast(buf, 2.0)
+    sharpen(buf, 1.5)
+
+    if binarization == 'sauvola':
+        binary = buf > sauvola_threshold(buf, window)
+    elif binarization == 'otsu':
+        binary = buf > otsu_threshold(buf)
+    else:
+        binary = buf > 128
+
+    binary = majority_filter(binary)
+    return Image.fromarray(binary.astype(np.uint8) * 255)
+
+
+def estimate_text_height(image: Image.Image, sample_size: int = 1200) -> Optional[float]:
+    """
+    Estimate the typical text line height (pixels, full resolution) from the
+    horizontal projection profile of an Otsu-binarized thumbnail.
+
+    Returns:
+        Median line height, or None if no clear text lines were found
+    """
+    gray = image.convert('L')
+    factor = max(1, -(-max(gray.size) // sample_size))
+    if factor > 1:
+        gray = gray.reduce(factor)
+
+    buf = np.asarray(gray, dtype=np.float32)
+    ink = buf <= otsu_threshold(buf)
+    if ink.mean() > 0.5:
+        # Light text on dark background
+        ink = ~ink
+
+    # Rows containing text have noticeably more ink than blank rows
+    profile = ink.mean(axis=1)
+    inked = profile > max(0.01, 0.25 * float(profile.mean()))
+
+    # Lengths of consecutive inked-row runs = text line heights
+    edges = np.diff(np.concatenate(([0], inked.view(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    heights = (ends - starts)[(ends - starts) >= 2]
+
+    if len(heights) < 3:
+        return None
+    return float(np.median(heights)) * factor
+
+
+def _jpeg_draft(image: Image.Image, size: Tuple[int, int], mode: str = 'L') -> Image.Image:
+    """Request DCT-domain downscaling (1/2, 1/4, 1/8) to at least `size` before decoding"""
+    image.draft(mode, size)
+    return image
+
+
+def load_normalized(
+    data: bytes,
+    target_height: float,
+    max_pixels: int,
+    min_scale: float = 0.25,
+    max_scale: float = 3.0,
+    sample_size: int = 1200
+) -> Tuple[Image.Image, float]:
+    """
+    Decode an image rescaled so text lines are about target_height pixels
+    tall (Tesseract's sweet spot, ~300 DPI for body text), never exceeding
+    max_pixels.
+
+    For JPEGs the text height is estimated on a reduced-size decode and the
+    final image is decoded directly at (close to) the target size, so the
+    full-resolution bitmap is never materialised when downscaling. Rescaled
+    images are returned in grayscale (Tesseract binarizes internally anyway),
+    which also makes decoding and resampling about 3x cheaper.
+
+    Returns:
+        Tuple of (image, scale factor relative to the original size)
+    """
+    image = Image.open(io.BytesIO(data))
+    width, height = image.size
+    is_jpeg = image.format == 'JPEG'
+
+    try:
+        if is_jpeg:
+            # Largest DCT reduction that keeps the preview >= sample_size
+            reduction = 1
+            while reduction < 8 and max(width, height) // (reduction * 2) >= sample_size:
+                reduction *= 2
+            preview = _jpeg_draft(Image.open(io.BytesIO(data)), (width // reduction, height // reduction))
+            text_height = estimate_text_height(preview, sample_size)
+            if text_height:
+                text_height *= width / preview.width
+        else:
+            text_height = estimate_text_height(image, sample_size)
+    except Exception as e:
+        # Normalization is an optimization: OCR the image at its own resolution
+        logger.warning(f"⚠️ Cannot estimate text height ({e}), keeping the original resolution")
+        text_height = None
+
+    scale = 1.0
+    if text_height:
+        scale = min(max(target_height / text_height, min_scale), max_scale)
+    # Bound memory/latency regardless of the estimate
+    scale = min(scale, (max_pixels / (width * height)) ** 0.5)
+
+    if abs(scale - 1.0) < 0.1:
+        return image, 1.0
+
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    if is_jpeg and scale < 1:
+        _jpeg_draft(image, size)
+    image = image.convert('L')
+    if scale < 1:
+        image = image.resize(size, Image.BICUBIC, reducing_gap=2.0)
+    else:
+        image = image.resize(size, Image.BICUBIC)
+    return image, scale
@@ -0,0 +1,183 @@
+"""
+Rate Limiting Module - Throttle outgoing network calls (Gemini, DuckDuckGo)
+
+Every backend gets one shared Backend (token bucket + circuit breaker), no
+matter how many extractor/searcher instances or worker threads use it:
+
+- TokenBucket: at most `rate_per_minute` calls per minute with a small
+  burst. A 429 with Retry-After pauses the whole bucket, not just the
+  thread that got it.
+- CircuitBreaker: after `threshold` consecutive rate-limit failures the
+  backend is considered exhausted and calls are refused for a cool-down
+  window (callers go straight to their fallback). One trial call is then
+  let through; success closes the breaker, failure re-opens it.
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+
+from config import (
+    GEMINI_RPM,
+    SEARCH_RPM,
+    BREAKER_THRESHOLD,
+    BREAKER_COOLDOWN
+)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0) -> float:
+    """Exponential backoff with full jitter for retry number `attempt` (0-based)"""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate_per_minute` calls per minute, up to `burst` at once"""
+
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.rate = max(rate_per_minute, 0.001) / 60.0
+        self.capacity = max(1, burst)
+        self._lock = threading.Lock()
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+
+    def wait(self) -> float:
+        """
+        Block until a token is available and take it
+
+        Returns:
+            Seconds spent waiting
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            # Borrow the token now; a negative balance orders waiting callers
+            self._tokens -= 1
+            ready = now + max(0.0, -self._tokens) / self.rate
+            ready = max(ready, self._paused_until)
+
+        delay = ready - now
+        if delay > 0:
+            time.sleep(delay)
+        return max(0.0, delay)
+
+    def pause(self, seconds: float):
+        """Hold every caller for `seconds` (e.g. the server's Retry-After)"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+
+class CircuitBreaker:
+    """Refuse calls for `cooldown` seconds after `threshold` consecutive failures"""
+
+    def __init__(self, threshold: int = 3, cooldown: float = 60.0):
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._open_until = 0.0
+
+    def allow(self) -> bool:
+        """True if a call may go out now"""
+        with self._lock:
+            if self._failures < self.threshold:
+                return True
+            now = time.monotonic()
+            if now < self._open_until:
+                return False
+            # Half-open: let one trial call through, hold the others for
+            # another window unless the trial succeeds
+            self._open_until = now + self.cooldown
+            return True
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._failures >= self.threshold and time.monotonic() < self._open_until
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+
+    def record_failure(self, retry_after: Optional[float] = None) -> bool:
+        """
+        Count a rate-limit failure
+
+        Returns:
+            True if this failure opened the breaker
+        """
+        with self._lock:
+            was_open = self._failures >= self.threshold
+            self._failures += 1
+            if self._failures < self.threshold:
+                return False
+            self._open_until = time.monotonic() + max(self.cooldown, retry_after or 0.0)
+            return not was_open
+
+
+class Backend:
+    """Rate limit and circuit breaker shared by every client of one network service"""
+
+    def __init__(self, name: str, rate_per_minute: float, threshold: int, cooldown: float):
+        self.name = name
+        self.bucket = TokenBucket(rate_per_minute)
+        self.breaker = CircuitBreaker(threshold, cooldown)
+
+    def acquire(self) -> bool:
+        """Wait for a rate-limit slot; False (without waiting) if the circuit is open"""
+        if not self.breaker.allow():
+            return False
+        self.bucket.wait()
+        return True
+
+    def throttled(self, retry_after: Optional[float] = None, default_delay: float = 5.0) -> bool:
+        """
+        Handle a rate-limit response: pause all callers and count it towards the breaker
+
+        Returns:
+            True if the breaker is now open
+        """
+        self.bucket.pause(retry_after if retry_after is not None else default_delay)
+        self.breaker.record_failure(retry_after)
+        return self.breaker.is_open
+
+    def succeeded(self):
+        self.breaker.record_success()
+
+
+_backends: Dict[str, Backend] = {}
+_backends_lock = threading.Lock()
+
+_DEFAULT_RPM = {'gemini': GEMINI_RPM, 'search': SEARCH_RPM}
+
+
+def get_backend(name: str) -> Backend:
+    """Process-wide Backend for `name` ('gemini', 'search'), created on first use"""
+    with _backends_lock:
+        backend = _backends.get(name)
+        if backend is None:
+            backend = Backend(
+                name,
+                rate_per_minute=_DEFAULT_RPM.get(name, 60),
+                threshold=BREAKER_THRESHOLD,
+                cooldown=BREAKER_COOLDOWN
+            )
+            _backends[name] = backend
+        return backend
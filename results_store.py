@@ -0,0 +1,197 @@
+"""
+Results Store Module - Structured, append-only record of every saved result
+
+Each saved image appends one JSON line to OUTPUT_FOLDER/results.jsonl with
+its OCR text and details, keyword, URLs, per-stage timings and the pipeline
+settings that produced them. The HTML report, the encoding fixer and any
+downstream tool read this file instead of re-parsing the per-image .txt
+files, which are only a rendered view (see render_text).
+
+Records are never edited in place: a reprocessed image gets a new line and
+the latest line per image wins. compact() drops the superseded lines.
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from logger import setup_logger
+
+logger = setup_logger('Main')
+
+# Every node of a distributed run writes its own results.<node>.jsonl
+RESULTS_GLOB = "results*.jsonl"
+
+
+def _read_records(path: Path) -> Iterator[Tuple[int, dict]]:
+    """(byte offset, record) for each line of one store file, skipping lines torn by a crash"""
+    with open(path, 'rb') as f:
+        offset = 0
+        for line_no, line in enumerate(f, 1):
+            try:
+                yield offset, json.loads(line)
+            except ValueError:
+                logger.warning(f"⚠️ {path.name} line {line_no} is corrupt, ignoring it")
+            offset += len(line)
+
+
+def index_results(output_folder: Path) -> Dict[str, Tuple[Path, int, float]]:
+    """image -> (store file, byte offset, ts) of its latest record across every store"""
+    latest: Dict[str, Tuple[Path, int, float]] = {}
+    for path in sorted(Path(output_folder).glob(RESULTS_GLOB)):
+        for offset, record in _read_records(path):
+            known = latest.get(record['image'])
+            if known is None or record['ts'] >= known[2]:
+                latest[record['image']] = (path, offset, record['ts'])
+    return latest
+
+
+def iter_results(
+    output_folder: Path,
+    index: Optional[Dict[str, Tuple[Path, int, float]]] = None,
+    images: Optional[Iterable[str]] = None
+) -> Iterator[dict]:
+    """
+    Latest record per image in filename order (or for `images`, in that
+    order), read one at a time: only the (file, offset) index is held in
+    memory, not the texts
+    """
+    if index is None:
+        index = index_results(output_folder)
+    files = {}
+    try:
+        for image in (sorted(index) if images is None else images):
+            path, offset, _ = index[image]
+            f = files.get(path)
+            if f is None:
+                f = files[path] = open(path, 'rb')
+            f.seek(offset)
+            yield json.loads(f.readline())
+    finally:
+        for f in files.values():
+            f.close()
+
+
+def load_results(output_folder: Path) -> Dict[str, dict]:
+    """Latest record per image across every results store in `output_folder`"""
+    return {record['image']: record for record in iter_results(output_folder)}
+
+
+class ResultsStore:
+    """Append-only JSONL store of saved results, one line per save"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._file = None
+        # Images with a record in this store
+        self.images = set()
+        if self.path.exists():
+            self.images = {record['image'] for _, record in _read_records(self.path)}
+
+    def __contains__(self, filename: str) -> bool:
+        with self._lock:
+            return filename in self.images
+
+    def append(self, record: dict) -> dict:
+        """Durably append one result record; returns it with its 'ts' timestamp"""
+        record = {**record, 'ts': time.time()}
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, 'a', encoding='utf-8')
+            self._file.write(line)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.images.add(record['image'])
+        return record
+
+    def compact(self):
+        """Rewrite the store keeping only the latest record per image"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            if not self.path.exists():
+                return
+
+            latest: Dict[str, dict] = {}
+            lines = 0
+            for _, record in _read_records(self.path):
+                latest[record['image']] = record
+                lines += 1
+            if lines == len(latest):
+                return
+
+            tmp_path = self.path.with_suffix('.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                for record in latest.values():
+                    f.write(json.dumps(record, ensure_ascii=False) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def render_text(record: dict) -> str:
+    """The human-readable .txt view of one result record"""
+    lines = [
+        "=" * 70,
+        f" KẾT QUẢ XỬ LÝ: {record['image']}",
+        f" Thời gian: {datetime.fromtimestamp(record['ts']).strftime('%Y-%m-%d %H:%M:%S')}",
+    ]
+    ocr = record.get('ocr')
+    if ocr is not None:
+        confidence = f"{ocr['confidence']:.1f}" if ocr.get('confidence') is not None else "-"
+        source = " (cache)" if ocr.get('cached') else ""
+        lines.append(
+            f" OCR: {ocr['method']} | Độ tin cậy: {confidence} | "
+            f"Số lượt: {ocr['passes']}{source}"
+        )
+    duplicate = record.get('duplicate_of')
+    if duplicate:
+        lines.append(f" Trùng với ảnh: {duplicate['image']} (khác biệt {duplicate['distance']} bit)")
+    group = record.get('text_group')
+    if group:
+        lines.append(
+            f" Văn bản gần giống: {group['image']} (khác biệt {group['distance']} bit), "
+            f"dùng chung từ khóa và kết quả tìm kiếm"
+        )
+    lines += [
+        "=" * 70,
+        "",
+        "[1] VĂN BẢN GỐC (OCR)",
+        "-" * 70,
+        record['text'],
+        "",
+        "[2] TỪ KHÓA TÌM KIẾM (AI)",
+        "-" * 70,
+        record['keyword'],
+        "",
+        "[3] KẾT QUẢ TÌM KIẾM",
+        "-" * 70,
+    ]
+    if record['urls']:
+        lines += [f"{i}. {url}" for i, url in enumerate(record['urls'], 1)]
+    else:
+        lines.append("Không tìm thấy kết quả nào.")
+    lines += ["", "=" * 70, "Xử lý hoàn tất!", ""]
+    return '\n'.join(lines)
+
+
+def write_text(record: dict, output_folder: Path) -> Path:
+    """Write the .txt view of a record (UTF-8 with BOM for Windows editors)"""
+    output_file = Path(output_folder) / f"{record['image']}.txt"
+    with open(output_file, 'w', encoding='utf-8-sig') as f:
+        f.write(render_text(record))
+    return output_file
@@ -2,29 +2,46 @@
 Search Module - Find relevant URLs using DuckDuckGo
 """
 import time
-import random
-from typing import List
+import queue
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
 
 try:
     from ddgs import DDGS
+    from ddgs.exceptions import RatelimitException
 except ImportError: 
     try:
-        from ddgs import DDGS
+        from duckduckgo_search import DDGS
+        from duckduckgo_search.exceptions import RatelimitException
     except ImportError: 
         print("Error: Install duckduckgo-search or ddgs")
         raise
 
 from logger import setup_logger
+from ratelimit import get_backend, backoff_delay
+from cache import DiskCache, hash_key
+from metrics import metrics
 from config import (
     SEARCH_REGION,
     SEARCH_MAX_RESULTS,
     SEARCH_RETURN_COUNT,
     SEARCH_MAX_RETRIES,
-    SEARCH_RETRY_DELAY
+    SEARCH_RETRY_DELAY,
+    CACHE_FOLDER,
+    HTTP_POOL_SIZE,
+    SEARCH_CACHE_ENABLED,
+    SEARCH_CACHE_TTL_HOURS,
+    SEARCH_CACHE_MAX_MB
 )
 
 logger = setup_logger('Search')
 
+# Answered queries kept in memory; beyond this the least recently used are dropped
+MEMO_SIZE = 4096
+
 
 class WebSearcher:
     """Web searcher using DuckDuckGo"""
@@ -34,17 +51,91 @@ class WebSearcher:
         region: str = SEARCH_REGION,
         max_results: int = SEARCH_MAX_RESULTS,
         return_count: int = SEARCH_RETURN_COUNT,
-        max_retries:  int = SEARCH_MAX_RETRIES
+        max_retries:  int = SEARCH_MAX_RETRIES,
+        use_cache: bool = SEARCH_CACHE_ENABLED,
+        pool_size: int = HTTP_POOL_SIZE
     ):
         self.region = region
         self.max_results = max_results
         self. return_count = return_count
         self.max_retries = max_retries
+        # Token bucket + circuit breaker shared across threads and instances
+        # so parallel batches stay polite to DuckDuckGo
+        self.backend = get_backend('search')
+        
+        # Idle DDGS clients; each keeps its engines' HTTP connections alive,
+        # so only a client's first request pays for connection setup
+        self.pool_size = max(1, pool_size)
+        self._clients: "queue.LifoQueue[DDGS]" = queue.LifoQueue()
+        
+        # Persistent query -> URLs cache
+        self.cache = None
+        if use_cache:
+            self.cache = DiskCache(
+                CACHE_FOLDER / "search.sqlite3",
+                max_bytes=SEARCH_CACHE_MAX_MB * 1024 * 1024,
+                name="search",
+                ttl=SEARCH_CACHE_TTL_HOURS * 3600
+            )
+        
+        # Identical queries running concurrently share one request
+        self._inflight: Dict[str, Future] = {}
+        self._inflight_lock = threading.Lock()
+        
+        # Answers already received by this process, empty ones included
+        # (those are not written to the disk cache), so a batch never sends
+        # the same query twice, even with the cache disabled
+        self._memo: "OrderedDict[str, List[str]]" = OrderedDict()
+        
         logger.info(f"Web Searcher initialized (max_results={max_results}, return={return_count})")
     
+    @contextmanager
+    def _client(self):
+        """Borrow a pooled DDGS client (created on demand, returned after use)"""
+        try:
+            client, cold = self._clients.get_nowait(), False
+        except queue.Empty:
+            client, cold = DDGS(), True
+        
+        start = time.perf_counter()
+        healthy = False
+        try:
+            yield client
+            healthy = True
+        except RatelimitException:
+            healthy = True
+            raise
+        finally:
+            # A cold client's first request includes connection setup, so
+            # cold vs warm averages show what the pool saves
+            metrics.record('search:cold' if cold else 'search:warm', time.perf_counter() - start)
+            if healthy and self._clients.qsize() < self.pool_size:
+                self._clients.put(client)
+    
+    def clear_memo(self):
+        """Forget the answers of this run (the watch daemon calls this while idle)"""
+        with self._inflight_lock:
+            self._memo.clear()
+    
+    def close(self):
+        """Drop pooled clients (and their connections)"""
+        while True:
+            try:
+                self._clients.get_nowait()
+            except queue.Empty:
+                break
+    
+    def settings_signature(self) -> str:
+        """Settings that change search results; part of the cache key"""
+        return f"region={self.region}|max={self.max_results}|return={self.return_count}"
+    
+    def cache_key(self, query: str) -> str:
+        return hash_key(' '.join(query.lower().split()), self.settings_signature())
+    
     def search(self, query: str) -> List[str]:
         """
-        Search for URLs using query
+        Search for URLs using query, served from cache when possible.
+        Concurrent calls with the same query wait for a single request.
         
         Args:
             query:  Search query
@@ -52,27 +143,104 @@ class WebSearcher:
         Returns: 
             List of URLs (up to return_count)
         """
+        return self.search_with_status(query)[0]
+    
+    def search_with_status(self, query: str) -> Tuple[List[str], bool]:
+        """
+        Like search(), also telling whether the search was skipped or failed
+        
+        Returns:
+            Tuple of (URLs, degraded): degraded is True if no attempt got an
+            answer (circuit breaker open, rate limited, errors), so the image
+            is redone next run
+        """
         if not query. strip():
             logger.warning("Empty query provided")
-            return []
+            return [], False
+        
+        key = self.cache_key(query)
         
+        with self._inflight_lock:
+            urls = self._memo.get(key)
+            if urls is not None:
+                self._memo.move_to_end(key)
+                logger.info(f"⚡ Search already answered in this run ({len(urls)} URL(s))")
+                return list(urls), False
+            future = self._inflight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[key] = future
+        
+        if not owner:
+            logger.info("⏳ Identical search already in flight, waiting for it...")
+            urls, degraded = future.result()
+            return list(urls), degraded
+        
+        try:
+            urls = None
+            degraded = False
+            if self.cache is not None:
+                cached = self.cache.get(key)
+                if cached is not None:
+                    urls = cached['urls']
+                    logger.info(f"⚡ Search cache hit ({len(urls)} URL(s))")
+            
+            if urls is None:
+                urls, answered = self._search_uncached(query)
+                degraded = not answered
+                # Empty results are not cached so they get retried next run
+                if urls and self.cache is not None:
+                    self.cache.set(key, {'urls': urls})
+            
+            if not degraded:
+                with self._inflight_lock:
+                    self._memo[key] = urls
+                    if len(self._memo) > MEMO_SIZE:
+                        self._memo.popitem(last=False)
+            future.set_result((urls, degraded))
+            return list(urls), degraded
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                self._inflight.pop(key, None)
+    
+    def _search_uncached(self, query: str) -> Tuple[List[str], bool]:
+        """
+        Query DuckDuckGo with retries
+        
+        Returns:
+            Tuple of (URLs, answered): answered is False if no attempt got a
+            response (circuit breaker open, rate limited, errors)
+        """
         # Limit query length for display
         display_query = query[:100] + "..." if len(query) > 100 else query
         logger.info(f"Searching for: '{display_query}'")
         
         urls = []
+        answered = False
         
         for attempt in range(1, self.max_retries + 1):
             try:
                 logger.debug(f"Attempt {attempt}/{self.max_retries}")
                 
-                # Perform search
-                results = DDGS().text(
-                    query,
-                    region=self.region,
-                    safesearch='off',
-                    max_results=self.max_results
-                )
+                # DuckDuckGo keeps rate limiting us: give up until the cool-down ends
+                if not self.backend.acquire():
+                    logger.warning("🔌 Search is rate limited (circuit breaker open), skipping")
+                    break
+                
+                # Perform search on a pooled, keep-alive client
+                with self._client() as client:
+                    results = client.text(
+                        query,
+                        region=self.region,
+                        safesearch='off',
+                        max_results=self.max_results
+                    )
+                self.backend.succeeded()
+                answered = True
                 
                 if results:
                     for item in results: 
@@ -90,13 +258,19 @@ class WebSearcher:
                 else:
                     logger.warning(f"No results on attempt {attempt}")
                     
+            except RatelimitException as e:
+                logger.warning(f"⚠️ Search rate limited (attempt {attempt}): {e}")
+                # Pauses every search thread; the next acquire() waits it out
+                if self.backend.throttled(default_delay=SEARCH_RETRY_DELAY * 2 ** attempt):
+                    logger.warning("🔌 Search keeps being rate limited, pausing it (circuit breaker open)")
+                continue
             except Exception as e:
                 logger.error(f"❌ Search error (attempt {attempt}): {e}")
             
             # Wait before retry
             if attempt < self.max_retries:
-                delay = SEARCH_RETRY_DELAY + random.uniform(0, 2)
-                logger.debug(f"Waiting {delay:. 1f}s before retry...")  # FIXED: removed space
+                delay = backoff_delay(attempt - 1, base=SEARCH_RETRY_DELAY)
+                logger.debug(f"Waiting {delay:.1f}s before retry...")
                 time.sleep(delay)
         
         if not urls:
@@ -104,7 +278,7 @@ class WebSearcher:
         elif len(urls) < self.return_count:
             logger.info(f"⚠️ Only found {len(urls)}/{self.return_count} URLs")
         
-        return urls[: self.return_count]
+        return urls[: self.return_count], answered
 
 
 def google_search(query: str) -> List[str]:
@@ -0,0 +1,58 @@
+"""
+State File Module - Small JSON state files saved every few updates
+
+The manifest and the offline keyword statistics live in memory and are
+written out as a whole: every SAVE_EVERY updates and on close. Each write
+goes to a temp file that is then moved over the old one, so a crash never
+leaves a half-written file behind.
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable
+
+# Save after this many updates (and always on close)
+SAVE_EVERY = 20
+
+
+def write_json_atomic(path: Path, data: Any, **dump_options):
+    """Write `data` as UTF-8 JSON to a temp file, then move it over `path`"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, **dump_options)
+    os.replace(tmp_path, path)
+
+
+class StateFile:
+    """Counts unsaved updates of a JSON file and writes it atomically"""
+
+    def __init__(self, path: Path, save_every: int = SAVE_EVERY, **dump_options):
+        self.path = Path(path)
+        self.save_every = save_every
+        self.dump_options = dump_options
+        self._lock = threading.Lock()
+        # One write at a time (they share the temp file)
+        self._save_lock = threading.Lock()
+        self._dirty = 0
+
+    def changed(self) -> bool:
+        """Count one update; True once enough have piled up to save"""
+        with self._lock:
+            self._dirty += 1
+            return self._dirty >= self.save_every
+
+    def save(self, snapshot: Callable[[], Any]):
+        """
+        Write `snapshot()` if anything changed since the last save. The
+        snapshot must be a copy taken under the owner's lock: it is
+        serialized without holding it.
+        """
+        with self._save_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                self._dirty = 0
+            write_json_atomic(self.path, snapshot(), **self.dump_options)
@@ -1,12 +1,28 @@
 """
 Comprehensive testing script for the OCR-Search pipeline
 """
+import json
+import os
 import sys
+import tempfile
+import time
+from concurrent.futures import Future
 from pathlib import Path
+from types import SimpleNamespace
 from logger import setup_logger
+from cache import DiskCache
+from ratelimit import CircuitBreaker, parse_retry_after
+from keywords import OfflineKeywordExtractor
+from dedup import PerceptualIndex, TextGroups, dhash, hamming
+from journal import JobJournal
+from results_store import ResultsStore, load_results, render_text
+from fulltext import FullTextIndex, fold
+from watcher import FolderWatcher, WatchDaemon
+from workqueue import WorkQueue
 from ocr import OCRProcessor
 from filter import AIKeywordExtractor
 from search import WebSearcher
+from export_html import render_card
 
 logger = setup_logger('Test')
 
@@ -56,6 +72,9 @@ def test_ai_filter():
         logger.info(f"Input: {text}")
         logger.info(f"Output: {keyword}\n")
     
+    # Text made only of OCR crumbs must not turn into an empty prompt
+    results.append(bool(extractor.compact("àb\nQ ~~")))
+    
     if all(results):
         logger.info("✅ AI Filter Test PASSED")
         return True
@@ -93,6 +112,610 @@ def test_search():
         return False
 
 
+def test_cache():
+    """Test on-disk cache hits, misses and LRU eviction"""
+    logger.info("\n" + "="*60)
+    logger.info("Testing Cache Module")
+    logger.info("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = DiskCache(Path(tmp) / "test.sqlite3", max_bytes=200, name="test")
+        
+        cache.set("a", {"text": "x" * 80})
+        cache.set("b", {"text": "y" * 80})
+        hit = cache.get("a")          # "a" becomes most recently used
+        miss = cache.get("missing")
+        cache.set("c", {"text": "z" * 80})  # over budget -> evicts "b"
+        
+        stats = cache.stats()
+        cache.close()
+    
+    checks = [
+        hit == {"text": "x" * 80},
+        miss is None,
+        stats['entries'] == 2,
+        stats['hits'] == 1 and stats['misses'] == 1,
+    ]
+    
+    if all(checks):
+        logger.info("✅ Cache Test PASSED")
+        return True
+    else:
+        logger.error(f"❌ Cache Test FAILED: {checks} {stats}")
+        return False
+
+
+def test_rate_limit():
+    """Test Retry-After parsing and the circuit breaker opening/half-opening"""
+    logger.info("\n" + "="*60)
+    logger.info("Testing Rate Limit Module")
+    logger.info("="*60)
+    
+    breaker = CircuitBreaker(threshold=2, cooldown=0.2)
+    breaker.record_failure()
+    still_closed = breaker.allow()
+    breaker.record_failure()
+    opened = not breaker.allow()
+    time.sleep(0.25)
+    trial = breaker.allow()           # half-open: one trial call
+    others_held = not breaker.allow()
+    breaker.record_success()
+    
+    checks = [
+        parse_retry_after("7") == 7.0,
+        parse_retry_after(None) is None,
+        still_closed,
+        opened,
+        trial and others_held,
+        breaker.allow(),
+    ]
+    
+    if all(checks):
+        logger.info("✅ Rate Limit Test PASSED")
+        return True
+    else:
+        logger.error(f"❌ Rate Limit Test FAILED: {checks}")
+        return False
+
+
+def test_offline_keywords():
+    """Test offline RAKE/TF-IDF keywords on Vietnamese text"""
+    logger.info("\n" + "="*60)
+    logger.info("Testing Offline Keywords")
+    logger.info("="*60)
+    
+    extractor = OfflineKeywordExtractor()
+    extractor.add_document("Trang 1. Sách giáo khoa lịch sử")
+    keyword = extractor.extract(
+        "Trang 12. Cách mạng tháng Tám năm 1945 thành công và nước Việt Nam Dân chủ Cộng hòa ra đời"
+    )
+    logger.info(f"Keyword: {keyword}")
+    
+    checks = [
+        "cách mạng tháng tám năm 1945 thành công" in keyword,
+        "việt nam dân chủ cộng hòa" in keyword,
+        " và " not in f" {keyword} ",
+        extractor.documents == 2,
+    ]
+    
+    if all(checks):
+        logger.info("✅ Offline Keywords Test PASSED")
+        return True
+    else:
+        logger.error(f"❌ Offline Keywords Test FAILED: {checks}")
+        return False
+
+
+def test_dedup():
+    """Test perceptual hashing of a re-encoded photo and SimHash text groups"""
+    logger.info("\n" + "="*60)
+    logger.info("Testing Near-Duplicate Detection")
+    logger.info("="*60)
+    
+    import io
+    from PIL import Image, ImageDraw
+    
+    def encode(image, quality):
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=quality)
+        return buffer.getvalue()
+    
+    page = Image.new('RGB', (800, 600), 'white')
+    draw = ImageDraw.Draw(page)
+    for i in range(20):
+        draw.rectangle([30 * i, 20 * i, 30 * i + 100, 20 * i + 40], fill=(10 * i, 50, 200 - 5 * i))
+    other = page.transpose(Image.FLIP_LEFT_RIGHT)
+    
+    original = dhash(encode(page, 95))
+    resaved = dhash(encode(page.resize((640, 480)), 60))
+    different = dhash(encode(other, 95))
+    logger.info(f"Distance re-saved: {hamming(original, resaved)}, different: {hamming(original, different)}")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        index = PerceptualIndex(Path(tmp) / "phash.sqlite3", max_distance=12)
+        index.add("page.jpg", original, {'keyword': 'k'}, "v1")
+        match = index.find(resaved, exclude="copy.jpg", settings="v1")
+        checks = [
+            hamming(original, resaved) <= 12,
+            hamming(original, different) > 12,
+            match is not None and match[0] == "page.jpg" and match[2] == {'keyword': 'k'},
+            index.find(different, exclude="other.jpg", settings="v1") is None,
+            index.find(original, exclude="page.jpg", settings="v1") is None,
+            # Results made with other settings, or before a --force run, are not reused
+            index.find(resaved, exclude="copy.jpg", settings="v2") is None,
+            index.find(resaved, exclude="copy.jpg", settings="v1", since=time.time() + 1) is None,
+        ]
+        # The excluded image is skipped, not the end of the search
+        index.add("copy.jpg", resaved, {'keyword': 'copy'}, "v1")
+        match = index.find(original, exclude="page.jpg", settings="v1")
+        checks.append(match is not None and match[0] == "copy.jpg")
+        # A replaced image no longer matches under its old content
+        index.add("page.jpg", different, {'keyword': 'new page'}, "v1")
+        index.add("copy.jpg", different, {'keyword': 'new copy'}, "v1")
+        checks.append(index.find(original, exclude="x.jpg", settings="v1") is None)
+        index.close()
+    
+    # OCR texts a few garbled characters apart share one group
+    text = (
+        "Trang 12. Cách mạng tháng Tám năm 1945 thành công và nước Việt Nam Dân chủ "
+        "Cộng hòa ra đời. Đây là bước ngoặt vĩ đại của lịch sử dân tộc."
+    )
+    other_text = "Chiến thắng Điện Biên Phủ năm 1954 kết thúc cuộc kháng chiến chín năm chống thực dân Pháp."
+    groups = TextGroups(max_distance=10, min_chars=80)
+    group_a = groups.assign("a.jpg", text)
+    groups.put(group_a, 'keyword', "kw for a")
+    checks += [
+        group_a[0] == "a.jpg",
+        groups.assign("b.jpg", text.replace("1945", "1g45")) == group_a,
+        groups.assign("c.jpg", other_text)[0] == "c.jpg",
+        groups.group_of("b.jpg")[0] == "a.jpg" and groups.group_of("a.jpg") is None,
+    ]
+    # a.jpg replaced by another page (watch mode): the old keyword is not reused
+    changed = groups.assign("a.jpg", other_text + " Trang 13.")
+    checks += [
+        changed[0] == "c.jpg" and groups.get(changed, 'keyword') is None,
+        groups.assign("b.jpg", text.replace("1945", "1g45")) == group_a,
+    ]
+    groups.reset()
+    checks += [
+        groups.get(group_a, 'keyword') is None,
+        [name for name, _, _ in groups.members()] == ["a.jpg", "b.jpg"],
+    ]
+    
+    if all(checks):
+        logger.info("✅ Near-Duplicate Test PASSED")
+        return True
+    else:
+        logger.error(f"❌ Near-Duplicate Test FAILED: {checks}")
+        return False
+
+
+def test_journal():
+    """Test resuming from the journal after a write torn by a crash"""
+    logger.info("\n" + "="*60)
+    logger.info("Testing Job Journal")
+    logger.info("="*60)
+    
+    settings = {'ocr': 'v1'}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "journal.jsonl"
+        journal = JobJournal(path)
+        journal.record("a.jpg", "h1", settings, "ocr", {"text": "xin chào"})
+        journal.record("a.jpg", "h1", settings, "keyword", "chào")
+        # Crash in the middle of the next write
+        with open(path, 'ab') as f:
+            f.write(b'{"image": "a.jpg", "sha256": "h1", "sta')
+        
+        # Second run: replays, then journals the search stage and crashes again
+        journal = JobJournal(path)
+        resumed = journal.resume("a.jpg", "h1", settings)
+        journal.record("a.jpg", "h1", settings, "search", ["http://x"])
+        
+        # Third run
+        journal = JobJournal(path)
+        final = journal.resume("a.jpg", "h1", settings) or {}
+    logger.info(f"Resumed stages: {sorted(final)}")
+    
+    checks = [
+        resumed is not None and resumed['keyword'] == "chào",
+        final.get('keyword') == "chào",
+        final.get('search') == ["http://x"],
+    ]
+    
+    if all(checks):
+        logger.info("✅ Job Journal Test PASSED")
+        return True
+    else:
+        logger.error(f"❌ Job Journal Test FAILED: {checks}")
+        return False
+
+
+def test_results_store():
+    """Test the append-only results store and its .txt view"""
+    logger.info("\n" + "="*60)
+    logger.info("Testing Results Store")
+    logger.info("="*60)
+    
+    record = {
+        'image': 'page.jpg', 'ocr': None, 'text': "[1] VĂN BẢN {trong ảnh}",
+        'keyword': 'k1', 'urls': ['https://a.vn'], 'timings': {'ocr': 1.5},
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        store = ResultsStore(Path(tmp) / "results.jsonl")
+        store.append(record)
+        store.append({**record, 'keyword': 'k2'})
+        store.compact()
+        lines = (Path(tmp) / "results.jsonl").read_text(encoding='utf-8').splitlines()
+        results = load_results(Path(tmp))
+        store.close()
+    
+    checks = [
+        len(lines) == 1,
+        results['page.jpg']['keyword'] == 'k2',
+        results['page.jpg']['text'] == record['text'],
+        "1. https://a.vn" in render_text(results['page.jpg']),
+    ]
+    
+    if all(checks):
+        logger.info("✅ Results Store Test PASSED")
+        return True
+    else:
+        logger.error(f"❌ Results Store Test FAILED: {checks}")
+        return False
+
+
+def test_fulltext():
+    """Test accent-insensitive full-text search of results"""
+    logger.info("\n" + "="*60)
+    logger.info("Testing Full-text Search")
+    logger.info("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        index = FullTextIndex(Path(tmp) / "fulltext.sqlite3")
+        index.add("a.jpg", "Chương 2. GIẢI TÍCH hàm nhiều biến", "giải tích hàm nhiều biến")
+        index.add("b.jpg", "Lịch sử Đảng Cộng sản Việt Nam", "lịch sử đảng")
+        index.add("c.jpg", "Đại số tuyến tính và giải tích", "")
+        hits = index.search("giai tich")
+        dang = index.search("dang")
+        index.add("c.jpg", "Xác suất thống kê", "")
+        after = index.search("giai tich")
+        index.close()
+    logger.info(f"Hits: {[(hit.image, round(hit.score, 2)) for hit in hits]}")
+    
+    checks = [
+        fold("Giải Tích Đạo Hàm") == "giai tich dao ham",
+        [hit.image for hit in hits] == ["a.jpg", "c.jpg"],
+        "GIẢI TÍCH" in hits[0].snippet,
+        [hit.image for hit in dang] == ["b.jpg"],
+        [hit.image for hit in after] == ["a.jpg"],
+    ]
+    
+    if all(checks):
+        logger.info("✅ Full-text Search Test PASSED")
+        return True
+    else:
+        logger.error(f"❌ Full-text Search Test FAILED: {checks}")
+        return False
+
+
+def test_watcher():
+    """Test that watch mode only picks up files once they stop changing, and retries failures"""
+    logger.info("\n" + "="*60)
+    logger.info("Testing Folder Watcher")
+    logger.info("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        folder = Path(tmp)
+        old = folder / "old.jpg"
+        old.write_bytes(b"old page")
+        os.utime(old, (time.time() - 60, time.time() - 60))
+        (folder / "notes.txt").write_text("not an image")
+        
+        watcher = FolderWatcher(folder, (".jpg",), settle_seconds=0.3)
+        names = lambda ready: [path.name for path, _ in ready]
+        
+        # Already there and untouched: no need to wait
+        first = watcher.ready()
+        for path, signature in first:
+            watcher.handled(path.name, signature)
+        
+        # A file still being written is held back until it settles
+        new = folder / "new.jpg"
+        new.write_bytes(b"half")
+        unsettled = watcher.ready()
+        time.sleep(0.2)
+        new.write_bytes(b"half a page")
+        still_growing = watcher.ready()
+        time.sleep(0.4)
+        settled = watcher.ready()
+        for path, signature in settled:
+            watcher.handled(path.name, signature)
+        repeated = watcher.ready()
+        
+        # Replacing a handled file makes it new again
+        time.sleep(0.05)
+        old.write_bytes(b"old page, rescanned")
+        time.sleep(0.4)
+        watcher.ready()
+        time.sleep(0.4)
+        replaced = watcher.ready()
+        
+        # A partial result (Gemini/search unavailable) is retried after a delay
+        def finished(result):
+            future = Future()
+            future.set_result(result)
+            return future
+        processor = SimpleNamespace(degraded={"partial.jpg"})
+        daemon = WatchDaemon(processor, retry_seconds=60)
+        daemon._collect(finished((True, "ok")), folder / "partial.jpg", (1, 1))
+        daemon._collect(finished((True, "ok")), folder / "done.jpg", (1, 1))
+        retry_waits = not daemon._due("partial.jpg", (1, 1))
+        retry_if_changed = daemon._due("partial.jpg", (2, 2))
+        done_handled = daemon.watcher._handled.get("done.jpg") == (1, 1)
+        partial_handled = "partial.jpg" in daemon.watcher._handled
+    logger.info(f"Ready: {names(first)} -> {names(settled)} -> {names(replaced)}")
+    
+    checks = [
+        names(first) == ["old.jpg"],
+        names(unsettled) == [],
+        names(still_growing) == [],
+        names(settled) == ["new.jpg"],
+        names(repeated) == [],
+        names(replaced) == ["old.jpg"],
+        retry_waits,
+        retry_if_changed,
+        done_handled,
+        not partial_handled,
+    ]
+    
+    if all(checks):
+        logger.info("✅ Folder Watcher Test PASSED")
+        return True
+    else:
+        logger.error(f"❌ Folder Watcher Test FAILED: {checks}")
+        return False
+
+
+def test_workqueue():
+    """Test leases, lease expiry takeover, retries and forced resets of the shared work queue"""
+    logger.info("\n" + "="*60)
+    logger.info("Testing Work Queue")
+    logger.info("="*60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "queue.sqlite3"
+        node_a = WorkQueue(path, "a", lease_seconds=0.3)
+        node_b = WorkQueue(path, "b", lease_seconds=0.3)
+        
+        added = node_a.enqueue([("x.jpg", "v1"), ("y.jpg", "v1")])
+        claimed_a = node_a.claim(1)
+        claimed_b = node_b.claim(5)
+        nothing_left = node_a.claim(1)
+        
+        # A --force node joining a run must not hand out live leases again
+        forced_during_run = node_b.enqueue([("x.jpg", "v1"), ("y.jpg", "v1")], reset=True)
+        
+        # Node a stops renewing: its lease expires and b takes x.jpg over
+        time.sleep(0.2)
+        node_b.renew()
+        time.sleep(0.2)
+        taken_over = node_b.claim(5)
+        node_a.complete("x.jpg", True)   # stale owner, ignored
+        still_leased = node_a.counts()
+        node_b.complete("x.jpg", True)
+        node_b.complete("y.jpg", True, retry=True)   # partial result
+        drained = node_b.is_drained()
+        requeued = node_a.enqueue([("x.jpg", "v1"), ("y.jpg", "v1")])
+        
+        # A new forced run resets everything, once
+        forced = node_a.enqueue([("x.jpg", "v1"), ("y.jpg", "v1")], reset=True)
+        node_a.claim(1)
+        forced_again = node_b.enqueue([("x.jpg", "v1"), ("y.jpg", "v1")], reset=True)
+        final = node_b.counts()
+        node_a.close()
+        node_b.close()
+    logger.info(f"Claimed: a={claimed_a} b={claimed_b}, taken over: {taken_over}, final: {final}")
+    
+    checks = [
+        added == 2,
+        claimed_a == ["x.jpg"],
+        claimed_b == ["y.jpg"],
+        nothing_left == [],
+        forced_during_run == 0,
+        taken_over == ["x.jpg"],
+        still_leased == {"leased": 2},
+        drained,
+        requeued == 1,
+        forced == 2,
+        forced_again == 0,
+        final == {"leased": 1, "pending": 1},
+    ]
+    
+    if all(checks):
+        logger.info("✅ Work Queue Test PASSED")
+        return True
+    else:
+        logger.error(f"❌ Work Queue Test FAILED: {checks}")
+        return False
+
+
+def test_gemini_parsing():
+    """Test batch answer parsing, batch splitting and reading the first streamed line"""
+    logger.info("\n" + "="*60)
+    logger.info("Testing Gemini Parsing")
+    logger.info("="*60)
+    
+    parse = AIKeywordExtractor.parse_batch_response
+    extractor = AIKeywordExtractor(api_key="test", use_cache=False, batch_size=2, batch_chars=50)
+    batches = extractor.split_batches(["a" * 10, "b" * 10, "c" * 10, "d" * 45, "e" * 60])
+    extractor.close()
+    
+    class StreamedResponse:
+        """SSE response whose reading must stop at the first complete line"""
+        def __init__(self, chunks):
+            self.chunks, self.read, self.closed = chunks, 0, False
+        def iter_lines(self, decode_unicode=False):
+            for chunk in self.chunks:
+                self.read += 1
+                yield chunk
+        def close(self):
+            self.closed = True
+    
+    def sse(text, finish_reason=None, thought=False):
+        candidate = {'content': {'parts': [{'text': text, 'thought': thought}]}}
+        if finish_reason:
+            candidate['finishReason'] = finish_reason
+        return "data: " + json.dumps({'candidates': [candidate]})
+    
+    early = StreamedResponse([
+        sse("Suy nghĩ của model\n", thought=True),
+        sse("giải tích"), "", sse(" 1 giới hạn\nGiải thích: ..."), sse("phần còn lại", "STOP"),
+    ])
+    whole = StreamedResponse([sse("từ khóa"), sse(" cuối", "STOP")])
+    early_result = AIKeywordExtractor._read_first_line(early)
+    whole_result = AIKeywordExtractor._read_first_line(whole)
+    logger.info(f"Batches: {batches}, streamed: {early_result} / {whole_result}")
+    
+    checks = [
+        parse('[{"id": 1, "keyword": "a"}, {"id": 2, "keyword": 3}, {"id": 9, "keyword": "x"}]', [1, 2]) == {1: "a"},
+        parse('not json', [1]) is None,
+        parse('{"id": 1, "keyword": "a"}', [1]) is None,
+        # At most batch_size texts and batch_chars characters per batch (a longer text goes alone)
+        batches == [[0, 1], [2], [3], [4]],
+        early_result == ("giải tích 1 giới hạn", None) and early.read == 4 and early.closed,
+        whole_result == ("từ khóa cuối", "STOP") and whole.closed,
+    ]
+    
+    if all(checks):
+        logger.info("✅ Gemini Parsing Test PASSED")
+        return True
+    else:
+        logger.error(f"❌ Gemini Parsing Test FAILED: {checks}")
+        return False
+
+
+def test_html_escaping():
+    """Test that report cards escape every value taken from OCR text, files or search results"""
+    logger.info("\n" + "="*60)
+    logger.info("Testing HTML Escaping")
+    logger.info("="*60)
+    
+    record = {
+        'image': '<script>alert("img")</script> & co.jpg',
+        'text': 'Trang 1 <b>"đậm"</b> & <script>alert(1)</script>',
+        'keyword': 'toán & "lý" <script>',
+        'urls': ['https://a.vn/?q="><script>alert(2)</script>&p=1', 'javascript:alert(3)'],
+        'ocr': {'method': 'Raw'},
+        'timings': {'ocr': 1.5},
+        'duplicate_of': {'image': '<img src=x onerror=alert(4)>', 'distance': 1},
+        'text_group': None,
+    }
+    cards = [render_card(record), render_card(record, lazy=True)]
+    
+    checks = []
+    for html in cards:
+        checks += [
+            '<script' not in html and '<img' not in html and '<b>' not in html,
+            '&lt;script&gt;alert(&quot;img&quot;)&lt;/script&gt; &amp; co.jpg' in html,
+            '&lt;b&gt;&quot;đậm&quot;&lt;/b&gt; &amp; ' in html,
+            'toán &amp; &quot;lý&quot; &lt;script&gt;' in html,
+            'href="https://a.vn/?q=&quot;&gt;&lt;script&gt;alert(2)&lt;/script&gt;&amp;p=1"' in html,
+            # Only web links are clickable
+            'href="javascript:' not in html and 'javascript:alert(3)' in html,
+        ]
+    
+    if all(checks):
+        logger.info("✅ HTML Escaping Test PASSED")
+        return True
+    else:
+        logger.error(f"❌ HTML Escaping Test FAILED: {checks}")
+        return False
+
+
+def test_search_memo():
+    """Test that a run never sends the same query twice, even for empty answers"""
+    logger.info("\n" + "="*60)
+    logger.info("Testing Search Memo")
+    logger.info("="*60)
+    
+    searcher = WebSearcher(use_cache=False)
+    requests = []
+    answers = {"sách giáo khoa": ([], True), "giải tích": (["https://a.vn"], True), "đại số": ([], False)}
+    
+    def search_uncached(query):
+        requests.append(query)
+        return answers[query]
+    searcher._search_uncached = search_uncached
+    
+    results = [searcher.search_with_status(query) for query in
+               ["sách giáo khoa", "Sách  giáo khoa", "giải tích", "giải tích", "đại số", "đại số"]]
+    searcher.close()
+    logger.info(f"Requests: {requests}")
+    
+    checks = [
+        # Empty and non-empty answers are reused; unanswered searches are retried
+        requests == ["sách giáo khoa", "giải tích", "đại số", "đại số"],
+        results[1] == ([], False),
+        results[3] == (["https://a.vn"], False),
+        results[5] == ([], True),
+    ]
+    
+    if all(checks):
+        logger.info("✅ Search Memo Test PASSED")
+        return True
+    else:
+        logger.error(f"❌ Search Memo Test FAILED: {checks}")
+        return False
+
+
+def test_keyword_batch():
+    """Test batched Gemini calls: a failed batch falls back, dropped items are asked again"""
+    logger.info("\n" + "="*60)
+    logger.info("Testing Keyword Batching")
+    logger.info("="*60)
+    
+    extractor = AIKeywordExtractor(api_key="test", use_cache=False, batch_size=8, stream=False, mode='gemini')
+    texts = [
+        "Giáo trình Giải tích 1 chương 2 giới hạn hàm số",
+        "Lịch sử Việt Nam thời kỳ 1945 đến 1954",
+        "Hóa học hữu cơ phản ứng thế và phản ứng cộng",
+    ]
+    calls = []
+    
+    def generate(data, parse, timeout=60, max_retries=3, stream=False):
+        batch = 'responseSchema' in data['generationConfig']
+        calls.append(batch)
+        return batch_answer(parse) if batch else parse("lịch sử việt nam 1945")
+    extractor._generate = generate
+    
+    # The whole batch call fails: one request, every item degraded
+    batch_answer = lambda parse: None
+    failed = extractor.extract_keywords_with_status(texts)
+    failed_calls = list(calls)
+    
+    # The model drops item 2: only that item is asked again on its own
+    calls.clear()
+    batch_answer = lambda parse: parse('[{"id": 1, "keyword": "giải tích 1 giới hạn"}, {"id": 3, "keyword": "hóa hữu cơ"}]')
+    partial = extractor.extract_keywords_with_status(texts)
+    extractor.close()
+    logger.info(f"Failed batch: {failed}, partial answer: {partial}, calls: {calls}")
+    
+    checks = [
+        failed_calls == [True],
+        all(keyword and degraded for keyword, degraded in failed),
+        calls == [True, False],
+        partial[0] == ("giải tích 1 giới hạn", False) and partial[2] == ("hóa hữu cơ", False),
+        partial[1] == ("lịch sử việt nam 1945", False),
+    ]
+    
+    if all(checks):
+        logger.info("✅ Keyword Batching Test PASSED")
+        return True
+    else:
+        logger.error(f"❌ Keyword Batching Test FAILED: {checks}")
+        return False
+
+
 def main():
     """Run all tests"""
     logger.info("\n" + "#"*60)
@@ -100,6 +723,19 @@ def main():
     logger.info("#"*60)
     
     tests = [
+        ("Cache", test_cache),
+        ("Rate Limit", test_rate_limit),
+        ("Offline Keywords", test_offline_keywords),
+        ("Near-Duplicates", test_dedup),
+        ("Job Journal", test_journal),
+        ("Results Store", test_results_store),
+        ("Full-text Search", test_fulltext),
+        ("Folder Watcher", test_watcher),
+        ("Work Queue", test_workqueue),
+        ("Keyword Batching", test_keyword_batch),
+        ("Search Memo", test_search_memo),
+        ("Gemini Parsing", test_gemini_parsing),
+        ("HTML Escaping", test_html_escaping),
         ("OCR", test_ocr),
         ("AI Filter", test_ai_filter),
         ("Search", test_search)
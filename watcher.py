@@ -0,0 +1,269 @@
+"""
+Watch Module - Long-running daemon that processes images as they arrive
+
+Instead of a cron job relaunching main.py (and paying interpreter start-up,
+config loading and OCR/Gemini/search client initialization every time), the
+daemon keeps one initialized ImageProcessor and a pool of worker threads
+alive and polls INPUT_FOLDER for new or changed images.
+
+A file is only handed to a worker once its size and modification time have
+stayed the same for WATCH_SETTLE_SECONDS, so images still being copied or
+uploaded are not read half-written. An image that fails, or whose result
+is only partial because Gemini or search was unavailable, is tried again
+after WATCH_RETRY_SECONDS, doubling after each failure. SIGINT/SIGTERM stop the polling and let
+the images in progress finish before the process exits; a second signal
+drops the images not started yet (the next run picks them up) and exits as
+soon as the running ones are saved.
+"""
+import signal
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from config import (
+    INPUT_FOLDER,
+    SUPPORTED_FORMATS,
+    WATCH_POLL_INTERVAL,
+    WATCH_RETRY_SECONDS,
+    WATCH_SETTLE_SECONDS
+)
+from logger import setup_logger
+
+logger = setup_logger('Main')
+
+# (size, mtime_ns) of a file as last seen
+Signature = Tuple[int, int]
+
+# Upper bound of the retry delay of an image that keeps failing
+MAX_RETRY_SECONDS = 3600
+
+
+class FolderWatcher:
+    """Polls a folder and reports new/changed files once they stop changing"""
+
+    def __init__(self, folder: Path, extensions: Iterable[str], settle_seconds: float):
+        self.folder = Path(folder)
+        self.extensions = {e.lower() for e in extensions}
+        self.settle_seconds = settle_seconds
+        # name -> (signature, monotonic time it was first seen with it)
+        self._changing: Dict[str, Tuple[Signature, float]] = {}
+        # name -> signature handed out by ready() and acknowledged with handled()
+        self._handled: Dict[str, Signature] = {}
+        self._first_poll = True
+
+    def _scan(self) -> Dict[str, Tuple[Signature, float]]:
+        """name -> (signature, mtime) of the supported files in the folder"""
+        files = {}
+        for f in self.folder.iterdir():
+            if f.suffix.lower() not in self.extensions:
+                continue
+            try:
+                stat = f.stat()
+            except OSError:
+                # Deleted or renamed between listing and stat
+                continue
+            if f.is_file():
+                files[f.name] = ((stat.st_size, stat.st_mtime_ns), stat.st_mtime)
+        return files
+
+    def ready(self) -> List[Tuple[Path, Signature]]:
+        """
+        Files that are new or changed since they were handled and have
+        settled (same size and mtime for settle_seconds), in name order
+        """
+        now = time.monotonic()
+        wall_now = time.time()
+        files = self._scan()
+
+        # Forget deleted files, so a file put back later counts as new
+        for name in set(self._handled) - set(files):
+            del self._handled[name]
+        for name in set(self._changing) - set(files):
+            del self._changing[name]
+
+        ready = []
+        for name, (signature, mtime) in sorted(files.items()):
+            if self._handled.get(name) == signature:
+                continue
+            seen = self._changing.get(name)
+            if seen is None or seen[0] != signature:
+                self._changing[name] = (signature, now)
+                # Files that were already there at start-up and have not been
+                # touched for a while need no extra wait
+                if not (self._first_poll and wall_now - mtime >= self.settle_seconds):
+                    continue
+            elif now - seen[1] < self.settle_seconds:
+                continue
+            if signature[0] > 0:
+                ready.append((self.folder / name, signature))
+        self._first_poll = False
+        return ready
+
+    def handled(self, name: str, signature: Signature):
+        """Do not report this version of the file again"""
+        self._handled[name] = signature
+        self._changing.pop(name, None)
+
+
+class WatchDaemon:
+    """Feeds settled new/changed images to warm workers until stopped by a signal"""
+
+    def __init__(
+        self,
+        processor,
+        poll_interval: float = WATCH_POLL_INTERVAL,
+        settle_seconds: float = WATCH_SETTLE_SECONDS,
+        retry_seconds: float = WATCH_RETRY_SECONDS
+    ):
+        """
+        Args:
+            processor: Initialized ImageProcessor (kept for the daemon's lifetime)
+            poll_interval: Seconds between folder scans while idle
+            settle_seconds: How long a file must stay unchanged before it is processed
+            retry_seconds: Delay before a failed or partial image is tried again
+        """
+        self.processor = processor
+        self.poll_interval = max(0.1, poll_interval)
+        self.retry_seconds = retry_seconds
+        self.watcher = FolderWatcher(INPUT_FOLDER, SUPPORTED_FORMATS, settle_seconds)
+        # name -> (signature, failures, monotonic time of the next attempt)
+        self._retries: Dict[str, Tuple[Signature, int, float]] = {}
+        self.stop_event = threading.Event()
+        self._aborting = False
+        self.total = 0
+        self.successful = 0
+
+    def _on_signal(self, signum, frame):
+        if self._aborting:
+            # Running images still use the processor's stores and clients,
+            # which are closed as soon as run() returns
+            logger.warning("⏳ Still waiting for the running image(s) to be saved")
+            return
+        if self.stop_event.is_set():
+            # Second Ctrl-C / SIGTERM: drop the queued images
+            self._aborting = True
+            raise KeyboardInterrupt
+        logger.info(f"🛑 Received {signal.Signals(signum).name}, finishing images in progress "
+                    f"(send again to abort)")
+        self.stop_event.set()
+
+    def _install_signal_handlers(self) -> dict:
+        """Route SIGINT/SIGTERM to a graceful stop (main thread only)"""
+        if threading.current_thread() is not threading.main_thread():
+            return {}
+        previous = {}
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            previous[signum] = signal.signal(signum, self._on_signal)
+        return previous
+
+    def _collect(self, future: Future, image_path: Path, signature: Signature):
+        self.total += 1
+        name = image_path.name
+        try:
+            success, message = future.result()
+        except Exception as e:
+            logger.error(f"❌ {name}: {e}", exc_info=True)
+            success = False
+        else:
+            self.successful += success
+            logger.info(f"{'✅' if success else '⚠️'} [{self.successful}/{self.total}] {name}: {message}")
+
+        if success and name not in self.processor.degraded:
+            self.watcher.handled(name, signature)
+            self._retries.pop(name, None)
+            return
+        # Failed or partial: try again later (sooner if the file changes)
+        previous = self._retries.get(name)
+        failures = previous[1] + 1 if previous is not None and previous[0] == signature else 1
+        delay = min(MAX_RETRY_SECONDS, self.retry_seconds * 2 ** (failures - 1))
+        self._retries[name] = (signature, failures, time.monotonic() + delay)
+        logger.info(f"🔁 {name} will be retried in {delay:g}s")
+
+    def _due(self, name: str, signature: Signature) -> bool:
+        """False while a failed image waits for its retry (unless the file changed)"""
+        retry = self._retries.get(name)
+        return retry is None or retry[0] != signature or time.monotonic() >= retry[2]
+
+    def _flush(self):
+        """Persist state while idle, so a crash loses nothing already done"""
+        self.processor.manifest.save()
+        self.processor.journal.compact()
+        self.processor.results.compact()
+        if self.processor.text_groups is not None:
+            self.processor.text_groups.reset()
+        self.processor.searcher.clear_memo()
+        # Deleted files are not retried
+        for name in [name for name in self._retries if not (self.watcher.folder / name).exists()]:
+            del self._retries[name]
+
+    def run(self) -> Tuple[int, int]:
+        """
+        Watch INPUT_FOLDER until SIGINT/SIGTERM, then drain the work in progress
+
+        Returns:
+            Tuple of (successful_count, total_count)
+        """
+        processor = self.processor
+        workers = processor.ocr_workers
+        # Leave extra settled files for the next scan instead of queueing
+        # them all, so a stop only has to wait for a short backlog
+        max_in_flight = 2 * workers
+        in_flight: Dict[Future, Tuple[Path, Signature]] = {}
+
+        previous_handlers = self._install_signal_handlers()
+        logger.info(
+            f"👀 Watch mode: {INPUT_FOLDER} every {self.poll_interval:g}s, "
+            f"{workers} worker(s), files must settle for {self.watcher.settle_seconds:g}s. "
+            f"Ctrl-C to stop"
+        )
+        # Worker threads, as in distributed mode (see ImageProcessor._process_distributed)
+        pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="watch")
+        try:
+            while not self.stop_event.is_set():
+                # Files are only marked handled once processed successfully
+                running = {path.name for path, _ in in_flight.values()}
+                for image_path, signature in self.watcher.ready():
+                    if image_path.name in running or not self._due(image_path.name, signature):
+                        continue
+                    if len(in_flight) >= max_in_flight:
+                        break
+                    if not processor.needs_processing(image_path):
+                        self.watcher.handled(image_path.name, signature)
+                        continue
+                    if image_path.name in self._retries:
+                        logger.info(f"🔁 Retrying: {image_path.name}")
+                    else:
+                        logger.info(f"📥 New image: {image_path.name}")
+                    in_flight[pool.submit(processor.process_image, image_path)] = (image_path, signature)
+
+                if not in_flight:
+                    self.stop_event.wait(self.poll_interval)
+                    continue
+
+                done, _ = wait(list(in_flight), timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._collect(future, *in_flight.pop(future))
+                if not in_flight:
+                    self._flush()
+
+            if in_flight:
+                logger.info(f"⏳ Waiting for {len(in_flight)} image(s) in progress")
+            while in_flight:
+                done, _ = wait(list(in_flight), return_when=FIRST_COMPLETED)
+                for future in done:
+                    self._collect(future, *in_flight.pop(future))
+        finally:
+            # After an abort, images not started yet are dropped (they are
+            # not in the manifest, so the next run picks them up), but the
+            # running ones must finish before the processor is closed
+            running = sum(future.running() for future in in_flight)
+            if self._aborting and running:
+                logger.info(f"⏳ Aborting: waiting for {running} running image(s)")
+            pool.shutdown(wait=True, cancel_futures=True)
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+
+        logger.info(f"👋 Watch mode stopped: {self.successful}/{self.total} image(s) processed")
+        return self.successful, self.total
@@ -0,0 +1,243 @@
+"""
+Work Queue Module - Lease-based job queue shared by several machines
+
+The queue is a SQLite file on the shared filesystem (next to the input
+images by default). Every node enqueues the images it sees, then claims
+small batches under a time-limited lease. A heartbeat renews the lease while
+an image is being processed; if a node dies, its lease expires and another
+node picks the image up. Each image is therefore OCR'd, sent to Gemini and
+searched by one node at a time.
+
+A forced reprocess (--force) resets the queue once per run: nodes started
+with --force while another node's run is in progress join that run instead
+of resetting the jobs it already leased or finished.
+
+Note: WAL mode does not work on network filesystems, so the database uses
+SQLite's default rollback journal and relies on the filesystem's locks.
+"""
+import socket
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Tuple
+
+from logger import setup_logger
+
+logger = setup_logger('Main')
+
+
+def default_node_id() -> str:
+    """Stable worker id (the hostname), so a restarted node finds its own leases"""
+    return socket.gethostname()
+
+
+class WorkQueue:
+    """SQLite-backed queue of image filenames with lease expiry"""
+
+    def __init__(
+        self,
+        path: Path,
+        node_id: str,
+        lease_seconds: float = 300,
+        max_attempts: int = 3
+    ):
+        self.path = Path(path)
+        self.node_id = node_id
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        # Jobs currently leased by this node (renewed by the heartbeat)
+        self._held = set()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self.path), timeout=60, check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=DELETE")
+        with self._transaction():
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " name TEXT PRIMARY KEY,"
+                " fingerprint TEXT NOT NULL,"
+                " state TEXT NOT NULL,"          # pending | leased | done | failed | retry
+                " owner TEXT,"
+                " lease_expires REAL,"
+                " attempts INTEGER NOT NULL DEFAULT 0,"
+                " updated REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs(state)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE takes the write lock up front, so claims never race"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _run_in_progress(self, now: float) -> bool:
+        """
+        True if another node holds a live lease, or another node's forced
+        reset started a run less than one lease period ago (its nodes may not
+        have claimed anything yet). Called inside a transaction.
+        """
+        leased = self._conn.execute(
+            "SELECT 1 FROM jobs WHERE state = 'leased' AND owner != ? AND lease_expires >= ? LIMIT 1",
+            (self.node_id, now)
+        ).fetchone()
+        if leased is not None:
+            return True
+        meta = dict(self._conn.execute(
+            "SELECT key, value FROM meta WHERE key IN ('reset_at', 'reset_by')"
+        ))
+        return (
+            meta.get('reset_by', self.node_id) != self.node_id
+            and now - float(meta['reset_at']) < self.lease_seconds
+        )
+
+    def enqueue(self, items: Iterable[Tuple[str, str]], reset: bool = False) -> int:
+        """
+        Add (filename, fingerprint) pairs. Known images are reset to pending
+        only if their fingerprint (content/settings) changed, or if `reset`
+        and no other node's run is in progress. Jobs leased by another node
+        are never taken over before their lease expires.
+
+        Returns:
+            Number of new or reset jobs
+        """
+        now = time.time()
+        changed = 0
+        with self._transaction():
+            if reset and self._run_in_progress(now):
+                logger.info("🌐 --force: another node's run is in progress, joining it instead of resetting the queue")
+                reset = False
+            if reset:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    [('reset_at', str(now)), ('reset_by', self.node_id)]
+                )
+            for name, fingerprint in items:
+                row = self._conn.execute(
+                    "SELECT fingerprint, state, owner, lease_expires FROM jobs WHERE name = ?", (name,)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute(
+                        "INSERT INTO jobs (name, fingerprint, state, updated) VALUES (?, ?, 'pending', ?)",
+                        (name, fingerprint, now)
+                    )
+                    changed += 1
+                elif row[1] == 'leased' and row[2] != self.node_id and row[3] >= now:
+                    # A live lease: the change is picked up by a later enqueue
+                    continue
+                elif reset or row[0] != fingerprint or row[1] == 'retry':
+                    self._conn.execute(
+                        "UPDATE jobs SET fingerprint = ?, state = 'pending', owner = NULL,"
+                        " lease_expires = NULL, attempts = 0, updated = ? WHERE name = ?",
+                        (fingerprint, now, name)
+                    )
+                    changed += 1
+        return changed
+
+    def claim(self, limit: int) -> List[str]:
+        """Lease up to `limit` pending (or abandoned) jobs for this node"""
+        now = time.time()
+        with self._transaction():
+            # Abandoned leases that used up their attempts are given up on
+            self._conn.execute(
+                "UPDATE jobs SET state = 'failed', owner = NULL, updated = ?"
+                " WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts)
+            )
+            names = [row[0] for row in self._conn.execute(
+                "SELECT name FROM jobs"
+                " WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?)"
+                " ORDER BY attempts, name LIMIT ?",
+                (now, limit)
+            )]
+            self._conn.executemany(
+                "UPDATE jobs SET state = 'leased', owner = ?, lease_expires = ?,"
+                " attempts = attempts + 1, updated = ? WHERE name = ?",
+                [(self.node_id, now + self.lease_seconds, now, name) for name in names]
+            )
+            self._held.update(names)
+        return names
+
+    def requeue_owned(self) -> int:
+        """Return leases left behind by a previous (crashed) run of this node to the queue"""
+        with self._transaction():
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = 'pending', owner = NULL, lease_expires = NULL, updated = ?"
+                " WHERE state = 'leased' AND owner = ?",
+                (time.time(), self.node_id)
+            )
+        return cursor.rowcount
+
+    def renew(self):
+        """Extend the leases of every job this node is working on (heartbeat)"""
+        now = time.time()
+        with self._transaction():
+            names = list(self._held)
+            self._conn.executemany(
+                "UPDATE jobs SET lease_expires = ?, updated = ?"
+                " WHERE name = ? AND owner = ? AND state = 'leased'",
+                [(now + self.lease_seconds, now, name, self.node_id) for name in names]
+            )
+
+    def complete(self, name: str, success: bool, retry: bool = False):
+        """
+        Mark a leased job done or failed (ignored if the lease was lost to
+        another node). With `retry`, the job is queued again by the next
+        run's enqueue (e.g. saved while Gemini or search was unavailable).
+        """
+        state = 'retry' if retry else 'done' if success else 'failed'
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, lease_expires = NULL, updated = ?"
+                " WHERE name = ? AND owner = ? AND state = 'leased'",
+                (state, time.time(), name, self.node_id)
+            )
+            self._held.discard(name)
+
+    def counts(self) -> Dict[str, int]:
+        """Number of jobs per state"""
+        with self._lock:
+            return dict(self._conn.execute("SELECT state, COUNT(*) FROM jobs GROUP BY state"))
+
+    def is_drained(self) -> bool:
+        """True when no job is pending or leased by any node"""
+        counts = self.counts()
+        return not counts.get('pending') and not counts.get('leased')
+
+    @contextmanager
+    def heartbeat(self):
+        """Renew this node's leases in the background while the block runs"""
+        stop = threading.Event()
+        interval = max(1.0, self.lease_seconds / 3)
+
+        def beat():
+            while not stop.wait(interval):
+                try:
+                    self.renew()
+                except sqlite3.Error as e:
+                    logger.warning(f"⚠️ Lease renewal failed: {e}")
+
+        thread = threading.Thread(target=beat, name="lease-heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()